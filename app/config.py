@@ -7,9 +7,126 @@ load_dotenv()
 # Database configuration
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# Comma-separated read replica URLs; read-only pages are spread over them
+DATABASE_REPLICA_URLS = [url for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url]
+
+# Seconds a user's reads stay on the primary after they changed something,
+# so they see their own writes despite replication lag
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Connection pool: connections kept open, extra connections allowed under
+# load, seconds to wait for a free connection, seconds before a connection is
+# replaced and whether connections are tested before each checkout
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "True") == "True"
+
+# Milliseconds a single statement may run before the database cancels it
+# (0 disables); on SQLite this bounds how long a statement waits for a lock
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", "5000"))
+
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode:
+# disables prepared statement caching and sets the timeout per transaction
+DB_PGBOUNCER = os.environ.get("DB_PGBOUNCER", "False") == "True"
+
 # Application settings
 SECRET_KEY = os.environ.get("SECRET_KEY")
 DEBUG = os.environ.get("DEBUG", "False") == "True"  # Default to False if not set
 
+# Seed the demo movies, showtimes and admin account on startup where missing.
+# The schema itself is managed by ``python -m app.migrations``
+SEED_DATA = os.environ.get("SEED_DATA", "False") == "True"
+
+# Password hashing: bcrypt cost, hashing threads and how many hash/verify
+# calls may be running or queued before logins are shed with a 503
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+# Admin principal cache: entries kept and seconds before a role change made
+# in another worker is picked up
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "60"))
+
+# Optional Redis instance shared by all workers (e.g. redis://localhost:6379/0)
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# Seconds between checks of the shared catalog version when REDIS_URL is set,
+# and seconds a loaded catalog is served at most, so that workers pick up
+# changes made in another process even without Redis (0 disables)
+CATALOG_VERSION_CHECK_INTERVAL = float(os.environ.get("CATALOG_VERSION_CHECK_INTERVAL", "1.0"))
+CATALOG_CACHE_MAX_AGE = float(os.environ.get("CATALOG_CACHE_MAX_AGE", "60"))
+
+# Idempotency keys on booking submissions: seconds a key is remembered,
+# completed responses kept in memory and seconds between expired key sweeps
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.environ.get("IDEMPOTENCY_SWEEP_INTERVAL", "300"))
+
+# Seconds between checks of the sales aggregates against the bookings table
+SALES_RECONCILE_INTERVAL = float(os.environ.get("SALES_RECONCILE_INTERVAL", "3600"))
+
+# Seat holds: minutes a hold lasts, seconds between expiry sweeps and the
+# most holds one sweep expires
+SEAT_HOLD_MINUTES = float(os.environ.get("SEAT_HOLD_MINUTES", "10"))
+HOLD_SWEEP_INTERVAL = float(os.environ.get("HOLD_SWEEP_INTERVAL", "1"))
+HOLD_SWEEP_BATCH = int(os.environ.get("HOLD_SWEEP_BATCH", "500"))
+
+# Online migrations: rows per backfill transaction and seconds to pause
+# between batches so live traffic gets the table in between
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "5000"))
+MIGRATION_BATCH_PAUSE = float(os.environ.get("MIGRATION_BATCH_PAUSE", "0"))
+
+# Seats in each newly scheduled showtime
+DEFAULT_SCREEN_CAPACITY = int(os.environ.get("DEFAULT_SCREEN_CAPACITY", "100"))
+
+# Daily schedule given to new movies: screen name, start times and days ahead
+DEFAULT_SCREEN = os.environ.get("DEFAULT_SCREEN", "Screen 1")
+DEFAULT_SHOWTIMES = os.environ.get("DEFAULT_SHOWTIMES", "10:00,14:00,18:00").split(",")
+SCHEDULE_DAYS = int(os.environ.get("SCHEDULE_DAYS", "7"))
+
+# Seconds between top-ups of every movie's default schedule to SCHEDULE_DAYS
+# ahead, and movies topped up per transaction
+SCHEDULE_TOP_UP_INTERVAL = float(os.environ.get("SCHEDULE_TOP_UP_INTERVAL", "3600"))
+SCHEDULE_TOP_UP_BATCH = int(os.environ.get("SCHEDULE_TOP_UP_BATCH", "1000"))
+
+# Rows per page on the admin bookings view (and the most a client may ask for)
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "500"))
+
+# Rows per page of a user's booking history, and the per-user summary cache:
+# entries kept and seconds before bookings made by another worker show up
+BOOKING_PAGE_SIZE = int(os.environ.get("BOOKING_PAGE_SIZE", "25"))
+BOOKING_SUMMARY_CACHE_SIZE = int(os.environ.get("BOOKING_SUMMARY_CACHE_SIZE", "10000"))
+BOOKING_SUMMARY_CACHE_TTL = float(os.environ.get("BOOKING_SUMMARY_CACHE_TTL", "30"))
+
+# Movies per page of search results
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "20"))
+
+# Live seat availability on the booking page: most events a listener gets
+# per second (updates in between are merged), seconds between keepalives on
+# an idle stream, and listeners each worker accepts before answering 503
+AVAILABILITY_MAX_EVENTS_PER_SECOND = float(os.environ.get("AVAILABILITY_MAX_EVENTS_PER_SECOND", "2"))
+AVAILABILITY_KEEPALIVE = float(os.environ.get("AVAILABILITY_KEEPALIVE", "15"))
+AVAILABILITY_MAX_SUBSCRIBERS = int(os.environ.get("AVAILABILITY_MAX_SUBSCRIBERS", "10000"))
+
+# Admission control on POST /login, /register and /book: token bucket limits
+# as "requests/seconds" per client (the logged-in user, else the address;
+# empty disables), how many clients' buckets each worker keeps, and requests
+# per endpoint in flight in each worker before new ones get a 503
+RATE_LIMIT_LOGIN = os.environ.get("RATE_LIMIT_LOGIN", "10/60")
+RATE_LIMIT_REGISTER = os.environ.get("RATE_LIMIT_REGISTER", "5/300")
+RATE_LIMIT_BOOK = os.environ.get("RATE_LIMIT_BOOK", "30/60")
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "100000"))
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "32"))
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+
 # Templates directory
 TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Static assets directory, served fingerprinted under /static
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
@@ -1,24 +1,263 @@
 
-from sqlalchemy import create_engine
+import time
+from fastapi import Depends, Request
+from sqlalchemy import event, exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.config import DATABASE_URL
+from app.config import (
+    DATABASE_URL, DATABASE_REPLICA_URLS, READ_YOUR_WRITES_SECONDS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT, DB_PGBOUNCER,
+)
+from app.middleware.metrics import Histogram, LATENCY_BUCKETS, instrument_engine
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# Async drivers used for each backend when DATABASE_URL names a sync driver
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def to_async_url(url):
+    """
+    Rewrite a database URL so it uses the async driver for its backend.
+    URLs that already name an async driver are returned unchanged.
+    """
+    url = make_url(url)
+    async_driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if async_driver and url.drivername != async_driver:
+        url = url.set(drivername=async_driver)
+    return url
+
+def dialect_insert(db, table):
+    """
+    Return an INSERT for ``table`` that supports ON CONFLICT clauses on the
+    dialect ``db`` is bound to (PostgreSQL or SQLite).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+class PoolStats:
+    """Checkout counters and checkout wait times for one pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait = Histogram(LATENCY_BUCKETS)
+        self.max_wait = 0.0
+
+    def observe(self, waited):
+        self.checkouts += 1
+        self.wait.observe(waited)
+        self.max_wait = max(self.max_wait, waited)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool recording how long each checkout waited for a
+    connection (including opening one) and how many timed out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.observe(time.perf_counter() - started)
+        return connection
+
+def engine_options(
+    url,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pre_ping=DB_POOL_PRE_PING,
+    statement_timeout=DB_STATEMENT_TIMEOUT,
+    pgbouncer=DB_PGBOUNCER,
+):
+    """
+    Keyword arguments for ``create_async_engine(url)`` applying the pool and
+    timeout settings. In-memory SQLite keeps its single static connection.
+    """
+    url = make_url(url)
+    options = {}
+    connect_args = {}
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pre_ping,
+        )
+
+    if url.get_backend_name() == "postgresql":
+        if pgbouncer:
+            # Transaction pooling hands each transaction to any server
+            # connection, so no statement may stay prepared across them
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+        elif statement_timeout:
+            connect_args["server_settings"] = {"statement_timeout": str(statement_timeout)}
+    elif url.get_backend_name() == "sqlite" and statement_timeout:
+        connect_args["timeout"] = statement_timeout / 1000
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+def make_engine(url, **settings):
+    """
+    Create the async engine for ``url``; ``settings`` override the
+    configured values accepted by ``engine_options``.
+    """
+    url = to_async_url(url)
+    new_engine = create_async_engine(url, **engine_options(url, **settings))
+
+    pgbouncer = settings.get("pgbouncer", DB_PGBOUNCER)
+    statement_timeout = settings.get("statement_timeout", DB_STATEMENT_TIMEOUT)
+    if url.get_backend_name() == "postgresql" and pgbouncer and statement_timeout:
+        # PgBouncer rejects startup parameters it does not track, so the
+        # timeout is set at the start of every transaction instead
+        @event.listens_for(new_engine.sync_engine, "begin")
+        def set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout)}")
+
+    return new_engine
+
+def pool_status(engine):
+    """
+    Current size and usage of ``engine``'s pool plus its checkout stats
+    (``None`` for pools that are not a TimedQueuePool).
+    """
+    pool = engine.pool
+    stats = getattr(pool, "stats", None)
+    if stats is None:
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "idle": pool.checkedin(),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "max_wait": stats.max_wait,
+        "wait": stats.wait,
+    }
+
+class LazyEngine:
+    """
+    Stand-in for an async engine that ``factory`` creates on first use.
+    Importing the app then neither loads a database driver nor sets up a
+    pool, so workers and test processes that never touch this engine (or
+    not yet) start faster. Attribute access is forwarded to the engine.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._engine = None
+
+    @property
+    def created(self):
+        return self._engine is not None
+
+    def get(self):
+        if self._engine is None:
+            self._engine = self._factory()
+        return self._engine
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    async def dispose(self):
+        # Nothing to close if the engine was never created
+        if self._engine is not None:
+            await self._engine.dispose()
+
+def instrumented_engine(url):
+    """
+    Create the engine for ``url`` with its queries counted on /metrics.
+    """
+    new_engine = make_engine(url)
+    instrument_engine(new_engine)
+    return new_engine
+
+def primary_engine():
+    return instrumented_engine(DATABASE_URL)
+
+# SQLAlchemy async engine for DATABASE_URL, created when first used
+engine = LazyEngine(primary_engine)
+
+# Create session factory; objects stay usable after commit so templates
+# never trigger a lazy load outside of the event loop
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+class ReplicaRouter:
+    """
+    Session factories for the read replicas, handed out round robin. The
+    replica engines are created on the first read.
+    """
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.engines = None
+        self.session_factories = None
+        self._next = 0
+
+    def session_factory(self):
+        """
+        Return the next replica's session factory, or None without replicas.
+        """
+        if self.session_factories is None:
+            self.engines = [instrumented_engine(url) for url in self.urls]
+            self.session_factories = [
+                async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+                for replica_engine in self.engines
+            ]
+        if not self.session_factories:
+            return None
+        self._next = (self._next + 1) % len(self.session_factories)
+        return self.session_factories[self._next]
+
+replicas = ReplicaRouter(DATABASE_REPLICA_URLS)
 
 # Create base class for models
 Base = declarative_base()
 
 # Dependency to get DB session
-def get_db():
- 
-    db = SessionLocal()
-    try:
+async def get_db():
+
+    async with SessionLocal() as db:
+        yield db
+
+def stick_to_primary(request: Request):
+    """
+    Send this user's reads to the primary for a while after they wrote, so
+    the next page shows their change even if the replicas lag behind.
+    """
+    request.session["primary_until"] = time.time() + READ_YOUR_WRITES_SECONDS
+
+# Dependency to get a DB session for read-only pages; it is served by a
+# replica unless there are none or the user has just written something
+async def get_read_db(request: Request, primary: AsyncSession = Depends(get_db)):
+
+    session_factory = replicas.session_factory()
+    if session_factory is None or request.session.get("primary_until", 0) > time.time():
+        yield primary
+        return
+    async with session_factory() as db:
         yield db
-    finally:
-        db.close()
@@ -1,4 +1,5 @@
 """
 Import all dependencies to make them available from the dependencies package.
 """
-from app.dependencies.auth import require_login, require_admin
\ No newline at end of file
+from app.dependencies.auth import require_login, require_admin, session_user_id
+from app.dependencies.filters import BookingFilters, MovieFilters
@@ -3,10 +3,10 @@ Authentication and authorization dependencies.
 """
 import logging
 from fastapi import Request, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.user import User
+from app.services.principals import get_principal
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +20,26 @@ def require_login(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
     return True
 
-def require_admin(request: Request, db: Session = Depends(get_db)):
+async def session_user_id(request: Request, db: AsyncSession):
+    """
+    Return the id of the logged-in user. Sessions issued before the id was
+    one of the claims look it up through the principal cache once and keep
+    it. Raises HTTPException if the account no longer exists.
+    """
+    user_id = request.session.get("user_id")
+    if user_id is None:
+        principal = await get_principal(db, request.session["user"])
+        if principal is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user_id = request.session["user_id"] = principal.user_id
+    return user_id
+
+async def require_admin(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Dependency to check if a user is an admin.
-    Raises HTTPException if not an admin.
+    Raises HTTPException if not an admin, or if the session's role claims
+    were issued before the user's last role change.
+    The principal comes from the cache, so this normally queries nothing.
     """
     username = request.session.get("user")
     is_admin = request.session.get("is_admin", False)  
@@ -32,4 +48,13 @@ def require_admin(request: Request, db: Session = Depends(get_db)):
         logger.debug(f"Admin check failed for user {username}")
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    return db.query(User).filter(User.username == username, User.is_admin == True).first()
+    principal = await get_principal(db, username)
+    if (
+        principal is None
+        or not principal.is_admin
+        or principal.role_version != request.session.get("role_version", 0)
+    ):
+        logger.debug(f"Admin claims for user {username} are revoked")
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    return principal
@@ -0,0 +1,57 @@
+"""
+Query-string filter dependencies.
+"""
+from datetime import datetime
+from fastapi import HTTPException
+
+class BookingFilters:
+    """
+    Booking filters read from the query string: movie, user and a showtime
+    start range. Empty values (as sent by an HTML form) mean "no filter".
+    """
+
+    def __init__(self, movie_id: str = "", user: str = "", starts_from: str = "", starts_to: str = ""):
+        self.movie_id = self._parse(movie_id, int, "movie_id")
+        self.user = user.strip() or None
+        self.starts_from = self._parse(starts_from, datetime.fromisoformat, "starts_from")
+        self.starts_to = self._parse(starts_to, datetime.fromisoformat, "starts_to")
+
+    @staticmethod
+    def _parse(value, convert, name):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return convert(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+    def params(self):
+        """
+        Active filters as query parameters, for building page links.
+        """
+        params = {
+            "movie_id": self.movie_id,
+            "user": self.user,
+            "starts_from": self.starts_from.isoformat(timespec="minutes") if self.starts_from else None,
+            "starts_to": self.starts_to.isoformat(timespec="minutes") if self.starts_to else None,
+        }
+        return {key: value for key, value in params.items() if value is not None}
+
+class MovieFilters:
+    """
+    Movie search facets read from the query string: format, year and
+    rating. Empty values mean "any".
+    """
+
+    def __init__(self, format: str = "", year: str = "", rating: str = ""):
+        self.format = format.strip() or None
+        self.year = BookingFilters._parse(year, int, "year")
+        self.rating = BookingFilters._parse(rating, int, "rating")
+
+    def params(self):
+        """
+        Active facets as query parameters, for building page links.
+        """
+        params = {"format": self.format, "year": self.year, "rating": self.rating}
+        return {key: value for key, value in params.items() if value is not None}
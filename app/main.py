@@ -1,41 +1,114 @@
-
+import asyncio
 import logging
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 
-from app.config import SECRET_KEY, DEBUG
-from app.database import Base, engine
+from app.config import (
+    SECRET_KEY, DEBUG, SEED_DATA, IDEMPOTENCY_SWEEP_INTERVAL, SALES_RECONCILE_INTERVAL, HOLD_SWEEP_INTERVAL,
+    SCHEDULE_TOP_UP_INTERVAL,
+)
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.conditional import ConditionalGetMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from app.routes.auth import router as auth_router
 from app.routes.movies import router as movies_router
 from app.routes.bookings import router as bookings_router
 from app.routes.admin import router as admin_router
+from app.routes.metrics import router as metrics_router
+from app.routes.api import router as api_router
+from app.routes.static import router as static_router
+from app.services.availability import availability_feed, run_availability_listener
+from app.services.holds import HoldExpired, run_hold_sweeper
+from app.services.idempotency import IdempotencyConflict, KeyTooLong, run_key_sweeper
+from app.services.inventory import SoldOut
+from app.services.sales import run_sales_reconciler
+from app.services.showtimes import ShowtimeNotFound, ShowtimeStarted, run_schedule_top_up
 from app.utils.seed import initialize_data
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Answers to booking requests the services turn down, the same for the pages
+# and the API
+BOOKING_ERRORS = {
+    ShowtimeNotFound: (404, "Showtime not found"),
+    ShowtimeStarted: (400, "Showtime has already started"),
+    SoldOut: (409, "Not enough seats available"),
+    HoldExpired: (410, "Your seat hold has expired"),
+    KeyTooLong: (400, "Idempotency key too long"),
+    IdempotencyConflict: (422, "Idempotency key was used for a different request"),
+}
 
-# Initialize the FastAPI application
-app = FastAPI(
-    title="Movie Booking System",
-    description="A web application for booking movie tickets",
-    version="1.0.0"
-)
+def error_response(status_code, detail):
+    async def handler(request, exc):
+        return JSONResponse({"detail": detail}, status_code=status_code)
+    return handler
+
+def create_app(seed=SEED_DATA, background_tasks=True):
+    """
+    Build the FastAPI application. Startup does not touch the schema (run
+    ``python -m app.migrations`` first); with ``seed`` it adds the demo data
+    where missing, and with ``background_tasks`` it starts the hold, key and
+    sales sweepers and the schedule top-up (and, with REDIS_URL set, the listener for availability
+    updates from other workers).
+    """
+    app = FastAPI(
+        title="Movie Booking System",
+        description="A web application for booking movie tickets",
+        version="1.0.0"
+    )
+
+    # Turn away floods of logins, registrations and bookings before they
+    # reach the database; inside the session middleware to see who is logged in
+    app.add_middleware(AdmissionMiddleware)
+
+    # Add session middleware
+    app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
-# Add session middleware
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+    # Tag rendered pages with ETags and answer repeat views with 304s, then
+    # compress what still has to be sent
+    app.add_middleware(ConditionalGetMiddleware)
+    app.add_middleware(CompressionMiddleware)
 
-# Include routers
-app.include_router(auth_router)
-app.include_router(movies_router)
-app.include_router(bookings_router)
-app.include_router(admin_router)
+    # Record per-route latency, query and render metrics, served on /metrics
+    app.add_middleware(MetricsMiddleware)
 
-# Initialize seed data
-@app.on_event("startup")
-async def startup_event():
-    initialize_data()
-    logger.info("Application started and seed data initialized")
+    # Include routers
+    app.include_router(auth_router)
+    app.include_router(movies_router)
+    app.include_router(bookings_router)
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
+    app.include_router(api_router)
+    app.include_router(static_router)
+
+    for error, (status_code, detail) in BOOKING_ERRORS.items():
+        app.add_exception_handler(error, error_response(status_code, detail))
+
+    async def startup_event():
+        if seed:
+            await initialize_data()
+        app.state.background_tasks = [
+            asyncio.create_task(run_hold_sweeper(HOLD_SWEEP_INTERVAL)),
+            asyncio.create_task(run_key_sweeper(IDEMPOTENCY_SWEEP_INTERVAL)),
+            asyncio.create_task(run_sales_reconciler(SALES_RECONCILE_INTERVAL)),
+            asyncio.create_task(run_schedule_top_up(SCHEDULE_TOP_UP_INTERVAL)),
+        ] if background_tasks else []
+        if background_tasks and availability_feed.broker is not None:
+            app.state.background_tasks.append(asyncio.create_task(run_availability_listener()))
+        logger.info("Application started" + (" and seed data initialized" if seed else ""))
+
+    async def shutdown_event():
+        for task in app.state.background_tasks:
+            task.cancel()
+        await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
+
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+    return app
+
+# Initialize the FastAPI application
+app = create_app()
@@ -0,0 +1,7 @@
+"""
+Import all middleware to make them available from the middleware package.
+"""
+from app.middleware.metrics import MetricsMiddleware, TimedTemplates, instrument_engine, registry
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.conditional import ConditionalGetMiddleware
+from app.middleware.admission import AdmissionMiddleware, admission_stats
@@ -0,0 +1,210 @@
+"""
+Admission control for the login, registration and booking endpoints.
+
+AdmissionMiddleware answers a limited request before any route code, session
+query or password hash runs, in two ways:
+
+- a token bucket per client and rule (the logged-in user, else the client
+  address) refills at the rule's rate; a client whose bucket is empty gets a
+  429 with Retry-After;
+- each rule admits at most ``max_in_flight`` requests at a time in this
+  worker; beyond that new ones get an immediate 503 instead of queueing for
+  the connection pool or the hashing threads.
+
+Buckets live in this process (LocalBucketStore) or, with REDIS_URL set, in
+Redis (RedisBucketStore) so the limits hold across workers. If the shared
+store fails, requests are admitted rather than turned away.
+"""
+import logging
+import math
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from app.config import (
+    REDIS_URL, RATE_LIMIT_LOGIN, RATE_LIMIT_REGISTER, RATE_LIMIT_BOOK, ADMISSION_MAX_IN_FLIGHT, RATE_LIMIT_MAX_CLIENTS,
+)
+
+logger = logging.getLogger(__name__)
+
+def parse_rate(value):
+    """
+    Parse a "requests/seconds" limit into (burst, tokens per second);
+    empty or zero limits give (0, 0.0), meaning no bucket.
+    """
+    if not value:
+        return 0, 0.0
+    requests, _, seconds = value.partition("/")
+    burst = int(requests)
+    return burst, burst / float(seconds or 1) if burst else 0.0
+
+@dataclass(frozen=True)
+class AdmissionRule:
+    name: str
+    routes: tuple
+    burst: int
+    rate: float
+    max_in_flight: int = ADMISSION_MAX_IN_FLIGHT
+
+def default_rules():
+    return [
+        AdmissionRule("login", (("POST", "/login"),), *parse_rate(RATE_LIMIT_LOGIN)),
+        AdmissionRule("register", (("POST", "/register"),), *parse_rate(RATE_LIMIT_REGISTER)),
+        AdmissionRule("book", (("POST", "/book"), ("POST", "/api/v1/bookings")), *parse_rate(RATE_LIMIT_BOOK)),
+    ]
+
+class LocalBucketStore:
+    """
+    Token buckets held by this process only, the least recently used
+    dropped beyond ``max_keys`` (a dropped bucket comes back full).
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_CLIENTS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    async def take(self, key, burst, rate):
+        """
+        Take a token from ``key``'s bucket. Returns 0 when one was taken,
+        else the seconds until the next token.
+        """
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            tokens = burst
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            self.buckets.move_to_end(key)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+        self.buckets[key] = (tokens - 1, now)
+        return 0
+
+    def clear(self):
+        self.buckets.clear()
+
+# Refill, take and store a bucket atomically; returns the wait in ms
+TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = burst
+if bucket[1] then
+    tokens = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+end
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) / rate * 1000)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return wait
+"""
+
+class RedisBucketStore:
+    """Token buckets shared by every worker through Redis."""
+
+    def __init__(self, url, prefix="ratelimit:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self.script = self.client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key, burst, rate):
+        # Wall clock, so that every worker measures refills the same way
+        wait_ms = await self.script(keys=[self.prefix + key], args=[burst, rate, time.time()])
+        return int(wait_ms) / 1000
+
+def default_bucket_store():
+    if REDIS_URL:
+        return RedisBucketStore(REDIS_URL)
+    return LocalBucketStore()
+
+class AdmissionStats:
+    """Requests in flight and rejections per rule, for /metrics."""
+
+    def __init__(self):
+        self.in_flight = Counter()
+        self.rejected = Counter()
+
+    def clear(self):
+        self.in_flight.clear()
+        self.rejected.clear()
+
+admission_stats = AdmissionStats()
+
+# Rejections are answered with prebuilt bodies; building a Response for each
+# would cost more than the limiter itself
+REJECTIONS = {
+    429: b'{"detail":"Too many requests"}',
+    503: b'{"detail":"Too busy, try again shortly"}',
+}
+
+async def reject(send, status_code, retry_after):
+    body = REJECTIONS[status_code]
+    await send({"type": "http.response.start", "status": status_code, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(retry_after).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+def client_key(scope):
+    """
+    Whom a request is limited as: the logged-in user when the session says
+    so, else the client address.
+    """
+    user = scope.get("session", {}).get("user")
+    if user:
+        return f"user:{user}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying ``rules`` (default_rules()) with buckets in
+    ``store`` (default_bucket_store()). Must run inside SessionMiddleware to
+    limit logged-in users by name.
+    """
+
+    def __init__(self, app, rules=None, store=None, stats=admission_stats):
+        self.app = app
+        self.store = store if store is not None else default_bucket_store()
+        self.stats = stats
+        self.rules = {route: rule for rule in (rules if rules is not None else default_rules()) for route in rule.routes}
+
+    async def __call__(self, scope, receive, send):
+        rule = self.rules.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats = self.stats
+        if rule.max_in_flight and stats.in_flight[rule.name] >= rule.max_in_flight:
+            stats.rejected[rule.name, "busy"] += 1
+            await reject(send, 503, 1)
+            return
+
+        # Counted from here, so a slow shared store cannot let more through
+        stats.in_flight[rule.name] += 1
+        try:
+            if rule.burst:
+                try:
+                    wait = await self.store.take(f"{rule.name}:{client_key(scope)}", rule.burst, rule.rate)
+                except Exception:
+                    logger.exception("Rate limit store failed; admitting the request")
+                    wait = 0
+                if wait:
+                    stats.rejected[rule.name, "rate"] += 1
+                    await reject(send, 429, math.ceil(wait))
+                    return
+            await self.app(scope, receive, send)
+        finally:
+            stats.in_flight[rule.name] -= 1
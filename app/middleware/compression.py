@@ -0,0 +1,142 @@
+"""
+Response compression.
+
+CompressionMiddleware compresses text responses with brotli (when the
+optional ``brotli`` package is installed and the client accepts it) or gzip,
+as they stream out. Responses smaller than COMPRESS_MIN_SIZE, already
+encoded ones (precompressed static assets, gzip exports) and event streams,
+which must reach the client unbuffered, are passed through unchanged.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import COMPRESS_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "image/svg+xml")
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+def accepted_encoding(accept_encoding):
+    """
+    The encoding to use for an Accept-Encoding header value, or None.
+    """
+    accepted = {}
+    for token in (accept_encoding or "").lower().split(","):
+        name, _, params = token.partition(";")
+        quality = params.strip()[2:] if params.strip().startswith("q=") else "1"
+        try:
+            accepted[name.strip()] = float(quality)
+        except ValueError:
+            continue
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class GzipEncoder:
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+class BrotliEncoder:
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def finish(self):
+        return self.compressor.finish()
+
+def is_compressible(status, headers):
+    content_type = headers.get("content-type", "")
+    return (
+        status not in (204, 304)
+        and "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+    )
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing response bodies on the fly.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_SIZE, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def encoder(self, encoding):
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
+
+    @staticmethod
+    def encode(encoder, body, more_body):
+        chunk = encoder.compress(body)
+        return chunk if more_body else chunk + encoder.finish()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows how big it is
+                start = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not is_compressible(start["status"], headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = self.encoder(encoding)
+                chunk = self.encode(encoder, body, more_body)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                else:
+                    headers["Content-Length"] = str(len(chunk))
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The compressed bytes differ from the ones the tag names
+                    headers["ETag"] = f"W/{etag}"
+                await send(start)
+            else:
+                chunk = self.encode(encoder, body, more_body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
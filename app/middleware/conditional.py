@@ -0,0 +1,81 @@
+"""
+Conditional GETs for templated pages.
+
+ConditionalGetMiddleware tags every HTML page that does not set its own
+validators with a weak ETag over the rendered body and answers a matching
+If-None-Match with an empty 304, so a repeat view costs the render but not
+the transfer. Pages that compute their ETag before rendering (the catalog)
+skip the render as well and are left alone here.
+"""
+import hashlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+def body_etag(body):
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+def etag_matches(if_none_match, etag):
+    """
+    The If-None-Match half of app.utils.http.is_not_modified, which cannot
+    be imported here: app.utils imports the database, which imports us.
+    """
+    if if_none_match is None:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class ConditionalGetMiddleware:
+    """
+    Pure ASGI middleware adding ETags and 304 responses to HTML pages.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_conditional(message):
+            nonlocal start, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] != 200
+                    or "etag" in headers
+                    or not headers.get("content-type", "").startswith("text/html")
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message.get("more_body", False):
+                # Streamed pages are not buffered just to hash them
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            etag = body_etag(message.get("body", b""))
+            headers = MutableHeaders(raw=start["headers"])
+            headers["ETag"] = etag
+            if "cache-control" not in headers:
+                headers["Cache-Control"] = "private, no-cache"
+            if etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                await send({**start, "status": 304})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_conditional)
@@ -0,0 +1,230 @@
+"""
+Request-level performance metrics.
+
+MetricsMiddleware times every request and, through SQLAlchemy engine events
+and the shared template renderer, how many queries it ran, how long they
+took and how long templates took to render. Everything lands in per-route
+histograms with preallocated buckets, rendered in Prometheus text format by
+``/metrics``. Updates are plain integer/float additions made from the event
+loop thread, so no locks are needed.
+
+A request that runs the same SQL statement N_PLUS_ONE_THRESHOLD or more
+times is counted as a suspected N+1 pattern for its route.
+"""
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+N_PLUS_ONE_THRESHOLD = 10
+
+class Histogram:
+    """Cumulative histogram over fixed bucket bounds."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def histogram_lines(name, labels, histogram):
+    """
+    Prometheus sample lines for ``histogram`` with the ``labels`` text.
+    """
+    prefix = f"{labels}," if labels else ""
+    suffix = f"{{{labels}}}" if labels else ""
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        yield f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+    yield f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}'
+    yield f"{name}_sum{suffix} {histogram.sum}"
+    yield f"{name}_count{suffix} {histogram.count}"
+
+class RouteMetrics:
+    """All series recorded for one (method, route) pair."""
+
+    __slots__ = ("latency", "queries", "query_time", "render_time", "statuses", "n_plus_one")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_time = Histogram(LATENCY_BUCKETS)
+        self.render_time = Histogram(LATENCY_BUCKETS)
+        self.statuses = {}
+        self.n_plus_one = 0
+
+class RequestStats:
+    """Work done by the request currently being served."""
+
+    __slots__ = ("queries", "query_time", "render_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        self.statements = {}
+
+current_request = ContextVar("current_request", default=None)
+
+class MetricsRegistry:
+    """Per-route metrics plus gauges/counters contributed by other modules."""
+
+    def __init__(self):
+        self.routes = {}
+        self.collectors = []
+
+    def route(self, method, path):
+        key = (method, path)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        return metrics
+
+    def add_collector(self, collect):
+        """
+        Register ``collect()``, returning (name, type, help, [(labels, value)])
+        tuples to append to the exposition; histogram values are Histograms.
+        """
+        self.collectors.append(collect)
+
+    def record(self, method, path, status, elapsed, stats):
+        metrics = self.route(method, path)
+        metrics.latency.observe(elapsed)
+        metrics.queries.observe(stats.queries)
+        metrics.query_time.observe(stats.query_time)
+        if stats.render_time:
+            metrics.render_time.observe(stats.render_time)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+        repeated = [sql for sql, count in stats.statements.items() if count >= N_PLUS_ONE_THRESHOLD]
+        if repeated:
+            if not metrics.n_plus_one:
+                logger.warning(f"Possible N+1 queries on {method} {path}: {repeated[0][:200]!r} ran {stats.statements[repeated[0]]} times")
+            metrics.n_plus_one += 1
+
+    def render(self):
+        """
+        Render every series in Prometheus text exposition format.
+        """
+        lines = []
+        histograms = (
+            ("http_request_duration_seconds", "latency", "Request latency by route."),
+            ("http_request_db_queries", "queries", "Database queries per request by route."),
+            ("http_request_db_seconds", "query_time", "Database time per request by route."),
+            ("http_request_render_seconds", "render_time", "Template render time per request by route."),
+        )
+        for name, attribute, help_text in histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, path), metrics in self.routes.items():
+                labels = f'method="{method}",route="{path}"'
+                lines.extend(histogram_lines(name, labels, getattr(metrics, attribute)))
+
+        lines.append("# HELP http_requests_total Requests by route and status.")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, path), metrics in self.routes.items():
+            for status, count in metrics.statuses.items():
+                lines.append(f'http_requests_total{{method="{method}",route="{path}",status="{status}"}} {count}')
+
+        lines.append("# HELP http_n_plus_one_suspected_total Requests that repeated one SQL statement at least "
+                     f"{N_PLUS_ONE_THRESHOLD} times.")
+        lines.append("# TYPE http_n_plus_one_suspected_total counter")
+        for (method, path), metrics in self.routes.items():
+            if metrics.n_plus_one:
+                lines.append(f'http_n_plus_one_suspected_total{{method="{method}",route="{path}"}} {metrics.n_plus_one}')
+
+        for collect in self.collectors:
+            for name, kind, help_text, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                    if kind == "histogram":
+                        lines.extend(histogram_lines(name, label_text, value))
+                    else:
+                        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route metrics for HTTP requests.
+    """
+
+    def __init__(self, app, registry=registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            self.registry.record(scope["method"], path, status, elapsed, stats)
+
+class TimedTemplates(Jinja2Templates):
+    """
+    Jinja2Templates that adds each render to the current request's stats.
+    """
+
+    def TemplateResponse(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().TemplateResponse(*args, **kwargs)
+        finally:
+            stats = current_request.get()
+            if stats is not None:
+                stats.render_time += time.perf_counter() - started
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - started
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+def instrument_engine(engine):
+    """
+    Count queries and query time per request on ``engine`` (sync or async).
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,90 @@
+"""
+Schema migrations for databases created before a model change.
+
+``Base.metadata.create_all`` creates missing tables but never alters existing
+ones. Each migration module upgrades an older schema in place and is a no-op
+on a database that already has the current shape. ``upgrade_database`` does
+both; it runs from ``python -m app.migrations`` (or ``run.py``) once per
+deploy rather than in every worker. Applied migrations are recorded in
+``schema_migrations``.
+
+A migration runs in one transaction with its record, unless it sets
+``ONLINE = True``: then it manages its own short transactions (see
+``app.migrations.online``) and is recorded once it has finished.
+
+A migration that sets ``AFTER_DEPLOY = True`` removes something the previous
+release still uses, so it and every migration after it wait until they are
+asked for (``python -m app.migrations --after-deploy``), once no worker runs
+the previous release.
+"""
+import importlib
+import logging
+from sqlalchemy import MetaData, Table, Column, String, DateTime, select, func
+
+import app.models  # noqa: F401 - registers every table on Base.metadata
+from app.database import Base
+
+logger = logging.getLogger(__name__)
+
+# Migration modules in this package, in the order they must run; those
+# needed by the new release come before the first AFTER_DEPLOY one
+MIGRATIONS = [
+    "m001_showtimes",
+    "m002_booking_indexes",
+    "m003_user_role_version",
+    "m004_booking_sales",
+    "m005_movie_search",
+    "m006_seat_holds",
+    "m007_booking_user_ids",
+    "m010_hold_waitlist_user_ids",
+    "m008_drop_booking_usernames",
+    "m009_sales_totals",
+    "m011_finish_hold_waitlist_user_ids",
+]
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, server_default=func.now()),
+)
+
+def run_migrations(conn, after_deploy=False):
+    """
+    Apply pending migrations on a sync ``Connection`` outside of a
+    transaction (use ``run_sync`` from an async one) after the current tables
+    were created, stopping at the first ``AFTER_DEPLOY`` one unless
+    ``after_deploy``. Returns the versions applied.
+    """
+    with conn.begin():
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    pending = [version for version in MIGRATIONS if version not in applied]
+    for version in pending:
+        module = importlib.import_module(f"app.migrations.{version}")
+        if getattr(module, "AFTER_DEPLOY", False) and not after_deploy:
+            logger.info(f"Leaving {version} and later migrations for after the deploy")
+            return pending[:pending.index(version)]
+        logger.info(f"Applying migration {version}")
+        if getattr(module, "ONLINE", False):
+            module.upgrade(conn)
+            with conn.begin():
+                conn.execute(schema_migrations.insert().values(version=version))
+        else:
+            with conn.begin():
+                module.upgrade(conn)
+                conn.execute(schema_migrations.insert().values(version=version))
+    return pending
+
+async def upgrade_database(engine, after_deploy=False):
+    """
+    Create missing tables and apply pending migrations on the async
+    ``engine`` (see ``run_migrations``). Returns the versions applied.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        return await conn.run_sync(run_migrations, after_deploy)
@@ -0,0 +1,28 @@
+"""
+Create missing tables and apply pending migrations: ``python -m app.migrations``.
+
+Run it once per deploy, before starting the workers; ``--seed`` also adds the
+demo movies, showtimes and admin account where missing. Migrations that
+remove what the previous release still uses wait for a second run with
+``--after-deploy`` once every worker runs the new release.
+"""
+import argparse
+import asyncio
+
+from app.database import engine
+from app.migrations import upgrade_database
+from app.utils.seed import initialize_data
+
+async def main(args):
+    applied = await upgrade_database(engine, after_deploy=args.after_deploy)
+    if args.seed:
+        await initialize_data()
+    await engine.dispose()
+    print(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create missing tables and apply pending migrations.")
+    parser.add_argument("--seed", action="store_true", help="also seed the demo data where missing")
+    parser.add_argument("--after-deploy", action="store_true",
+                        help="also apply the migrations that wait until no worker runs the previous release")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+"""
+Move bookings from free-text showtimes to the showtimes table.
+
+Every distinct (movie, showtime string) in ``bookings`` becomes a Showtime
+row, bookings are pointed at it through ``showtime_id`` and the legacy
+column is dropped. Strings holding only a time ("14:00", as the old booking
+form sent) are anchored to the day the migration runs. The seat inventory,
+which was keyed by the same strings, is rebuilt per showtime from the
+bookings that now reference it.
+"""
+import logging
+from datetime import date, datetime, time
+from sqlalchemy import inspect, select, func, table, column, text
+
+from app.config import DEFAULT_SCREEN, DEFAULT_SCREEN_CAPACITY
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.models.showtime import Showtime
+from app.services.inventory import seat_label
+
+logger = logging.getLogger(__name__)
+
+LEGACY_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%H:%M")
+
+legacy_bookings = table(
+    "bookings",
+    column("id"),
+    column("movie_id"),
+    column("showtime"),
+    column("showtime_id"),
+    column("quantity"),
+)
+
+def parse_legacy_showtime(value, anchor):
+    """
+    Parse a free-text showtime, anchoring time-only values to ``anchor``.
+    """
+    for fmt in LEGACY_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip(), fmt)
+        except (ValueError, AttributeError):
+            continue
+        if fmt == "%H:%M":
+            return datetime.combine(anchor, parsed.time())
+        return parsed
+    logger.warning(f"Unparseable showtime {value!r}, anchoring it to {anchor} 00:00")
+    return datetime.combine(anchor, time())
+
+def backfill_showtimes(conn, anchor):
+    """
+    Create a showtime for each legacy string and point its bookings at it.
+    """
+    showtimes = Showtime.__table__
+    pairs = conn.execute(
+        select(legacy_bookings.c.movie_id, legacy_bookings.c.showtime)
+        .where(legacy_bookings.c.showtime_id.is_(None), legacy_bookings.c.movie_id.isnot(None))
+        .distinct()
+    ).all()
+
+    for movie_id, legacy in pairs:
+        starts_at = parse_legacy_showtime(legacy, anchor)
+        showtime_id = conn.scalar(
+            select(showtimes.c.id).where(
+                showtimes.c.movie_id == movie_id,
+                showtimes.c.screen == DEFAULT_SCREEN,
+                showtimes.c.starts_at == starts_at,
+            )
+        )
+        if showtime_id is None:
+            showtime_id = conn.execute(showtimes.insert().values(
+                movie_id=movie_id,
+                screen=DEFAULT_SCREEN,
+                starts_at=starts_at,
+                capacity=DEFAULT_SCREEN_CAPACITY,
+            )).inserted_primary_key[0]
+
+        matches_legacy = legacy_bookings.c.showtime.is_(None) if legacy is None else legacy_bookings.c.showtime == legacy
+        conn.execute(
+            legacy_bookings.update()
+            .where(legacy_bookings.c.movie_id == movie_id, matches_legacy)
+            .values(showtime_id=showtime_id)
+        )
+    logger.info(f"Backfilled {len(pairs)} showtimes from legacy bookings")
+
+def rebuild_inventory(conn):
+    """
+    Recreate the seat inventory tables keyed by showtime and re-seat every
+    booking in booking order.
+    """
+    Seat.__table__.drop(conn, checkfirst=True)
+    SeatInventory.__table__.drop(conn, checkfirst=True)
+    SeatInventory.__table__.create(conn)
+    Seat.__table__.create(conn)
+
+    bookings = Booking.__table__
+    showtimes = Showtime.__table__
+    booked = conn.execute(
+        select(showtimes.c.id, showtimes.c.capacity, func.sum(bookings.c.quantity))
+        .join(bookings, bookings.c.showtime_id == showtimes.c.id)
+        .group_by(showtimes.c.id, showtimes.c.capacity)
+    ).all()
+
+    for showtime_id, capacity, quantity in booked:
+        if quantity > capacity:
+            logger.warning(f"Showtime {showtime_id} is oversold ({quantity}/{capacity}), seating bookings in order")
+        inventory_id = conn.execute(SeatInventory.__table__.insert().values(
+            showtime_id=showtime_id,
+            capacity=capacity,
+            seats_available=max(0, capacity - quantity),
+        )).inserted_primary_key[0]
+
+        seats = [{"inventory_id": inventory_id, "label": seat_label(i), "booking_id": None} for i in range(capacity)]
+        next_seat = 0
+        for booking_id, booking_quantity in conn.execute(
+            select(bookings.c.id, bookings.c.quantity)
+            .where(bookings.c.showtime_id == showtime_id)
+            .order_by(bookings.c.id)
+        ):
+            for seat in seats[next_seat:next_seat + booking_quantity]:
+                seat["booking_id"] = booking_id
+            next_seat += booking_quantity
+        conn.execute(Seat.__table__.insert(), seats)
+
+def upgrade(conn, anchor=None):
+    inspector = inspect(conn)
+    booking_columns = {c["name"] for c in inspector.get_columns("bookings")}
+    if "showtime" not in booking_columns:
+        return
+
+    if "showtime_id" not in booking_columns:
+        conn.execute(text("ALTER TABLE bookings ADD COLUMN showtime_id INTEGER REFERENCES showtimes (id)"))
+    backfill_showtimes(conn, anchor or date.today())
+
+    conn.execute(text("ALTER TABLE bookings DROP COLUMN showtime"))
+    rebuild_inventory(conn)
@@ -0,0 +1,30 @@
+"""
+Replace the single-column booking indexes with (filter column, id) ones.
+
+The admin bookings view filters by user, movie or showtime and pages by id;
+composite indexes let each page be one index range scan. The old user and
+showtime_id indexes are prefixes of the new ones and are dropped.
+"""
+from sqlalchemy import inspect, text
+
+# The indexes as this migration left them; m007 later moves the user one to
+# bookings.user_id, so on newer schemas the username column is gone
+INDEXES = {
+    "ix_bookings_user_and_id": ("user", "id"),
+    "ix_bookings_movie_and_id": ("movie_id", "id"),
+    "ix_bookings_showtime_and_id": ("showtime_id", "id"),
+}
+OBSOLETE_INDEXES = ("ix_bookings_user", "ix_bookings_showtime_id")
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    columns = {c["name"] for c in inspector.get_columns("bookings")}
+    existing = {index["name"] for index in inspector.get_indexes("bookings")}
+    quote = conn.dialect.identifier_preparer.quote
+    for name, index_columns in INDEXES.items():
+        if name not in existing and columns.issuperset(index_columns):
+            conn.execute(text(f"CREATE INDEX {name} ON bookings ({', '.join(map(quote, index_columns))})"))
+
+    for name in OBSOLETE_INDEXES:
+        if name in existing:
+            conn.execute(text(f"DROP INDEX {name}"))
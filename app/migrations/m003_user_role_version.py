@@ -0,0 +1,9 @@
+"""
+Add users.role_version, the revocation counter carried in session claims.
+"""
+from sqlalchemy import inspect, text
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("users")}
+    if "role_version" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN role_version INTEGER NOT NULL DEFAULT 0"))
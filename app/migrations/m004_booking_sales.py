@@ -0,0 +1,17 @@
+"""
+Add bookings.created_at and fill the sales aggregate tables.
+
+Bookings made before created_at existed are dated to the migration.
+"""
+from sqlalchemy import inspect, text
+
+from app.services.sales import rebuild_statements
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("bookings")}
+    if "created_at" not in columns:
+        conn.execute(text("ALTER TABLE bookings ADD COLUMN created_at TIMESTAMP"))
+    conn.execute(text("UPDATE bookings SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+
+    for statement in rebuild_statements():
+        conn.execute(statement)
@@ -0,0 +1,7 @@
+"""
+Create the full-text search index for databases that predate it.
+"""
+from app.models.search import create_search_index
+
+def upgrade(conn):
+    create_search_index(conn)
@@ -0,0 +1,13 @@
+"""
+Add seats.hold_id for seats set aside by a seat hold.
+"""
+from sqlalchemy import inspect, text
+
+from app.models.inventory import Seat
+
+def upgrade(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("seats")}
+    if "hold_id" not in columns:
+        conn.execute(text("ALTER TABLE seats ADD COLUMN hold_id INTEGER"))
+    for index in Seat.__table__.indexes:
+        index.create(conn, checkfirst=True)
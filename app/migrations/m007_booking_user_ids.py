@@ -0,0 +1,52 @@
+"""
+Point bookings at their users by id instead of by username.
+
+bookings.user held a copy of the username: every per-user lookup compared
+strings, its (user, id) index was several times the size of an integer one,
+and renaming a user would have orphaned their bookings. This adds
+bookings.user_id, builds its (user_id, id) index and fills it in batches of
+MIGRATION_BATCH_SIZE rows, each in its own short transaction, catching up
+with bookings that workers still running the previous release insert
+meanwhile; a last pass runs with writes to bookings blocked. Every step
+checks what is already done, so an interrupted run picks up where it
+stopped. Bookings whose username matches no user are left with a NULL
+user_id and logged.
+
+bookings.user stays until m008_drop_booking_usernames, which runs after the
+deploy, once no worker writes it any more.
+"""
+import logging
+from sqlalchemy import select, func, table, column, text
+
+from app.migrations.online import table_columns, create_index, batched_update, locked_update
+from app.models.booking import Booking
+
+logger = logging.getLogger(__name__)
+
+ONLINE = True
+
+legacy_bookings = table("bookings", column("id"), column("user"), column("user_id"))
+users = table("users", column("id"), column("username"))
+
+owner = select(users.c.id).where(users.c.username == legacy_bookings.c.user).scalar_subquery()
+unowned = legacy_bookings.c.user_id.is_(None) & legacy_bookings.c.user.isnot(None)
+
+def warn_orphans(conn):
+    with conn.begin():
+        orphans = conn.scalar(select(func.count()).select_from(legacy_bookings).where(unowned))
+    if orphans:
+        logger.warning(f"{orphans} bookings name users that do not exist; their user_id is left NULL")
+
+def upgrade(conn):
+    columns = table_columns(conn, "bookings")
+    if "user" not in columns:
+        return
+
+    if "user_id" not in columns:
+        with conn.begin():
+            conn.execute(text("ALTER TABLE bookings ADD COLUMN user_id INTEGER REFERENCES users (id)"))
+    create_index(conn, next(index for index in Booking.__table__.indexes if index.name == "ix_bookings_user_id_and_id"))
+
+    batched_update(conn, legacy_bookings, {"user_id": owner}, where=unowned)
+    locked_update(conn, legacy_bookings, {"user_id": owner}, unowned)
+    warn_orphans(conn)
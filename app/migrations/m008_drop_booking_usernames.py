@@ -0,0 +1,29 @@
+"""
+Drop bookings.user, replaced by bookings.user_id in m007_booking_user_ids.
+
+Runs after the deploy (``python -m app.migrations --after-deploy``), once
+every worker runs code that no longer writes the username. The username
+index goes first, without blocking writes; bookings the previous release
+still created after m007 are backfilled, the last of them in the same
+transaction that drops the column, with writes to bookings blocked, so none
+loses its owner.
+"""
+from sqlalchemy import text
+
+from app.migrations.m007_booking_user_ids import legacy_bookings, owner, unowned, warn_orphans
+from app.migrations.online import table_columns, drop_index, batched_update, locked_update
+
+ONLINE = True
+AFTER_DEPLOY = True
+
+def upgrade(conn):
+    if "user" not in table_columns(conn, "bookings"):
+        return
+
+    drop_index(conn, "bookings", "ix_bookings_user_and_id")
+    batched_update(conn, legacy_bookings, {"user_id": owner}, where=unowned)
+    warn_orphans(conn)
+    quoted = conn.dialect.identifier_preparer.quote("user")
+    locked_update(conn, legacy_bookings, {"user_id": owner}, unowned, then=[
+        text(f"ALTER TABLE bookings DROP COLUMN {quoted}"),
+    ])
@@ -0,0 +1,33 @@
+"""
+Index the sales aggregates by revenue and fill the grand total row.
+
+The dashboard read its totals by summing movie_sales and sorted
+movie_sales and showtime_sales for the top rows. It now reads the single
+total_sales row and the first rows of the revenue indexes, which are built
+without blocking writes.
+
+Runs after the deploy (``python -m app.migrations --after-deploy``): the
+previous release does not update total_sales, so the row is computed from
+movie_sales once no worker runs it, with writes to movie_sales (and so
+bookings) blocked for that one statement. Until then the dashboard sums
+movie_sales as before.
+"""
+from sqlalchemy import delete, insert
+
+from app.migrations.online import create_index, lock_table
+from app.models.sales import MovieSales, ShowtimeSales, TotalSales
+from app.services.sales import MEASURES, movie_sales_total_query
+
+ONLINE = True
+AFTER_DEPLOY = True
+
+def upgrade(conn):
+    for model in (MovieSales, ShowtimeSales):
+        for index in model.__table__.indexes:
+            create_index(conn, index)
+
+    with conn.begin():
+        # Bookings update movie_sales and total_sales in one transaction
+        lock_table(conn, MovieSales.__tablename__)
+        conn.execute(delete(TotalSales))
+        conn.execute(insert(TotalSales).from_select(["id", *MEASURES], movie_sales_total_query()))
@@ -0,0 +1,41 @@
+"""
+Point seat holds and waitlist entries at their users by id.
+
+Both named their user by username only, so the booking promoted from a
+renamed user's waitlist entry belonged to nobody. This adds
+seat_holds.user_id and waitlist_entries.user_id, builds the
+(user_id, showtime_id) index and fills both in batches from the usernames,
+like m007_booking_user_ids.
+
+Runs before the deploy, since the new release writes the columns. Holds
+and entries the previous release still creates meanwhile are filled in by
+m011_finish_hold_waitlist_user_ids once it is gone.
+"""
+from sqlalchemy import select, table, column, text
+
+from app.migrations.online import table_columns, create_index, batched_update
+from app.models.waitlist import WaitlistEntry
+
+ONLINE = True
+
+users = table("users", column("id"), column("username"))
+legacy_tables = [
+    table(name, column("id"), column("user"), column("user_id"))
+    for name in ("seat_holds", "waitlist_entries")
+]
+
+def owner(legacy):
+    return select(users.c.id).where(users.c.username == legacy.c.user).scalar_subquery()
+
+def unowned(legacy):
+    return legacy.c.user_id.is_(None)
+
+def upgrade(conn):
+    for legacy in legacy_tables:
+        if "user_id" not in table_columns(conn, legacy.name):
+            with conn.begin():
+                conn.execute(text(f"ALTER TABLE {legacy.name} ADD COLUMN user_id INTEGER REFERENCES users (id)"))
+    create_index(conn, next(index for index in WaitlistEntry.__table__.indexes if index.name == "uq_waitlist_entries_user_id"))
+
+    for legacy in legacy_tables:
+        batched_update(conn, legacy, {"user_id": owner(legacy)}, where=unowned(legacy))
@@ -0,0 +1,17 @@
+"""
+Fill in the user_id of the seat holds and waitlist entries the previous
+release created after m010_hold_waitlist_user_ids ran.
+
+Runs after the deploy (``python -m app.migrations --after-deploy``), once no
+worker creates them without one, in a last pass with writes to each table
+blocked.
+"""
+from app.migrations.m010_hold_waitlist_user_ids import legacy_tables, owner, unowned
+from app.migrations.online import locked_update
+
+ONLINE = True
+AFTER_DEPLOY = True
+
+def upgrade(conn):
+    for legacy in legacy_tables:
+        locked_update(conn, legacy, {"user_id": owner(legacy)}, unowned(legacy))
@@ -0,0 +1,152 @@
+"""
+Tools for migrations that run against a live table.
+
+A migration module that sets ``ONLINE = True`` gets its connection outside of
+a transaction and opens short ones itself, so the tables it changes stay
+readable and writable while it runs and an interrupted run resumes where it
+stopped. Nothing here holds more than one batch of row locks at a time,
+except ``locked_update``, which blocks writes to a table for one short
+final pass.
+"""
+import logging
+import time
+from sqlalchemy import inspect, select, func, text
+from sqlalchemy.schema import CreateIndex
+
+from app.config import MIGRATION_BATCH_SIZE, MIGRATION_BATCH_PAUSE
+
+logger = logging.getLogger(__name__)
+
+def table_columns(conn, table_name):
+    with conn.begin():
+        return {column["name"] for column in inspect(conn).get_columns(table_name)}
+
+def table_indexes(conn, table_name):
+    with conn.begin():
+        return {index["name"] for index in inspect(conn).get_indexes(table_name)}
+
+def postgres_index_valid(conn, index_name):
+    """
+    Whether the PostgreSQL index ``index_name`` is usable: None if it does
+    not exist, False if a failed concurrent build left it INVALID.
+    """
+    with conn.begin():
+        return conn.scalar(
+            text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+            {"name": index_name},
+        )
+
+def execute_autocommit(conn, statement):
+    """
+    Run ``statement`` outside of a transaction, as CONCURRENTLY requires.
+    """
+    conn.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        conn.execute(text(statement))
+        conn.commit()
+    finally:
+        conn.execution_options(isolation_level=conn.default_isolation_level)
+
+def create_index(conn, index):
+    """
+    Build ``index`` unless it exists. On PostgreSQL the build runs
+    CONCURRENTLY, which does not block writes but cannot run inside a
+    transaction; an index a failed build left INVALID is dropped and built
+    again.
+    """
+    if conn.dialect.name == "postgresql":
+        valid = postgres_index_valid(conn, index.name)
+        if valid:
+            return
+        if valid is False:
+            logger.warning(f"Index {index.name} is invalid (an earlier build failed); rebuilding it")
+            execute_autocommit(conn, f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}")
+    elif index.name in table_indexes(conn, index.table.name):
+        return
+    started = time.perf_counter()
+    if conn.dialect.name == "postgresql":
+        statement = str(CreateIndex(index).compile(dialect=conn.dialect))
+        execute_autocommit(conn, statement.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1))
+    else:
+        with conn.begin():
+            index.create(conn)
+    logger.info(f"Built index {index.name} in {time.perf_counter() - started:.1f}s")
+
+def drop_index(conn, table_name, index_name):
+    """
+    Drop index ``index_name`` of ``table_name`` if it exists, CONCURRENTLY
+    on PostgreSQL so writes to the table go on meanwhile.
+    """
+    if index_name not in table_indexes(conn, table_name):
+        return
+    if conn.dialect.name == "postgresql":
+        execute_autocommit(conn, f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+    else:
+        with conn.begin():
+            conn.execute(text(f"DROP INDEX {index_name}"))
+
+def batched_update(conn, table, values, where=None, batch_size=None, pause=None):
+    """
+    Apply ``table.update().values(values)`` (restricted by ``where``) to
+    consecutive ranges of ``batch_size`` ids (MIGRATION_BATCH_SIZE by
+    default), committing after each range and sleeping ``pause`` seconds
+    (MIGRATION_BATCH_PAUSE) before the next. Ranging over the primary key
+    makes every batch an index range scan and guarantees progress even when
+    ``where`` leaves rows unmatched. Rows inserted meanwhile get ids past
+    the range, so it is extended until a pass finds none. Returns the rows
+    updated.
+
+    Writers that keep producing rows matching ``where`` can still add some
+    after this returns; finish with ``locked_update``.
+    """
+    batch_size = batch_size or MIGRATION_BATCH_SIZE
+    pause = MIGRATION_BATCH_PAUSE if pause is None else pause
+    with conn.begin():
+        low, high = conn.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+    if low is None:
+        return 0
+
+    updated = 0
+    started = time.perf_counter()
+    while True:
+        for start in range(low, high + 1, batch_size):
+            statement = table.update().values(values).where(table.c.id >= start, table.c.id < start + batch_size)
+            if where is not None:
+                statement = statement.where(where)
+            with conn.begin():
+                updated += conn.execute(statement).rowcount
+            logger.debug(f"Backfilled {table.name} ids {start}-{start + batch_size - 1} of {high}")
+            if pause:
+                time.sleep(pause)
+        # Catch up with the rows inserted while the last pass ran
+        with conn.begin():
+            latest = conn.scalar(select(func.max(table.c.id)))
+        if latest is None or latest <= high:
+            break
+        low, high = high + 1, latest
+    logger.info(f"Backfilled {updated} {table.name} rows in {time.perf_counter() - started:.1f}s")
+    return updated
+
+def lock_table(conn, table_name):
+    """
+    Block writes to ``table_name`` until the current transaction ends;
+    reads go on. SQLite allows one writer at a time, so there the
+    transaction's own first write holds the others off.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"LOCK TABLE {table_name} IN SHARE ROW EXCLUSIVE MODE"))
+
+def locked_update(conn, table, values, where, then=()):
+    """
+    Apply ``table.update().values(values).where(where)`` with writes to
+    ``table`` blocked, then run the ``then`` statements in the same
+    transaction. Meant for the few rows left after ``batched_update``, so
+    the lock is held briefly; reads go on meanwhile. Returns the rows
+    updated.
+    """
+    with conn.begin():
+        lock_table(conn, table.name)
+        updated = conn.execute(table.update().values(values).where(where)).rowcount
+        for statement in then:
+            conn.execute(statement)
+    return updated
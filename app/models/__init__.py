@@ -3,4 +3,10 @@ Import all models to make them available from the models package.
 """
 from app.models.user import User
 from app.models.movie import Movie
-from app.models.booking import Booking
\ No newline at end of file
+from app.models.booking import Booking
+from app.models.showtime import Showtime
+from app.models.inventory import SeatInventory, Seat, SeatHold
+from app.models.idempotency import IdempotencyKey
+from app.models.sales import MovieSales, ShowtimeSales, DailySales, TotalSales
+from app.models.search import create_search_index
+from app.models.waitlist import WaitlistQueue, WaitlistEntry, WaitlistDeparture
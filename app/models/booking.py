@@ -1,7 +1,8 @@
 """
 Booking model definition.
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -9,11 +10,20 @@ from app.database import Base
 class Booking(Base):
     """Booking model for storing ticket booking information."""
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Filter column first, id second: filtered pages seek by id
+        Index("ix_bookings_user_id_and_id", "user_id", "id"),
+        Index("ix_bookings_movie_and_id", "movie_id", "id"),
+        Index("ix_bookings_showtime_and_id", "showtime_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user = Column(String, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
     movie_id = Column(Integer, ForeignKey("movies.id"))
-    showtime = Column(String)
+    showtime_id = Column(Integer, ForeignKey("showtimes.id"))
     quantity = Column(Integer)
     total = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+    user = relationship("User")
     movie = relationship("Movie", backref="bookings")
+    showtime = relationship("Showtime")
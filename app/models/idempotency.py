@@ -0,0 +1,18 @@
+"""
+Idempotency key model definition.
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """Response recorded for a client-supplied key, replayed on retries."""
+    __tablename__ = "idempotency_keys"
+
+    user = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    # Hash of the request parameters; a key may not be reused for another request
+    fingerprint = Column(String, nullable=False)
+    status_code = Column(Integer)
+    location = Column(String)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,48 @@
+"""
+Seat inventory model definitions.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, CheckConstraint, Index
+
+from app.database import Base
+
+class SeatInventory(Base):
+    """Seat counter for one showtime."""
+    __tablename__ = "seat_inventory"
+    __table_args__ = (
+        CheckConstraint("seats_available >= 0", name="ck_seat_inventory_not_oversold"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    showtime_id = Column(Integer, ForeignKey("showtimes.id", ondelete="CASCADE"), nullable=False, unique=True)
+    capacity = Column(Integer, nullable=False)
+    seats_available = Column(Integer, nullable=False)
+
+class Seat(Base):
+    """Single seat in a showtime's seat map, held by at most one booking."""
+    __tablename__ = "seats"
+    __table_args__ = (
+        UniqueConstraint("inventory_id", "label", name="uq_seats_label"),
+        Index("ix_seats_inventory_booking", "inventory_id", "booking_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    inventory_id = Column(Integer, ForeignKey("seat_inventory.id", ondelete="CASCADE"), nullable=False)
+    label = Column(String, nullable=False)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), index=True)
+    # Set while the seat is held for a checkout (no foreign key: holds are
+    # deleted first and their seats released or booked in the same transaction)
+    hold_id = Column(Integer, index=True)
+
+class SeatHold(Base):
+    """Seats set aside for a user until they book or the hold expires."""
+    __tablename__ = "seat_holds"
+
+    id = Column(Integer, primary_key=True)
+    # Owner by id, so renaming the user keeps the hold theirs; the username
+    # is still written for the previous release
+    user_id = Column(Integer, ForeignKey("users.id"))
+    user = Column(String, nullable=False)
+    showtime_id = Column(Integer, ForeignKey("showtimes.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    # The sweeper scans this index for the oldest expired holds
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,61 @@
+"""
+Sales aggregate model definitions.
+
+Each table holds running totals of the bookings table for one grouping,
+kept up to date in the transaction that books or cancels. Keys are plain
+integers (no foreign keys) so aggregates never block movie changes. The
+revenue indexes let the dashboard read the top rows without sorting the
+table.
+"""
+from sqlalchemy import Column, Integer, Date, Index, event, inspect, text
+
+from app.database import Base
+
+class MovieSales(Base):
+    """Booking totals per movie."""
+    __tablename__ = "movie_sales"
+    __table_args__ = (Index("ix_movie_sales_revenue", "revenue"),)
+
+    movie_id = Column(Integer, primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    tickets = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+class ShowtimeSales(Base):
+    """Booking totals per showtime."""
+    __tablename__ = "showtime_sales"
+    __table_args__ = (Index("ix_showtime_sales_revenue", "revenue"),)
+
+    showtime_id = Column(Integer, primary_key=True)
+    movie_id = Column(Integer)
+    bookings = Column(Integer, nullable=False, default=0)
+    tickets = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+class DailySales(Base):
+    """Booking totals per day the bookings were made."""
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    tickets = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+class TotalSales(Base):
+    """
+    Booking totals over all bookings, in a single row with id 1. Bookings
+    only update the row, so it is created where its totals are known: with
+    the table on a database without bookings, by ``rebuild_sales`` or by
+    migration m009.
+    """
+    __tablename__ = "total_sales"
+
+    id = Column(Integer, primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    tickets = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+@event.listens_for(TotalSales.__table__, "after_create")
+def _start_total_sales(target, conn, **kw):
+    if not inspect(conn).has_table("bookings") or conn.scalar(text("SELECT 1 FROM bookings LIMIT 1")) is None:
+        conn.execute(target.insert().values(id=1, bookings=0, tickets=0, revenue=0))
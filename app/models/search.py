@@ -0,0 +1,54 @@
+"""
+Full-text search index over movie titles and directors.
+
+PostgreSQL uses a GIN index on a tsvector expression, which the search
+queries repeat so the planner can use it. SQLite uses an FTS5 table kept in
+sync with ``movies`` by triggers. Both are created together with the
+``movies`` table and by migration m005 on existing databases.
+"""
+from sqlalchemy import event, literal_column, text
+
+from app.models.movie import Movie
+
+# Document searched for each movie on PostgreSQL; written out literally (no
+# bound parameters) so it matches the indexed expression
+SEARCH_DOCUMENT = literal_column(
+    "to_tsvector('simple', coalesce(movies.title, '') || ' ' || coalesce(movies.director, ''))"
+)
+
+SEARCH_DDL = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS ix_movies_search ON movies "
+        "USING GIN (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(director, '')))",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS movie_search USING fts5("
+        "title, director, content='movies', content_rowid='id', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS movie_search_insert AFTER INSERT ON movies BEGIN "
+        "INSERT INTO movie_search (rowid, title, director) VALUES (new.id, new.title, new.director); END",
+        "CREATE TRIGGER IF NOT EXISTS movie_search_delete AFTER DELETE ON movies BEGIN "
+        "INSERT INTO movie_search (movie_search, rowid, title, director) "
+        "VALUES ('delete', old.id, old.title, old.director); END",
+        "CREATE TRIGGER IF NOT EXISTS movie_search_update AFTER UPDATE ON movies BEGIN "
+        "INSERT INTO movie_search (movie_search, rowid, title, director) "
+        "VALUES ('delete', old.id, old.title, old.director); "
+        "INSERT INTO movie_search (rowid, title, director) VALUES (new.id, new.title, new.director); END",
+        "INSERT INTO movie_search (movie_search) VALUES ('rebuild')",
+    ],
+}
+
+def create_search_index(conn):
+    """
+    Create (or rebuild) the search index for ``conn``'s dialect.
+    """
+    for statement in SEARCH_DDL.get(conn.dialect.name, []):
+        conn.execute(text(statement))
+
+@event.listens_for(Movie.__table__, "after_create")
+def _create_search_index(target, conn, **kw):
+    create_search_index(conn)
+
+@event.listens_for(Movie.__table__, "before_drop")
+def _drop_search_index(target, conn, **kw):
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("DROP TABLE IF EXISTS movie_search"))
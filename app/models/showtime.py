@@ -0,0 +1,30 @@
+"""
+Showtime model definition.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, backref
+
+from app.database import Base
+
+class Showtime(Base):
+    """A scheduled screening of a movie."""
+    __tablename__ = "showtimes"
+    __table_args__ = (
+        UniqueConstraint("movie_id", "screen", "starts_at", name="uq_showtimes_movie_screen_start"),
+        Index("ix_showtimes_movie_starts_at", "movie_id", "starts_at"),
+        Index("ix_showtimes_screen_starts_at", "screen", "starts_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), nullable=False)
+    screen = Column(String, nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    capacity = Column(Integer, nullable=False)
+    # movie_id cannot be nulled: deleting a movie leaves its showtimes to the
+    # ON DELETE CASCADE instead of updating them first
+    movie = relationship("Movie", backref=backref("showtimes", passive_deletes=True))
+
+    @property
+    def label(self):
+        """Start time as shown to users."""
+        return self.starts_at.strftime("%Y-%m-%d %H:%M")
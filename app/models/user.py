@@ -13,3 +13,5 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     password = Column(String)  
     is_admin = Column(Boolean, default=False)
+    # Bumped on every role change; sessions carrying an older value are revoked
+    role_version = Column(Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,56 @@
+"""
+Waitlist model definitions.
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+class WaitlistQueue(Base):
+    """
+    Sequence numbers of one showtime's waitlist: the last number handed out
+    and the last one served. A waiting entry's position is its number minus
+    ``head_seq``, less the entries between the two that left the queue
+    (counted by WaitlistDeparture).
+    """
+    __tablename__ = "waitlist_queues"
+
+    showtime_id = Column(Integer, ForeignKey("showtimes.id", ondelete="CASCADE"), primary_key=True)
+    next_seq = Column(Integer, nullable=False, default=0)
+    head_seq = Column(Integer, nullable=False, default=0)
+
+class WaitlistEntry(Base):
+    """A user waiting for seats in a sold-out showtime."""
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (
+        UniqueConstraint("user", "showtime_id", name="uq_waitlist_entries_user"),
+        # User first: also serves the lookup of a user's entries
+        Index("uq_waitlist_entries_user_id", "user_id", "showtime_id", unique=True),
+        # Promotion reads the front of the queue in order
+        Index("ix_waitlist_entries_showtime_seq", "showtime_id", "seq"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    showtime_id = Column(Integer, ForeignKey("showtimes.id", ondelete="CASCADE"), nullable=False)
+    # Owner by id, so a renamed user's promoted booking is still theirs; the
+    # username is still written for the previous release
+    user_id = Column(Integer, ForeignKey("users.id"))
+    user = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    showtime = relationship("Showtime")
+
+class WaitlistDeparture(Base):
+    """
+    One node of a showtime's Fenwick tree over sequence numbers, counting
+    entries that left the queue before being served: the entries that left
+    with a number up to ``seq`` are the sum of O(log n) nodes, and a leave
+    adds one to O(log n) nodes.
+    """
+    __tablename__ = "waitlist_departures"
+
+    showtime_id = Column(Integer, ForeignKey("showtimes.id", ondelete="CASCADE"), primary_key=True)
+    node = Column(Integer, primary_key=True, autoincrement=False)
+    departed = Column(Integer, nullable=False, default=0)
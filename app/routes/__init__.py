@@ -4,4 +4,7 @@ Import all route modules to make them available from the routes package.
 from app.routes.auth import router as auth_router
 from app.routes.movies import router as movies_router
 from app.routes.bookings import router as bookings_router
-from app.routes.admin import router as admin_router
\ No newline at end of file
+from app.routes.admin import router as admin_router
+from app.routes.metrics import router as metrics_router
+from app.routes.api import router as api_router
+from app.routes.static import router as static_router
@@ -1,28 +1,42 @@
 
-from fastapi import APIRouter, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, joinedload
+
+import io
+from typing import Optional
+from urllib.parse import urlencode
+from fastapi import APIRouter, Request, Form, Query, Depends, HTTPException, UploadFile, File
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
+from app.database import get_db, get_read_db, stick_to_primary
+from app.middleware.metrics import TimedTemplates
 from app.models.movie import Movie
-from app.models.booking import Booking
-from app.models.user import User
 from app.dependencies.auth import require_admin
-from app.config import TEMPLATES_DIR
+from app.dependencies.filters import BookingFilters
+from app.services.bookings import fetch_booking_page, export_bookings
+from app.services.catalog import catalog_cache
+from app.services.movie_import import import_movies
+from app.services.movies import MovieHasBookings, create_movie, edit_movie, remove_movie
+from app.services.sales import sales_dashboard
+from app.services.principals import Principal, set_user_role
+from app.config import TEMPLATES_DIR, ADMIN_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.assets import assets
 
 router = APIRouter(prefix="/admin")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates = TimedTemplates(directory=TEMPLATES_DIR)
+templates.env.globals["asset_url"] = assets.url
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
 
 @router.get("/movies", response_class=HTMLResponse)
 async def admin_movies(
     request: Request,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin_user: Principal = Depends(require_admin)
 ):
    
-    movies = db.query(Movie).all()
+    movies = (await db.execute(select(Movie))).scalars().all()
     return templates.TemplateResponse("admin_movies.html", {
         "request": request,
         "movies": movies,
@@ -33,7 +47,7 @@ async def admin_movies(
 @router.get("/movies/add", response_class=HTMLResponse)
 async def add_movie_form(
     request: Request,
-    admin_user: User = Depends(require_admin)
+    admin_user: Principal = Depends(require_admin)
 ):
   
     return templates.TemplateResponse("admin_add_movie.html", {
@@ -51,12 +65,13 @@ async def add_movie(
     rating: int = Form(..., ge=1, le=10),
     format: str = Form(...),
     price: int = Form(..., gt=0),
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
 ):
    
     try:
-        movie = Movie(
+        await create_movie(
+            db,
             title=title,
             year=year,
             director=director,
@@ -64,22 +79,40 @@ async def add_movie(
             format=format,
             price=price
         )
-        db.add(movie)
-        db.commit()
+        stick_to_primary(request)
         return RedirectResponse(url="/admin/movies", status_code=200)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Movie already exists")
 
+@router.post("/movies/import")
+async def import_movies_upload(
+    request: Request,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|json)$"),
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    """
+    Bulk import movies from an uploaded CSV or JSON (array or JSON Lines) file,
+    upserting on title. Returns a report with per-row errors.
+    """
+    if format is None:
+        format = "json" if (file.filename or "").endswith((".json", ".jsonl", ".ndjson")) else "csv"
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    report = await import_movies(db, stream, format=format)
+    stick_to_primary(request)
+    return JSONResponse(report.summary())
+
 @router.get("/movies/{id}/edit", response_class=HTMLResponse)
 async def edit_movie_form(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
 ):
    
-    movie = db.query(Movie).filter(Movie.id == id).first()
+    movie = await db.get(Movie, id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     return templates.TemplateResponse("edit_movie.html", {
@@ -99,72 +132,130 @@ async def update_movie(
     rating: int = Form(..., ge=1, le=10),
     format: str = Form(...),
     price: int = Form(..., gt=0),
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
 ):
    
-    movie = db.query(Movie).filter(Movie.id == id).first()
+    movie = await db.get(Movie, id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
     try:
-        movie.title = title
-        movie.year = year
-        movie.director = director
-        movie.rating = rating
-        movie.format = format
-        movie.price = price
-        db.commit()
+        await edit_movie(
+            db,
+            movie,
+            title=title,
+            year=year,
+            director=director,
+            rating=rating,
+            format=format,
+            price=price
+        )
+        stick_to_primary(request)
         return RedirectResponse(url="/admin/movies", status_code=303)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Movie title already exists")
 
 @router.post("/movies/{id}/delete")
 async def delete_movie(
     request: Request,
     id: int,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
 ):
     """
     Delete a movie.
     """
-    movie = db.query(Movie).filter(Movie.id == id).first()
+    movie = await db.get(Movie, id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    db.delete(movie)
-    db.commit()
+    try:
+        await remove_movie(db, movie)
+    except MovieHasBookings:
+        raise HTTPException(status_code=409, detail="Movie has bookings")
+    stick_to_primary(request)
+    return RedirectResponse(url="/admin/movies", status_code=303)
+
+@router.post("/users/{username}/role")
+async def update_user_role(
+    request: Request,
+    username: str,
+    is_admin: bool = Form(...),
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    """
+    Grant or revoke admin rights; the user's existing sessions lose their
+    admin claims immediately.
+    """
+    if not await set_user_role(db, username, is_admin):
+        raise HTTPException(status_code=404, detail="User not found")
+    stick_to_primary(request)
     return RedirectResponse(url="/admin/movies", status_code=303)
 
 @router.get("/bookings", response_class=HTMLResponse)
 async def admin_bookings(
     request: Request,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    after: int = Query(0, ge=0),
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: BookingFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    admin_user: Principal = Depends(require_admin)
 ):
     
-    bookings = (
-        db.query(Booking)
-        .options(joinedload(Booking.movie))
-        .order_by(Booking.id)
-        .all()
-    )
-    
-    booking_data = []
-    for booking in bookings:
-        booking_data.append({
-            "user": booking.user,
-            "movie": booking.movie.title if booking.movie else "Unknown",
-            "showtime": booking.showtime,
-            "quantity": booking.quantity,
-            "total": booking.total
-        })
+    # The page comes from a replica; the catalog cache only reloads (from the
+    # primary, so it never caches a lagging catalog) after a movie change
+    bookings, next_after = await fetch_booking_page(read_db, filters, after=after, limit=limit)
+    next_url = None
+    if next_after is not None:
+        next_url = "/admin/bookings?" + urlencode({**filters.params(), "after": next_after, "limit": limit})
     
     return templates.TemplateResponse("admin_bookings.html", {
         "request": request,
-        "bookings": booking_data,
+        "bookings": bookings,
+        "movies": (await catalog_cache.get(db)).movies,
+        "filters": filters,
+        "next_url": next_url,
+        "first_url": "/admin/bookings?" + urlencode(filters.params()) if after else None,
+        "export_query": urlencode(filters.params()),
+        "user": request.session.get("user"),
+        "is_admin": True
+    })
+
+@router.get("/bookings/export")
+async def export_admin_bookings(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    filters: BookingFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    """
+    Stream all bookings matching the admin filters as CSV or NDJSON.
+    """
+    filename = f"bookings.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else EXPORT_MEDIA_TYPES[format]
+    return StreamingResponse(
+        export_bookings(db.bind, filters, format=format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/sales", response_class=HTMLResponse)
+async def admin_sales(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    """
+    Revenue dashboard, served from the sales aggregate tables.
+    """
+    return templates.TemplateResponse("admin_sales.html", {
+        "request": request,
+        "sales": await sales_dashboard(db),
         "user": request.session.get("user"),
         "is_admin": True
     })
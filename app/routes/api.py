@@ -0,0 +1,214 @@
+"""
+Versioned JSON API for the mobile app and kiosks.
+
+Mirrors the pages - catalog, booking, booking history, cancellation and the
+admin views - on top of the same services, authenticated by the same
+session cookie (``POST /login``). Responses are validated against Pydantic
+models built from column projections and serialized with orjson.
+"""
+from typing import Optional
+from urllib.parse import urlencode
+from fastapi import APIRouter, Request, Header, Query, Depends, HTTPException
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+
+from app.database import get_db, get_read_db, stick_to_primary
+from app.dependencies.auth import require_login, require_admin, session_user_id
+from app.dependencies.filters import BookingFilters
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.schemas.booking import BookingRequest, BookingSummary, BookingPage, RoleUpdate
+from app.schemas.movie import MovieRecord, MovieSummary, MovieDetail
+from app.schemas.sales import SalesReport
+from app.services.bookings import user_booking_rows, fetch_booking_page, fetch_user_bookings, book_seats, cancel_bookings
+from app.services.catalog import CATALOG_COLUMNS, catalog_cache
+from app.services.idempotency import MAX_KEY_LENGTH
+from app.services.movies import MovieHasBookings, create_movie, edit_movie, remove_movie
+from app.services.principals import Principal, set_user_role
+from app.services.sales import sales_dashboard
+from app.services.showtimes import showtime_availability
+from app.config import ADMIN_PAGE_SIZE, BOOKING_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/api/v1", default_response_class=ORJSONResponse)
+
+@router.get("/movies", response_model=list[MovieSummary])
+async def list_movies(db: AsyncSession = Depends(get_db)):
+    """
+    The movie catalog, served from the catalog cache.
+    """
+    return (await catalog_cache.get(db)).movies
+
+@router.get("/movies/{movie_id}", response_model=MovieDetail)
+async def get_movie(movie_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    A movie with its upcoming showtimes and their available seats.
+    """
+    movie = (await db.execute(select(*CATALOG_COLUMNS).filter(Movie.id == movie_id))).mappings().first()
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return {**movie, "showtimes": await showtime_availability(db, movie_id)}
+
+@router.get("/bookings", response_model=list[BookingSummary], dependencies=[Depends(require_login)])
+async def list_bookings(
+    request: Request,
+    response: Response,
+    before: Optional[int] = Query(None, gt=0),
+    limit: int = Query(BOOKING_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    One page of the current user's bookings, newest first. The next (older)
+    page is linked from the Link header.
+    """
+    bookings, next_before = await fetch_user_bookings(
+        db, await session_user_id(request, db), before=before, limit=limit
+    )
+    if next_before is not None:
+        response.headers["Link"] = f'<{router.prefix}/bookings?{urlencode({"before": next_before, "limit": limit})}>; rel="next"'
+    return bookings
+
+@router.get("/bookings/{booking_id}", response_model=BookingSummary, dependencies=[Depends(require_login)])
+async def get_booking(request: Request, booking_id: int, db: AsyncSession = Depends(get_read_db)):
+    booking = (await db.execute(
+        user_booking_rows(await session_user_id(request, db)).filter(Booking.id == booking_id)
+    )).first()
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return booking
+
+@router.post("/bookings", response_model=BookingSummary, status_code=201, dependencies=[Depends(require_login)])
+async def create_booking(
+    request: Request,
+    response: Response,
+    body: BookingRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_KEY_LENGTH),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Book seats, from a seat hold if ``hold_id`` is given. A retry with the
+    same Idempotency-Key header is answered with 303 See Other pointing at
+    the booking the first attempt created.
+    """
+    booking, replay = await book_seats(
+        db, request.session["user"], await session_user_id(request, db),
+        body.movie_id, body.showtime_id, body.quantity, body.hold_id,
+        idempotency_key=idempotency_key, path=request.url.path, location=f"{router.prefix}/bookings/{{id}}",
+    )
+    if replay:
+        return RedirectResponse(url=replay.location, status_code=replay.status_code)
+    stick_to_primary(request)
+    response.headers["Location"] = f"{router.prefix}/bookings/{booking.id}"
+    return {
+        "id": booking.id,
+        "movie_id": booking.movie_id,
+        "movie": booking.showtime.movie.title,
+        "showtime_id": booking.showtime_id,
+        "starts_at": booking.showtime.starts_at,
+        "screen": booking.showtime.screen,
+        "quantity": booking.quantity,
+        "total": booking.total,
+    }
+
+@router.delete("/bookings/{booking_id}", status_code=204, dependencies=[Depends(require_login)])
+async def cancel_booking(request: Request, booking_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Cancel one of the current user's bookings.
+    """
+    booking = await db.scalar(select(Booking).filter(
+        Booking.id == booking_id,
+        Booking.user_id == await session_user_id(request, db)
+    ))
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    await cancel_bookings(db, [booking])
+    stick_to_primary(request)
+    return Response(status_code=204)
+
+@router.get("/admin/movies", response_model=list[MovieSummary])
+async def admin_list_movies(db: AsyncSession = Depends(get_read_db), admin_user: Principal = Depends(require_admin)):
+    return (await db.execute(select(*CATALOG_COLUMNS).order_by(Movie.id))).all()
+
+@router.post("/admin/movies", response_model=MovieSummary, status_code=201)
+async def admin_add_movie(
+    request: Request,
+    record: MovieRecord,
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    try:
+        movie = await create_movie(db, **record.model_dump())
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Movie already exists")
+    stick_to_primary(request)
+    return movie
+
+@router.put("/admin/movies/{id}", response_model=MovieSummary)
+async def admin_update_movie(
+    request: Request,
+    id: int,
+    record: MovieRecord,
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    movie = await db.get(Movie, id)
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    try:
+        await edit_movie(db, movie, **record.model_dump())
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Movie title already exists")
+    stick_to_primary(request)
+    return movie
+
+@router.delete("/admin/movies/{id}", status_code=204)
+async def admin_delete_movie(
+    request: Request,
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    movie = await db.get(Movie, id)
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    try:
+        await remove_movie(db, movie)
+    except MovieHasBookings:
+        raise HTTPException(status_code=409, detail="Movie has bookings")
+    stick_to_primary(request)
+    return Response(status_code=204)
+
+@router.put("/admin/users/{username}/role", status_code=204)
+async def admin_update_user_role(
+    request: Request,
+    username: str,
+    role: RoleUpdate,
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    if not await set_user_role(db, username, role.is_admin):
+        raise HTTPException(status_code=404, detail="User not found")
+    stick_to_primary(request)
+    return Response(status_code=204)
+
+@router.get("/admin/bookings", response_model=BookingPage)
+async def admin_list_bookings(
+    after: int = Query(0, ge=0),
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: BookingFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    admin_user: Principal = Depends(require_admin)
+):
+    """
+    One page of bookings matching the admin filters; pass ``next_after`` as
+    ``after`` for the next page.
+    """
+    bookings, next_after = await fetch_booking_page(db, filters, after=after, limit=limit)
+    return {"bookings": bookings, "next_after": next_after}
+
+@router.get("/admin/sales", response_model=SalesReport)
+async def admin_sales(db: AsyncSession = Depends(get_read_db), admin_user: Principal = Depends(require_admin)):
+    return SalesReport.model_validate(await sales_dashboard(db))
@@ -4,18 +4,29 @@ Authentication routes for user registration and login.
 import logging
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from app.database import get_db
+from app.middleware.metrics import TimedTemplates
 from app.models.user import User
+from app.services.passwords import HasherOverloaded, password_hasher
+from app.services.principals import Principal, principal_cache, session_claims
 from app.config import TEMPLATES_DIR
+from app.utils.assets import assets
 
 router = APIRouter()
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates = TimedTemplates(directory=TEMPLATES_DIR)
+templates.env.globals["asset_url"] = assets.url
 logger = logging.getLogger(__name__)
 
+def busy_response():
+    """
+    Response for when password hashing is shedding load.
+    """
+    return HTMLResponse("Server busy, please try again", status_code=503, headers={"Retry-After": "1"})
+
 @router.get("/register", response_class=HTMLResponse)
 async def register_get(request: Request):
     """
@@ -28,19 +39,21 @@ async def register_post(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Process the registration form submission.
     """
     try:
-        user = User(username=username, password=password)  
+        user = User(username=username, password=await password_hasher.hash(password))
         db.add(user)
-        db.commit()
+        await db.commit()
         return RedirectResponse(url="/login", status_code=303)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         return HTMLResponse("Username already exists", status_code=400)
+    except HasherOverloaded:
+        return busy_response()
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_get(request: Request):
@@ -54,17 +67,26 @@ async def login_post(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Process the login form submission.
     """
-    user = db.query(User).filter(User.username == username).first()
-    if not user or password != user.password:  
-        return HTMLResponse("Invalid credentials", status_code=400)
+    user = await db.scalar(select(User).filter(User.username == username))
+    try:
+        if not user or not await password_hasher.verify(password, user.password):
+            return HTMLResponse("Invalid credentials", status_code=400)
+        if password_hasher.needs_rehash(user.password):
+            # Upgrade legacy plaintext rows and hashes of an older cost
+            user.password = await password_hasher.hash(password)
+            await db.commit()
+            logger.debug(f"Rehashed password for user {username}")
+    except HasherOverloaded:
+        return busy_response()
     
-    request.session["user"] = username
-    request.session["is_admin"] = user.is_admin  
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    request.session.update(session_claims(principal))
     logger.debug(f"User {username} logged in. Admin: {user.is_admin}")
     return RedirectResponse(url="/", status_code=303)
 
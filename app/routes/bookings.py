@@ -1,84 +1,217 @@
 
-from fastapi import APIRouter, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+from fastapi import APIRouter, Request, Form, Query, Depends, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.database import get_db
+from app.database import get_db, get_read_db, stick_to_primary
+from app.middleware.metrics import TimedTemplates
 from app.models.movie import Movie
 from app.models.booking import Booking
-from app.dependencies.auth import require_login
+from app.models.inventory import SeatHold
+from app.models.showtime import Showtime
+from app.dependencies.auth import require_login, session_user_id
+from app.services.availability import announce_availability, availability_events, availability_feed
+from app.services.holds import create_hold, release_hold
+from app.services.idempotency import MAX_KEY_LENGTH, idempotency_store, request_fingerprint
+from app.services.bookings import fetch_user_bookings, book_seats, cancel_bookings
+from app.services.history import history_summary
+from app.services.showtimes import bookable_showtime, showtime_availability
+from app.services.waitlist import AlreadyWaiting, SeatsAvailable, join_waitlist, leave_waitlist, waitlist_entries
 from app.config import TEMPLATES_DIR
+from app.utils.assets import assets
 
 router = APIRouter()
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates = TimedTemplates(directory=TEMPLATES_DIR)
+templates.env.globals["asset_url"] = assets.url
 
 @router.get("/book/{movie_id}", response_class=HTMLResponse)
 async def book_movie(
     request: Request,
     movie_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
    
     if not require_login(request):
         return RedirectResponse(url="/login", status_code=303)
     
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
+    movie = await db.get(Movie, movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
     return templates.TemplateResponse("book.html", {
         "request": request,
         "movie": movie,
+        "showtimes": await showtime_availability(db, movie_id),
+        # Resubmitting this form (double click, retry) replays the first booking
+        "idempotency_key": uuid4().hex,
         "user": request.session.get("user"),
         "is_admin": request.session.get("is_admin", False)
     })
 
+@router.get("/book/{movie_id}/availability")
+async def book_movie_availability(
+    request: Request,
+    movie_id: int,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Server-sent events with the seats left in each upcoming showtime of the
+    movie: all of them first, then whichever change.
+    """
+    if not require_login(request):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not await db.get(Movie, movie_id):
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    if availability_feed.full:
+        raise HTTPException(status_code=503, detail="Too many listeners, try again later", headers={"Retry-After": "5"})
+    # The stream may stay open for hours; its connection goes back to the pool now
+    await db.close()
+
+    async def read_snapshot():
+        try:
+            return {row.id: row.seats_available for row in await showtime_availability(db, movie_id)}
+        finally:
+            await db.close()
+
+    return StreamingResponse(
+        availability_events(movie_id, read_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/hold")
+async def create_seat_hold(
+    request: Request,
+    movie_id: int = Form(...),
+    showtime_id: int = Form(...),
+    quantity: int = Form(..., gt=0),
+    idempotency_key: Optional[str] = Form(None, max_length=MAX_KEY_LENGTH),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hold seats for SEAT_HOLD_MINUTES while the user checks out.
+    """
+    if not require_login(request):
+        return RedirectResponse(url="/login", status_code=303)
+
+    user = request.session["user"]
+    key = idempotency_key or request.headers.get("Idempotency-Key")
+    if key and (replay := await idempotency_store.claim(
+        db, user, key, request_fingerprint(request.url.path, movie_id, showtime_id, quantity)
+    )):
+        return RedirectResponse(url=replay.location, status_code=replay.status_code)
+
+    await bookable_showtime(db, movie_id, showtime_id)
+    hold = await create_hold(db, user, await session_user_id(request, db), showtime_id, quantity)
+    location = f"/hold/{hold.id}"
+    if key:
+        await idempotency_store.complete(db, user, key, 303, location)
+    else:
+        await db.commit()
+    await announce_availability(db, [showtime_id])
+    stick_to_primary(request)
+    return RedirectResponse(url=location, status_code=303)
+
+@router.get("/hold/{hold_id}", response_class=HTMLResponse)
+async def view_seat_hold(
+    request: Request,
+    hold_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Checkout page for a hold.
+    """
+    if not require_login(request):
+        return RedirectResponse(url="/login", status_code=303)
+
+    hold = await db.scalar(select(SeatHold).filter(
+        SeatHold.id == hold_id,
+        SeatHold.user_id == await session_user_id(request, db),
+        SeatHold.expires_at > datetime.now(),
+    ))
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found or expired")
+    showtime = await db.scalar(
+        select(Showtime).options(joinedload(Showtime.movie)).filter(Showtime.id == hold.showtime_id)
+    )
+    return templates.TemplateResponse("hold.html", {
+        "request": request,
+        "hold": hold,
+        "showtime": showtime,
+        "movie": showtime.movie,
+        "idempotency_key": uuid4().hex,
+        "user": request.session.get("user"),
+        "is_admin": request.session.get("is_admin", False)
+    })
+
+@router.post("/hold/{hold_id}/release")
+async def release_seat_hold(
+    request: Request,
+    hold_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Give the held seats back before the hold expires.
+    """
+    if not require_login(request):
+        return RedirectResponse(url="/login", status_code=303)
+
+    await release_hold(db, hold_id, await session_user_id(request, db))
+    stick_to_primary(request)
+    return RedirectResponse(url="/", status_code=303)
+
 @router.post("/book")
 async def create_booking(
     request: Request,
     movie_id: int = Form(...),
-    showtime: str = Form(...),
+    showtime_id: int = Form(...),
     quantity: int = Form(..., gt=0),
-    db: Session = Depends(get_db)
+    hold_id: Optional[int] = Form(None),
+    idempotency_key: Optional[str] = Form(None, max_length=MAX_KEY_LENGTH),
+    db: AsyncSession = Depends(get_db)
 ):
     
     if not require_login(request):
         return RedirectResponse(url="/login", status_code=303)
-    
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
-    
-    total_amount = movie.price * quantity
-    booking = Booking(
-        user=request.session["user"],
-        movie_id=movie_id,
-        showtime=showtime,
-        quantity=quantity,
-        total=total_amount
+
+    booking, replay = await book_seats(
+        db, request.session["user"], await session_user_id(request, db), movie_id, showtime_id, quantity, hold_id,
+        idempotency_key=idempotency_key or request.headers.get("Idempotency-Key"), path=request.url.path,
     )
-    
-    db.add(booking)
-    db.commit()
+    if replay:
+        return RedirectResponse(url=replay.location, status_code=replay.status_code)
+    stick_to_primary(request)
     return RedirectResponse(url="/bookings", status_code=303)
 
 @router.get("/bookings", response_class=HTMLResponse)
-async def view_bookings(request: Request, db: Session = Depends(get_db)):
-  
+async def view_bookings(
+    request: Request,
+    before: Optional[int] = Query(None, gt=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    The user's bookings newest first, a page at a time, under a summary of
+    all of them.
+    """
     if not require_login(request):
         return RedirectResponse(url="/login", status_code=303)
-    
-    bookings = (
-        db.query(Booking)
-        .options(joinedload(Booking.movie))
-        .filter(Booking.user == request.session["user"])
-        .all()
-    )
-    
+
+    user_id = await session_user_id(request, db)
+    bookings, next_before = await fetch_user_bookings(db, user_id, before=before)
     return templates.TemplateResponse("bookings.html", {
         "request": request,
         "bookings": bookings,
+        "summary": await history_summary(db, user_id),
+        "next_url": f"/bookings?before={next_before}" if next_before else None,
+        "first_url": "/bookings" if before else None,
+        "waitlist": await waitlist_entries(db, user_id),
         "user": request.session.get("user"),
         "is_admin": request.session.get("is_admin", False)
     })
@@ -87,15 +220,61 @@ async def view_bookings(request: Request, db: Session = Depends(get_db)):
 async def cancel_booking(
     request: Request,
     booking_id: int = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
    
     if not require_login(request):
         return RedirectResponse(url="/login", status_code=303)
     
-    db.query(Booking).filter(
+    booking = await db.scalar(select(Booking).filter(
         Booking.id == booking_id,
-        Booking.user == request.session["user"]
-    ).delete()
-    db.commit()
+        Booking.user_id == await session_user_id(request, db)
+    ))
+    if booking:
+        await cancel_bookings(db, [booking])
+        stick_to_primary(request)
+    return RedirectResponse(url="/bookings", status_code=303)
+
+@router.post("/waitlist")
+async def join_showtime_waitlist(
+    request: Request,
+    movie_id: int = Form(...),
+    showtime_id: int = Form(...),
+    quantity: int = Form(..., gt=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Wait for seats in a sold-out showtime; they are booked automatically
+    when enough come back.
+    """
+    if not require_login(request):
+        return RedirectResponse(url="/login", status_code=303)
+
+    await bookable_showtime(db, movie_id, showtime_id)
+    try:
+        await join_waitlist(db, request.session["user"], await session_user_id(request, db), showtime_id, quantity)
+    except SeatsAvailable:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Seats are still available, book them instead")
+    except (AlreadyWaiting, IntegrityError):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="You are already on the waitlist for this showtime")
+    await db.commit()
+    stick_to_primary(request)
+    return RedirectResponse(url="/bookings", status_code=303)
+
+@router.post("/waitlist/{entry_id}/leave")
+async def leave_showtime_waitlist(
+    request: Request,
+    entry_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stop waiting for a showtime.
+    """
+    if not require_login(request):
+        return RedirectResponse(url="/login", status_code=303)
+
+    await leave_waitlist(db, entry_id, await session_user_id(request, db))
+    stick_to_primary(request)
     return RedirectResponse(url="/bookings", status_code=303)
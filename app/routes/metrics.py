@@ -0,0 +1,76 @@
+"""
+Prometheus metrics endpoint.
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database import engine, pool_status, replicas
+from app.middleware.admission import admission_stats
+from app.middleware.metrics import registry
+from app.services.availability import availability_feed
+from app.services.history import history_summaries
+from app.services.principals import principal_cache
+
+router = APIRouter()
+
+def principal_cache_metrics():
+    return [
+        ("principal_cache_hits_total", "counter", "Principal cache hits.", [({}, principal_cache.hits)]),
+        ("principal_cache_misses_total", "counter", "Principal cache misses.", [({}, principal_cache.misses)]),
+        ("principal_cache_entries", "gauge", "Principals currently cached.", [({}, len(principal_cache.entries))]),
+    ]
+
+def history_summary_metrics():
+    return [
+        ("booking_summary_cache_hits_total", "counter", "Booking summary cache hits.", [({}, history_summaries.hits)]),
+        ("booking_summary_cache_misses_total", "counter", "Booking summary cache misses.",
+         [({}, history_summaries.misses)]),
+        ("booking_summary_cache_entries", "gauge", "Booking summaries currently cached.",
+         [({}, len(history_summaries.entries))]),
+    ]
+
+def pool_metrics():
+    # Scraping must not be what creates the engines
+    engines = [("primary", engine)] if engine.created else []
+    engines += [(f"replica{number}", replica) for number, replica in enumerate(replicas.engines or (), 1)]
+    pools = [({"database": name}, status) for name, pool_engine in engines if (status := pool_status(pool_engine))]
+    if not pools:
+        return []
+    return [
+        ("db_pool_size", "gauge", "Connections the pool keeps open.",
+         [(labels, status["size"]) for labels, status in pools]),
+        ("db_pool_checked_out", "gauge", "Connections currently checked out.",
+         [(labels, status["checked_out"]) for labels, status in pools]),
+        ("db_pool_overflow", "gauge", "Connections open beyond the pool size.",
+         [(labels, status["overflow"]) for labels, status in pools]),
+        ("db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up waiting for a connection.",
+         [(labels, status["timeouts"]) for labels, status in pools]),
+        ("db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a connection.",
+         [(labels, status["wait"]) for labels, status in pools]),
+    ]
+
+def admission_metrics():
+    return [
+        ("admission_in_flight", "gauge", "Admission-controlled requests in flight.",
+         [({"rule": rule}, count) for rule, count in sorted(admission_stats.in_flight.items())]),
+        ("admission_rejected_total", "counter", "Requests turned away by admission control.",
+         [({"rule": rule, "reason": reason}, count) for (rule, reason), count in sorted(admission_stats.rejected.items())]),
+    ]
+
+def availability_metrics():
+    return [
+        ("availability_subscribers", "gauge", "Open seat availability streams.",
+         [({}, availability_feed.subscribers)]),
+        ("availability_updates_published_total", "counter", "Seat availability updates published.",
+         [({}, availability_feed.published)]),
+    ]
+
+registry.add_collector(principal_cache_metrics)
+registry.add_collector(history_summary_metrics)
+registry.add_collector(pool_metrics)
+registry.add_collector(admission_metrics)
+registry.add_collector(availability_metrics)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,23 +1,76 @@
 
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from urllib.parse import urlencode
+from fastapi import APIRouter, Request, Query, Depends
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models.movie import Movie
+from app.database import get_db, get_read_db
+from app.dependencies.filters import MovieFilters
+from app.middleware.metrics import TimedTemplates
+from app.services.catalog import catalog_cache
+from app.services.search import search_movies, suggestion_cache
+from app.utils.http import http_date, is_not_modified
 from app.config import TEMPLATES_DIR
+from app.utils.assets import assets
 
 router = APIRouter()
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates = TimedTemplates(directory=TEMPLATES_DIR)
+templates.env.globals["asset_url"] = assets.url
 
 @router.get("/", response_class=HTMLResponse)
-async def home(request: Request, db: Session = Depends(get_db)):
+async def home(request: Request, db: AsyncSession = Depends(get_db)):
    
-    movies = db.query(Movie).all()
+    # Served from the catalog cache; the session only connects on a miss and
+    # uses the primary, so a lagging replica's catalog is never cached
+    catalog = await catalog_cache.get(db)
+    user = request.session.get("user")
+    is_admin = request.session.get("is_admin", False)
+
+    etag = catalog.etag_for(user, is_admin)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(catalog.last_modified),
+        "Cache-Control": "private, no-cache",
+    }
+    if is_not_modified(request, etag, catalog.last_modified):
+        return Response(status_code=304, headers=headers)
+
     return templates.TemplateResponse("index.html", {
         "request": request,
-        "movies": movies,
-        "user": request.session.get("user"), 
+        "catalog": catalog,
+        "user": user, 
+        "is_admin": is_admin
+    }, headers=headers)
+
+@router.get("/search", response_class=HTMLResponse)
+async def search(
+    request: Request,
+    q: str = Query("", max_length=200),
+    page: int = Query(1, ge=1),
+    filters: MovieFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search movies by title and director with format, year and rating facets.
+    """
+    results = await search_movies(db, q, filters, page=page)
+    params = {"q": q, **filters.params()} if q else filters.params()
+    return templates.TemplateResponse("search.html", {
+        "request": request,
+        "results": results,
+        "filters": filters,
+        "facet_url": lambda name, value: "/search?" + urlencode({**params, name: value} if value is not None else {
+            key: val for key, val in params.items() if key != name
+        }),
+        "page_url": lambda number: "/search?" + urlencode({**params, "page": number}),
+        "user": request.session.get("user"),
         "is_admin": request.session.get("is_admin", False)
     })
+
+@router.get("/search/suggest")
+async def suggest(q: str = Query("", max_length=200), db: AsyncSession = Depends(get_db)):
+    """
+    Autocomplete movie titles from the cached catalog.
+    """
+    catalog = await catalog_cache.get(db)
+    return JSONResponse(suggestion_cache.get(catalog).suggest(q))
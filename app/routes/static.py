@@ -0,0 +1,36 @@
+"""
+Static assets, served from memory with their precompressed encodings.
+"""
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import Response
+
+from app.utils.assets import assets
+from app.utils.http import is_not_modified
+
+router = APIRouter()
+
+# Fingerprinted URLs change with the content, so their responses never do
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+@router.get("/static/{name:path}")
+async def static_asset(request: Request, name: str):
+    """
+    Serve an asset by fingerprinted name (cached forever) or plain name
+    (revalidated on every use).
+    """
+    asset = assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    headers = {
+        "ETag": asset.etag,
+        "Cache-Control": IMMUTABLE if assets.is_fingerprinted(name) else "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+
+    body, encoding = asset.encoded(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
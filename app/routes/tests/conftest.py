@@ -1,27 +1,51 @@
 import pytest
+from datetime import date, datetime, time, timedelta
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
-from app.main import app
-from app.database import Base, get_db
+from app.main import create_app
+from app.database import Base, get_db, to_async_url
+from app.middleware.admission import admission_stats
+from app.middleware.metrics import instrument_engine
 from app.models.user import User
 from app.models.movie import Movie
 from app.models.booking import Booking
+from app.models.showtime import Showtime
+from app.services.availability import availability_feed
+from app.services.catalog import catalog_cache
+from app.services.history import history_summaries
+from app.services.idempotency import idempotency_store
+from app.services.passwords import password_hasher
+from app.services.principals import principal_cache
 
-# Create test database engine with a unique connection for each test session
+@pytest.fixture(autouse=True)
+def fast_password_hashing(monkeypatch):
+    # Lowest bcrypt cost keeps login-heavy tests fast
+    monkeypatch.setattr(password_hasher, "rounds", 4)
+
+# Create test database engine backed by a per-test SQLite file, so the sync
+# fixtures below and the async sessions used by the app share the same data
 @pytest.fixture(scope="function")
-def engine():
-    SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+def engine(tmp_path):
+    SQLALCHEMY_DATABASE_URL = f"sqlite:///{tmp_path / 'test.db'}"
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
     )
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+@pytest.fixture(scope="function")
+def async_engine(engine):
+    # NullPool keeps no connections bound to the TestClient event loop
+    async_engine = create_async_engine(to_async_url(engine.url), poolclass=NullPool)
+    instrument_engine(async_engine)
+    return async_engine
 
 @pytest.fixture(scope="function")
 def db_session(engine):
@@ -33,18 +57,26 @@ def db_session(engine):
         session.close()
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, async_engine):
     # Override the get_db dependency to use our test database
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    TestingAsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with TestingAsyncSession() as session:
+            yield session
 
+    # A fresh app per test; the background sweepers would use the real engine
+    app = create_app(seed=False, background_tasks=False)
     app.dependency_overrides[get_db] = override_get_db
+    # Each test gets a fresh database, so start from an empty catalog cache
+    catalog_cache.clear()
+    principal_cache.clear()
+    idempotency_store.clear()
+    history_summaries.clear()
+    admission_stats.clear()
+    availability_feed.clear()
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear()
 
 @pytest.fixture(scope="function")
 def test_user(db_session):
@@ -77,6 +109,19 @@ def test_movie(db_session):
     db_session.refresh(movie)
     return movie
 
+@pytest.fixture(scope="function")
+def test_showtime(db_session, test_movie):
+    showtime = Showtime(
+        movie_id=test_movie.id,
+        screen="Screen 1",
+        starts_at=datetime.combine(date.today() + timedelta(days=1), time(20, 0)),
+        capacity=100
+    )
+    db_session.add(showtime)
+    db_session.commit()
+    db_session.refresh(showtime)
+    return showtime
+
 @pytest.fixture
 def login_user(client, test_user):
     response = client.post("/login", data={"username": "testuser", "password": "testpass"})
@@ -1,12 +1,25 @@
+import asyncio
+import gzip
+import io
+import json
+import threading
 import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import DEFAULT_SHOWTIMES, SCHEDULE_DAYS
 from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.services.movie_import import import_movies
+from app.services.principals import principal_cache
 
 def test_admin_can_view_movies(client, test_movie, login_admin):
     response = client.get("/admin/movies")
     assert response.status_code == 200
     assert "Test Movie" in response.text
 
-def test_admin_can_add_movie(client, test_movie, login_admin):
+def test_admin_can_add_movie(client, test_movie, login_admin, db_session):
     movie_data = {
         "title": "New Test Movie",
         "year": 2024,
@@ -21,6 +34,9 @@ def test_admin_can_add_movie(client, test_movie, login_admin):
     response = client.get("/admin/movies")
     assert "New Test Movie" in response.text
 
+    movie = db_session.query(Movie).filter_by(title="New Test Movie").one()
+    assert db_session.query(Showtime).filter_by(movie_id=movie.id).count() > 0
+
 def test_admin_can_delete_movie(client, test_movie, login_admin):
     response = client.post("/admin/movies/1/delete")
     assert response.status_code == 200
@@ -28,11 +44,32 @@ def test_admin_can_delete_movie(client, test_movie, login_admin):
     response = client.get("/admin/movies")
     assert "Test Movie" not in response.text
 
-def test_admin_can_view_bookings(client, test_movie, login_admin, db_session):
+@pytest.fixture
+def foreign_keys(async_engine):
+    # SQLite enforces foreign keys (and their cascades) only when asked to
+    event.listen(async_engine.sync_engine, "connect", lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+
+def test_movie_with_bookings_cannot_be_deleted(client, test_user, test_movie, test_showtime, login_admin, db_session, foreign_keys):
+    db_session.add(Booking(user=test_user, movie_id=test_movie.id, showtime_id=test_showtime.id, quantity=1, total=10))
+    db_session.commit()
+
+    response = client.post(f"/admin/movies/{test_movie.id}/delete")
+    assert response.status_code == 409
+    assert client.delete(f"/api/v1/admin/movies/{test_movie.id}").status_code == 409
+    db_session.expire_all()
+    assert db_session.query(Showtime).filter_by(movie_id=test_movie.id).count() == 1
+    assert db_session.query(Booking).one().showtime_id == test_showtime.id
+
+def test_deleting_a_movie_removes_its_showtimes(client, test_movie, test_showtime, login_admin, db_session, foreign_keys):
+    assert client.delete(f"/api/v1/admin/movies/{test_movie.id}").status_code == 204
+    db_session.expire_all()
+    assert db_session.query(Showtime).count() == 0
+
+def test_admin_can_view_bookings(client, test_user, test_movie, test_showtime, login_admin, db_session):
     booking = Booking(
-        user="testuser",
+        user=test_user,
         movie_id=1,
-        showtime="2024-01-01 20:00",
+        showtime_id=test_showtime.id,
         quantity=2,
         total=20
     )
@@ -43,3 +80,166 @@ def test_admin_can_view_bookings(client, test_movie, login_admin, db_session):
     assert response.status_code == 200
     assert "testuser" in response.text
     assert "Test Movie" in response.text
+    assert test_showtime.label in response.text
+
+def add_bookings(db_session, showtime, users):
+    for username in users:
+        user = User(username=username, password="x")
+        db_session.add(Booking(user=user, movie_id=showtime.movie_id, showtime_id=showtime.id, quantity=1, total=10))
+    db_session.commit()
+
+def test_admin_bookings_keyset_pagination(client, test_showtime, login_admin, db_session):
+    add_bookings(db_session, test_showtime, ["user1", "user2", "user3", "user4", "user5"])
+
+    response = client.get("/admin/bookings?limit=2")
+    assert "user1" in response.text and "user2" in response.text
+    assert "user3" not in response.text
+    assert "/admin/bookings?after=2&amp;limit=2" in response.text
+
+    response = client.get("/admin/bookings?after=4&limit=2")
+    assert "user5" in response.text
+    assert "user4" not in response.text
+    assert "Next page" not in response.text
+
+def test_admin_bookings_filters(client, test_showtime, login_admin, db_session):
+    add_bookings(db_session, test_showtime, ["alice", "bob"])
+
+    response = client.get("/admin/bookings", params={"user": "alice", "movie_id": "", "starts_from": ""})
+    assert "alice" in response.text
+    assert "bob" not in response.text
+
+    response = client.get("/admin/bookings", params={"movie_id": 999})
+    assert "No bookings found" in response.text
+
+    starts_to = test_showtime.starts_at.isoformat(timespec="minutes")
+    response = client.get("/admin/bookings", params={"starts_to": starts_to})
+    assert "No bookings found" in response.text
+
+    response = client.get("/admin/bookings", params={"starts_from": "not-a-date"})
+    assert response.status_code == 400
+
+def test_admin_export_bookings_csv(client, test_showtime, login_admin, db_session):
+    add_bookings(db_session, test_showtime, ["alice", "bob"])
+
+    response = client.get("/admin/bookings/export", params={"user": "bob"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "id,user,movie,showtime,quantity,total"
+    assert lines[1:] == [f"2,bob,Test Movie,{test_showtime.starts_at},1,10"]
+
+def test_admin_export_bookings_ndjson_gzip(client, test_showtime, login_admin, db_session):
+    add_bookings(db_session, test_showtime, ["alice", "bob"])
+
+    response = client.get("/admin/bookings/export", params={"format": "ndjson", "gzip": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    rows = [json.loads(line) for line in gzip.decompress(response.content).splitlines()]
+    assert [row["user"] for row in rows] == ["alice", "bob"]
+    assert rows[0]["movie"] == "Test Movie"
+
+def test_admin_export_requires_admin(client, login_user):
+    response = client.get("/admin/bookings/export")
+    assert response.status_code == 403
+
+def test_admin_check_uses_principal_cache(client, login_admin):
+    hits, misses = principal_cache.hits, principal_cache.misses
+
+    assert client.get("/admin/movies").status_code == 200
+    assert client.get("/admin/bookings").status_code == 200
+    assert principal_cache.hits == hits + 2
+    assert principal_cache.misses == misses
+
+    principal_cache.clear()
+    assert client.get("/admin/movies").status_code == 200
+    assert principal_cache.misses == misses + 1
+
+def test_role_change_revokes_admin_session(client, login_admin, test_user):
+    response = client.post("/admin/users/testuser/role", data={"is_admin": "true"})
+    assert response.status_code == 200
+
+    # Demoting yourself revokes the session before the redirect lands
+    response = client.post("/admin/users/admin/role", data={"is_admin": "false"})
+    assert response.status_code == 403
+    assert client.get("/admin/movies").status_code == 403
+
+    client.post("/login", data={"username": "testuser", "password": "testpass"})
+    assert client.get("/admin/movies").status_code == 200
+
+def test_role_change_unknown_user(client, login_admin):
+    response = client.post("/admin/users/nobody/role", data={"is_admin": "true"})
+    assert response.status_code == 404
+
+def test_non_admin_cannot_view_admin_pages(client, login_user):
+    assert client.get("/admin/movies").status_code == 403
+
+def test_admin_import_movies_csv(client, test_movie, login_admin, db_session):
+    client.get("/")
+    csv_data = (
+        "title,year,director,rating,format,price\n"
+        "Imported Movie,2021,Someone,7,3D,11\n"
+        "Test Movie,2023,Test Director,8,Standard,13\n"
+        "Bad Movie,2021,Someone,11,3D,11\n"
+    )
+    response = client.post("/admin/movies/import", files={"file": ("movies.csv", csv_data, "text/csv")})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["rows"] == 3
+    assert report["imported"] == 2
+    assert report["error_count"] == 1
+    assert report["errors"][0]["line"] == 4
+    assert "rating" in report["errors"][0]["error"]
+
+    db_session.expire_all()
+    assert db_session.query(Movie).filter_by(title="Test Movie").one().price == 13
+    assert "Imported Movie" in client.get("/").text
+
+    # New movies are bookable, and importing them again schedules nothing more
+    imported = db_session.query(Movie).filter_by(title="Imported Movie").one()
+    scheduled = db_session.query(Showtime).filter_by(movie_id=imported.id).count()
+    assert scheduled == len(DEFAULT_SHOWTIMES) * SCHEDULE_DAYS
+    client.post("/admin/movies/import", files={"file": ("movies.csv", csv_data, "text/csv")})
+    assert db_session.query(Showtime).filter_by(movie_id=imported.id).count() == scheduled
+    assert "100 seats left" in client.get(f"/book/{imported.id}").text
+
+def test_admin_import_movies_json_lines(client, login_admin, db_session):
+    lines = "\n".join([
+        json.dumps({"title": "Line One", "year": 2000, "director": "A", "rating": 5, "format": "IMAX", "price": 9}),
+        "{not json",
+        json.dumps({"title": "Line Three", "year": 2001, "director": "B", "rating": 6, "format": "IMAX", "price": 9}),
+    ])
+    response = client.post("/admin/movies/import", files={"file": ("movies.jsonl", lines, "application/json")})
+    report = response.json()
+    assert report["imported"] == 2
+    assert [error["line"] for error in report["errors"]] == [2]
+    assert db_session.query(Movie).count() == 2
+
+class ThreadRecordingStream(io.StringIO):
+    """A text stream remembering which threads read it."""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.threads = set()
+
+    def __next__(self):
+        self.threads.add(threading.get_ident())
+        return super().__next__()
+
+def test_import_reads_off_the_event_loop_and_schedules_in_sql(async_engine, db_session):
+    stream = ThreadRecordingStream("title,year,director,rating,format,price\n" + "".join(
+        f"Chunked {i},2020,Someone,5,Standard,10\n" for i in range(5)
+    ))
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            return threading.get_ident(), await import_movies(db, stream, chunk_size=2)
+
+    loop_thread, report = asyncio.run(run())
+    assert (report.rows, report.imported) == (5, 5)
+    assert stream.threads and loop_thread not in stream.threads
+    # One INSERT ... SELECT of showtimes per chunk
+    assert sum(statement.startswith("INSERT INTO showtimes") for statement in statements) == 3
+    assert db_session.query(Showtime).count() == 5 * len(DEFAULT_SHOWTIMES) * SCHEDULE_DAYS
@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.middleware import admission
+from app.middleware.admission import AdmissionMiddleware, AdmissionRule, AdmissionStats, LocalBucketStore, parse_rate
+
+def test_parse_rate():
+    assert parse_rate("10/60") == (10, 10 / 60)
+    assert parse_rate("5") == (5, 5.0)
+    assert parse_rate("") == (0, 0.0)
+    assert parse_rate("0/60") == (0, 0.0)
+
+def test_bucket_refills_at_its_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    store = LocalBucketStore()
+
+    async def take():
+        return await store.take("k", 2, 0.5)
+
+    assert [asyncio.run(take()) for _ in range(3)] == [0, 0, 2.0]
+    now[0] += 1
+    assert asyncio.run(take()) == 1.0
+    now[0] += 1
+    assert asyncio.run(take()) == 0
+
+def test_bucket_store_keeps_a_bounded_number_of_clients():
+    store = LocalBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        asyncio.run(store.take(key, 1, 1.0))
+    assert list(store.buckets) == ["b", "c"]
+
+def test_login_is_rate_limited_per_client(client, test_user):
+    burst, _ = parse_rate(admission.RATE_LIMIT_LOGIN)
+    for _ in range(burst):
+        assert client.post("/login", data={"username": "testuser", "password": "wrong"}).status_code == 400
+    response = client.post("/login", data={"username": "testuser", "password": "testpass"})
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Too many requests"}
+    assert int(response.headers["retry-after"]) >= 1
+    # Other pages and methods are not limited
+    assert client.get("/login").status_code == 200
+    assert 'admission_rejected_total{rule="login",reason="rate"} 1' in client.get("/metrics").text
+
+def limited_app(rule, store=None, stats=None, gate=None):
+    async def endpoint(request):
+        if gate is not None:
+            await gate.wait()
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/book", endpoint, methods=["POST"])])
+    return AdmissionMiddleware(app, rules=[rule], store=store or LocalBucketStore(), stats=stats or AdmissionStats())
+
+def test_requests_beyond_the_in_flight_cap_are_shed():
+    gate = asyncio.Event()
+    stats = AdmissionStats()
+    app = limited_app(AdmissionRule("book", (("POST", "/book"),), 0, 0.0, max_in_flight=2), stats=stats, gate=gate)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            held = [asyncio.create_task(client.post("/book")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            shed = await client.post("/book")
+            gate.set()
+            return shed, await asyncio.gather(*held)
+
+    shed, held = asyncio.run(run())
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert [response.status_code for response in held] == [200, 200]
+    assert stats.rejected == {("book", "busy"): 1}
+    assert stats.in_flight["book"] == 0
+
+def test_failing_store_admits_requests():
+    class BrokenStore:
+        async def take(self, key, burst, rate):
+            raise ConnectionError("store down")
+
+    app = limited_app(AdmissionRule("book", (("POST", "/book"),), 1, 1.0), store=BrokenStore())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [(await client.post("/book")).status_code for _ in range(3)]
+
+    assert asyncio.run(run()) == [200, 200, 200]
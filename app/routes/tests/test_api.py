@@ -0,0 +1,102 @@
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.sales import MovieSales
+
+def book(client, movie, showtime, quantity, **headers):
+    return client.post("/api/v1/bookings", json={
+        "movie_id": movie.id, "showtime_id": showtime.id, "quantity": quantity,
+    }, headers=headers, follow_redirects=False)
+
+def test_list_movies_is_json(client, test_movie):
+    response = client.get("/api/v1/movies")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [{
+        "id": test_movie.id, "title": "Test Movie", "year": 2023, "director": "Test Director",
+        "rating": 8, "format": "Standard", "price": 10,
+    }]
+
+def test_movie_detail_lists_showtime_availability(client, login_user, test_movie, test_showtime):
+    book(client, test_movie, test_showtime, 3)
+    showtimes = client.get(f"/api/v1/movies/{test_movie.id}").json()["showtimes"]
+    assert [(s["id"], s["seats_available"]) for s in showtimes] == [(test_showtime.id, 97)]
+    assert client.get("/api/v1/movies/999").status_code == 404
+
+def test_bookings_require_login(client, test_movie, test_showtime):
+    assert client.get("/api/v1/bookings").status_code == 401
+    assert book(client, test_movie, test_showtime, 1).status_code == 401
+
+def test_book_list_and_cancel(client, login_user, test_movie, test_showtime, db_session):
+    response = book(client, test_movie, test_showtime, 2)
+    assert response.status_code == 201
+    booking = response.json()
+    assert response.headers["location"] == f"/api/v1/bookings/{booking['id']}"
+    assert booking["movie"] == "Test Movie"
+    assert booking["total"] == 20
+
+    assert client.get("/api/v1/bookings").json() == [booking]
+    assert client.get(response.headers["location"]).json() == booking
+    assert db_session.get(MovieSales, test_movie.id).tickets == 2
+
+    assert client.delete(response.headers["location"]).status_code == 204
+    assert client.get("/api/v1/bookings").json() == []
+    assert client.delete(response.headers["location"]).status_code == 404
+    assert db_session.query(Booking).count() == 0
+
+def test_booking_errors(client, login_user, test_movie, test_showtime, db_session):
+    assert book(client, test_movie, test_showtime, 0).status_code == 422
+    response = book(client, test_movie, test_showtime, 101)
+    assert (response.status_code, response.json()) == (409, {"detail": "Not enough seats available"})
+    other = db_session.merge(Movie(title="Other", year=2020, director="X", rating=5, format="Standard", price=1))
+    db_session.commit()
+    assert book(client, other, test_showtime, 1).status_code == 404
+
+    # The pages answer the same way
+    response = client.post("/book", data={"movie_id": test_movie.id, "showtime_id": test_showtime.id, "quantity": 101})
+    assert (response.status_code, response.json()) == (409, {"detail": "Not enough seats available"})
+    assert db_session.query(Booking).count() == 0
+
+def test_idempotency_key_header_replays_the_booking(client, login_user, test_movie, test_showtime, db_session):
+    first = book(client, test_movie, test_showtime, 1, **{"Idempotency-Key": "abc"})
+    retry = book(client, test_movie, test_showtime, 1, **{"Idempotency-Key": "abc"})
+    assert first.status_code == 201
+    assert retry.status_code == 303
+    assert retry.headers["location"] == first.headers["location"]
+    assert db_session.query(Booking).count() == 1
+
+def test_admin_movie_crud(client, login_admin, test_movie, db_session):
+    movie = {"title": "API Movie", "year": 2024, "director": "D", "rating": 7, "format": "IMAX", "price": 15}
+    response = client.post("/api/v1/admin/movies", json=movie)
+    assert response.status_code == 201
+    created = response.json()
+    assert created == {"id": created["id"], **movie}
+    assert client.post("/api/v1/admin/movies", json=movie).status_code == 409
+
+    response = client.put(f"/api/v1/admin/movies/{created['id']}", json={**movie, "price": 20})
+    assert response.json()["price"] == 20
+    assert [m["price"] for m in client.get("/api/v1/movies").json()] == [10, 20]
+
+    assert client.delete(f"/api/v1/admin/movies/{created['id']}").status_code == 204
+    assert [m["title"] for m in client.get("/api/v1/admin/movies").json()] == ["Test Movie"]
+    db_session.expire_all()
+    assert db_session.query(Movie).count() == 1
+
+def test_admin_endpoints_require_admin(client, login_user):
+    assert client.get("/api/v1/admin/movies").status_code == 403
+    assert client.get("/api/v1/admin/sales").status_code == 403
+
+def test_admin_bookings_and_sales(client, test_user, login_admin, test_movie, test_showtime):
+    for _ in range(3):
+        book(client, test_movie, test_showtime, 2)
+    page = client.get("/api/v1/admin/bookings", params={"limit": 2}).json()
+    assert [row["quantity"] for row in page["bookings"]] == [2, 2]
+    assert page["bookings"][0]["user"] == "admin"
+    rest = client.get("/api/v1/admin/bookings", params={"limit": 2, "after": page["next_after"]}).json()
+    assert len(rest["bookings"]) == 1 and rest["next_after"] is None
+
+    sales = client.get("/api/v1/admin/sales").json()
+    assert (sales["bookings"], sales["tickets"], sales["revenue"]) == (3, 6, 60)
+    assert sales["movies"][0]["title"] == "Test Movie"
+
+    assert client.put("/api/v1/admin/users/testuser/role", json={"is_admin": True}).status_code == 204
+    assert client.put("/api/v1/admin/users/nobody/role", json={"is_admin": True}).status_code == 404
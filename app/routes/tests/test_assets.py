@@ -0,0 +1,65 @@
+import re
+from pathlib import Path
+
+from app.config import TEMPLATES_DIR
+from app.utils.assets import assets, minify_css
+
+def test_stylesheet_defines_every_template_class():
+    css = assets.get("css/app.css").body.decode()
+    defined = {name.replace("\\:", ":") for name in re.findall(r"\.((?:[\w-]|\\:)+)", css)}
+    used = set()
+    for template in Path(TEMPLATES_DIR).glob("*.html"):
+        for classes in re.findall(r'class="([^"{]*)"', template.read_text()):
+            used.update(classes.split())
+    assert used - defined == set()
+
+def test_minify_css_keeps_rules():
+    assert minify_css("/* c */\n.a > .b {\n  color: red;\n}\n") == ".a>.b{color: red}"
+
+def test_pages_link_the_fingerprinted_stylesheet(client):
+    url = assets.url("css/app.css")
+    assert re.fullmatch(r"/static/css/app\.[0-9a-f]{12}\.css", url)
+    assert url in client.get("/login").text
+
+def test_fingerprinted_assets_are_immutable(client):
+    response = client.get(assets.url("css/app.css"), headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/css")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["content-encoding"] == "gzip"
+    assert ".btn-primary" in response.text
+
+def test_plain_asset_names_are_revalidated(client):
+    response = client.get("/static/css/app.css")
+    assert response.headers["cache-control"] == "public, no-cache"
+
+    repeat = client.get("/static/css/app.css", headers={"If-None-Match": response.headers["etag"]})
+    assert repeat.status_code == 304
+    assert client.get("/static/css/missing.css").status_code == 404
+
+def test_large_responses_are_compressed(client):
+    response = client.get("/login", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert "<form" in response.text
+
+    plain = client.get("/login", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+def test_small_responses_are_not_compressed(client, login_user, test_movie):
+    response = client.get("/api/v1/movies", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+def test_templated_pages_answer_conditional_gets(client, login_user):
+    response = client.get("/bookings")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    repeat = client.get("/bookings", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+
+    stale = client.get("/bookings", headers={"If-None-Match": 'W/"stale"'})
+    assert stale.status_code == 200
@@ -0,0 +1,44 @@
+import pytest
+from app.models.user import User
+from app.services.passwords import password_hasher
+
+def test_register_stores_password_hash(client, db_session):
+    response = client.post("/register", data={"username": "newuser", "password": "secret"})
+    assert response.status_code == 200
+
+    user = db_session.query(User).filter_by(username="newuser").one()
+    assert user.password.startswith("$2b$04$")
+    assert "secret" not in user.password
+
+    response = client.post("/login", data={"username": "newuser", "password": "secret"})
+    assert response.status_code == 200
+    assert "Hello, newuser" in response.text
+
+def test_login_rejects_wrong_password(client, test_user):
+    response = client.post("/login", data={"username": "testuser", "password": "wrong"})
+    assert response.status_code == 400
+
+    response = client.post("/login", data={"username": "nobody", "password": "testpass"})
+    assert response.status_code == 400
+
+def test_login_rehashes_legacy_plaintext_password(client, test_user, db_session):
+    assert test_user.password == "testpass"
+
+    response = client.post("/login", data={"username": "testuser", "password": "testpass"})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    user = db_session.query(User).filter_by(username="testuser").one()
+    assert user.password.startswith("$2b$04$")
+
+    client.get("/logout")
+    response = client.post("/login", data={"username": "testuser", "password": "testpass"})
+    assert "Hello, testuser" in response.text
+
+def test_login_sheds_load_when_hashing_is_saturated(client, db_session, monkeypatch):
+    client.post("/register", data={"username": "newuser", "password": "secret"})
+    monkeypatch.setattr(password_hasher, "queue_limit", 0)
+
+    response = client.post("/login", data={"username": "newuser", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import pytest
+
+from app.services.availability import AvailabilityFeed, FeedFull, Subscription, availability_events, availability_feed
+
+def parse_events(chunk):
+    return [
+        json.loads(line[len("data: "):])
+        for line in chunk.decode().splitlines() if line.startswith("data: ")
+    ]
+
+def test_subscription_merges_updates_until_read():
+    subscription = Subscription(1)
+    subscription.push({1: 5})
+    subscription.push({1: 4, 2: 9})
+
+    async def read():
+        return await subscription.next_batch(1), await subscription.next_batch(0.01)
+
+    assert asyncio.run(read()) == ({1: 4, 2: 9}, {})
+
+def test_feed_caps_its_subscribers():
+    feed = AvailabilityFeed(max_subscribers=1)
+    first = feed.subscribe(1)
+    with pytest.raises(FeedFull):
+        feed.subscribe(2)
+    feed.unsubscribe(first)
+    feed.unsubscribe(first)
+    assert feed.subscribers == 0 and feed.subscriptions == {}
+    feed.subscribe(2)
+
+def test_events_are_limited_to_the_rate():
+    feed = AvailabilityFeed()
+
+    async def snapshot():
+        return {1: 100}
+
+    events = availability_events(1, snapshot, feed, max_rate=10, keepalive=5)
+
+    async def run():
+        received = [await anext(events)]
+        assert feed.subscribers == 1
+        await feed.publish({1: {1: 99}})
+        received.append(await anext(events))
+        # A burst during the pause after an event goes out as one event
+        for seats in (98, 97, 96):
+            await feed.publish({1: {1: seats}, 2: {5: seats}})
+        received.append(await anext(events))
+        await events.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert [parse_events(chunk) for chunk in received] == [[{"1": 100}], [{"1": 99}], [{"1": 96}]]
+    assert feed.subscribers == 0
+
+def test_bookings_and_cancellations_publish_seats_left(client, test_movie, test_showtime, login_user, db_session):
+    subscription = availability_feed.subscribe(test_movie.id)
+    client.post("/book", data={"movie_id": test_movie.id, "showtime_id": test_showtime.id, "quantity": 3})
+    assert subscription.pending == {test_showtime.id: 97}
+
+    client.post("/cancel", data={"booking_id": 1})
+    assert subscription.pending == {test_showtime.id: 100}
+    assert "availability_updates_published_total 2" in client.get("/metrics").text
+
+def test_availability_stream_sends_seats_then_changes(client, test_movie, test_showtime, login_user):
+    cookie = f"session={client.cookies['session']}".encode()
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": f"/book/{test_movie.id}/availability", "raw_path": b"", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"testserver"), (b"cookie", cookie)],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+
+    async def stream():
+        disconnected = asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def receive():
+            if not hasattr(receive, "sent"):
+                receive.sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await messages.put(message)
+
+        call = asyncio.create_task(client.app(scope, receive, send))
+        start = await messages.get()
+        snapshot = await messages.get()
+        subscribers = availability_feed.subscribers
+        await availability_feed.publish({test_movie.id: {test_showtime.id: 42}})
+        change = await asyncio.wait_for(messages.get(), 5)
+        disconnected.set()
+        await asyncio.wait_for(call, 5)
+        return start, snapshot, subscribers, change
+
+    start, snapshot, subscribers, change = client.portal.call(stream)
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    assert parse_events(snapshot["body"]) == [{str(test_showtime.id): 100}]
+    assert parse_events(change["body"]) == [{str(test_showtime.id): 42}]
+    assert subscribers == 1
+    assert availability_feed.subscribers == 0
+
+def test_full_feed_asks_the_stream_to_retry():
+    feed = AvailabilityFeed(max_subscribers=0)
+
+    async def snapshot():
+        raise AssertionError("not read without a subscription")
+
+    async def run():
+        return [chunk async for chunk in availability_events(1, snapshot, feed)]
+
+    assert asyncio.run(run()) == [b"retry: 5000\n\n"]
+
+def test_availability_stream_dropped_before_the_first_event(client, test_movie, test_showtime, login_user):
+    cookie = f"session={client.cookies['session']}".encode()
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": f"/book/{test_movie.id}/availability", "raw_path": b"", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"testserver"), (b"cookie", cookie)],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+
+    async def stream():
+        messages = []
+
+        async def receive():
+            # The client is gone as soon as the request is read
+            if not hasattr(receive, "sent"):
+                receive.sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            # Let the disconnect win the race with the first event
+            await asyncio.sleep(0.05)
+
+        await asyncio.wait_for(client.app(scope, receive, send), 5)
+        return messages
+
+    messages = client.portal.call(stream)
+    assert messages[0]["status"] == 200
+    assert not any(b"event: availability" in message.get("body", b"") for message in messages)
+    assert availability_feed.subscribers == 0
+
+def test_availability_stream_needs_a_login(client, test_movie):
+    assert client.get(f"/book/{test_movie.id}/availability").status_code == 401
+    assert availability_feed.subscribers == 0
+
+def test_booking_page_shows_seats_left(client, test_movie, test_showtime, login_user):
+    response = client.get(f"/book/{test_movie.id}")
+    assert "100 seats left" in response.text
+    assert f'data-availability-url="/book/{test_movie.id}/availability"' in response.text
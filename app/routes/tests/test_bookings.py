@@ -1,17 +1,26 @@
+import asyncio
 import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import BOOKING_PAGE_SIZE, DEFAULT_SHOWTIMES, SCHEDULE_DAYS
 from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.models.showtime import Showtime
+from app.services.showtimes import default_showtimes, top_up_schedules
 
-def test_user_can_view_booking_page(client, test_movie, login_user):
+def test_user_can_view_booking_page(client, test_movie, test_showtime, login_user):
     response = client.get("/book/1")
     assert response.status_code == 200
     assert "Test Movie" in response.text
     assert "Book Now" in response.text
     assert "Select Showtime" in response.text
+    assert test_showtime.label in response.text
 
-def test_user_can_create_booking(client, test_movie, login_user):
+def test_user_can_create_booking(client, test_movie, test_showtime, login_user):
     booking_data = {
         "movie_id": 1,
-        "showtime": "14:00",
+        "showtime_id": test_showtime.id,
         "quantity": 2
     }
     response = client.post("/book", data=booking_data)
@@ -20,14 +29,14 @@ def test_user_can_create_booking(client, test_movie, login_user):
     response = client.get("/bookings")
     assert response.status_code == 200
     assert "Test Movie" in response.text
-    assert "14:00" in response.text
+    assert "20:00" in response.text
     assert "$20" in response.text
 
-def test_user_can_view_bookings(client, test_movie, login_user, db_session):
+def test_user_can_view_bookings(client, test_user, test_movie, test_showtime, login_user, db_session):
     booking = Booking(
-        user="testuser",
+        user=test_user,
         movie_id=1,
-        showtime="2024-01-01 20:00",
+        showtime_id=test_showtime.id,
         quantity=2,
         total=20
     )
@@ -40,11 +49,11 @@ def test_user_can_view_bookings(client, test_movie, login_user, db_session):
     assert "20:00" in response.text
     assert "$20" in response.text
 
-def test_user_can_cancel_booking(client, test_movie, login_user, db_session):
+def test_user_can_cancel_booking(client, test_user, test_movie, test_showtime, login_user, db_session):
     booking = Booking(
-        user="testuser",
+        user=test_user,
         movie_id=1,
-        showtime="2024-01-01 20:00",
+        showtime_id=test_showtime.id,
         quantity=2,
         total=20
     )
@@ -62,3 +71,93 @@ def test_booking_nonexistent_movie(client, login_user):
     response = client.get("/book/999")
     assert response.status_code == 404
 
+
+def test_booking_reserves_seats(client, test_movie, test_showtime, login_user, db_session):
+    response = client.post("/book", data={"movie_id": 1, "showtime_id": test_showtime.id, "quantity": 3})
+    assert response.status_code == 200
+
+    inventory = db_session.query(SeatInventory).filter_by(showtime_id=test_showtime.id).one()
+    assert inventory.seats_available == inventory.capacity - 3
+    assert db_session.query(Seat).filter(Seat.booking_id.isnot(None)).count() == 3
+
+def test_booking_sold_out_showtime(client, test_movie, test_showtime, login_user, db_session):
+    test_showtime.capacity = 2
+    db_session.commit()
+    response = client.post("/book", data={"movie_id": 1, "showtime_id": test_showtime.id, "quantity": 2})
+    assert response.status_code == 200
+
+    response = client.post("/book", data={"movie_id": 1, "showtime_id": test_showtime.id, "quantity": 1})
+    assert response.status_code == 409
+
+def test_booking_unknown_showtime(client, test_movie, test_showtime, login_user):
+    response = client.post("/book", data={"movie_id": 2, "showtime_id": test_showtime.id, "quantity": 1})
+    assert response.status_code == 404
+
+def test_booking_past_showtime(client, test_movie, test_showtime, login_user, db_session):
+    test_showtime.starts_at = datetime(2024, 1, 1, 20, 0)
+    db_session.commit()
+    response = client.post("/book", data={"movie_id": 1, "showtime_id": test_showtime.id, "quantity": 1})
+    assert response.status_code == 400
+
+def test_cancel_booking_releases_seats(client, test_movie, test_showtime, login_user, db_session):
+    client.post("/book", data={"movie_id": 1, "showtime_id": test_showtime.id, "quantity": 2})
+    booking = db_session.query(Booking).one()
+
+    response = client.post("/cancel", data={"booking_id": booking.id})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    inventory = db_session.query(SeatInventory).one()
+    assert inventory.seats_available == inventory.capacity
+    assert db_session.query(Seat).filter(Seat.booking_id.isnot(None)).count() == 0
+
+def test_booking_history_pages_newest_first(client, test_user, test_movie, test_showtime, login_user, db_session):
+    db_session.add_all([
+        Booking(user=test_user, movie_id=1, showtime_id=test_showtime.id, quantity=1, total=10)
+        for _ in range(BOOKING_PAGE_SIZE + 5)
+    ])
+    db_session.commit()
+    ids = [booking.id for booking in db_session.query(Booking).order_by(Booking.id.desc())]
+
+    first = client.get("/bookings").text
+    assert first.index(f'value="{ids[0]}"') < first.index(f'value="{ids[1]}"')
+    assert f'value="{ids[BOOKING_PAGE_SIZE]}"' not in first
+    assert f"/bookings?before={ids[BOOKING_PAGE_SIZE - 1]}" in first
+
+    older = client.get(f"/bookings?before={ids[BOOKING_PAGE_SIZE - 1]}").text
+    assert all(f'value="{booking_id}"' in older for booking_id in ids[BOOKING_PAGE_SIZE:])
+    assert "Older bookings" not in older
+
+def test_booking_summary_is_cached_until_the_user_books(client, test_user, test_movie, test_showtime, login_user, db_session):
+    db_session.add(Booking(user=test_user, movie_id=1, showtime_id=test_showtime.id, quantity=2, total=20))
+    db_session.commit()
+    assert "$20</p>" in client.get("/bookings").text
+
+    # Written behind the app's back: the cached summary still applies
+    db_session.add(Booking(user=test_user, movie_id=1, showtime_id=test_showtime.id, quantity=3, total=30))
+    db_session.commit()
+    assert "$20</p>" in client.get("/bookings").text
+
+    client.post("/book", data={"movie_id": 1, "showtime_id": test_showtime.id, "quantity": 1})
+    response = client.get("/bookings")
+    assert "$60</p>" in response.text
+    assert "Next: Test Movie" in response.text
+
+def test_movies_added_long_ago_stay_bookable(client, test_movie, login_user, db_session, async_engine):
+    # Scheduled when the movie was added, SCHEDULE_DAYS + 3 days ago
+    added = date.today() - timedelta(days=SCHEDULE_DAYS + 3)
+    db_session.add_all(Showtime(**values) for values in default_showtimes(test_movie.id, added))
+    db_session.commit()
+    assert "<option" not in client.get(f"/book/{test_movie.id}").text
+
+    async def top_up():
+        async with AsyncSession(async_engine) as db:
+            return await top_up_schedules(db, batch=1), await top_up_schedules(db)
+
+    assert asyncio.run(top_up()) == (SCHEDULE_DAYS * len(DEFAULT_SHOWTIMES), 0)
+    upcoming = db_session.query(Showtime).filter(Showtime.starts_at >= datetime.now()).order_by(Showtime.starts_at).all()
+    assert upcoming[-1].starts_at.date() == date.today() + timedelta(days=SCHEDULE_DAYS - 1)
+
+    response = client.post("/book", data={"movie_id": test_movie.id, "showtime_id": upcoming[-1].id, "quantity": 1})
+    assert response.status_code == 200
+    assert db_session.query(Booking).count() == 1
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat, SeatHold
+from app.services.holds import expire_holds
+
+def hold(client, movie, showtime, quantity):
+    return client.post("/hold", data={
+        "movie_id": movie.id, "showtime_id": showtime.id, "quantity": quantity,
+    }, follow_redirects=False)
+
+def book_hold(client, movie, showtime, quantity, hold_id):
+    return client.post("/book", data={
+        "movie_id": movie.id, "showtime_id": showtime.id, "quantity": quantity, "hold_id": hold_id,
+    }, follow_redirects=False)
+
+def seats_available(db_session):
+    db_session.expire_all()
+    return db_session.query(SeatInventory).one().seats_available
+
+def expire_all_holds(db_session):
+    for seat_hold in db_session.query(SeatHold):
+        seat_hold.expires_at = datetime.now() - timedelta(seconds=1)
+    db_session.commit()
+
+def sweep(async_engine, limit):
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            return await expire_holds(db, limit=limit)
+    return asyncio.run(run())
+
+def test_hold_then_book(client, login_user, test_movie, test_showtime, db_session):
+    response = hold(client, test_movie, test_showtime, 2)
+    assert response.status_code == 303
+    hold_id = db_session.query(SeatHold).one().id
+    assert response.headers["location"] == f"/hold/{hold_id}"
+    assert seats_available(db_session) == 98
+
+    checkout = client.get(f"/hold/{hold_id}")
+    assert "Confirm Booking" in checkout.text
+
+    assert book_hold(client, test_movie, test_showtime, 2, hold_id).status_code == 303
+    booking = db_session.query(Booking).one()
+    assert seats_available(db_session) == 98
+    assert db_session.query(SeatHold).count() == 0
+    assert db_session.query(Seat).filter(Seat.booking_id == booking.id).count() == 2
+    assert db_session.query(Seat).filter(Seat.hold_id.isnot(None)).count() == 0
+
+def test_held_seats_are_not_sold_to_others(client, login_user, test_movie, test_showtime):
+    assert hold(client, test_movie, test_showtime, 100).status_code == 303
+    response = client.post("/book", data={"movie_id": test_movie.id, "showtime_id": test_showtime.id, "quantity": 1})
+    assert response.status_code == 409
+
+def test_expired_hold_cannot_be_booked_and_is_swept(client, login_user, test_movie, test_showtime, db_session, async_engine):
+    hold(client, test_movie, test_showtime, 3)
+    hold_id = db_session.query(SeatHold).one().id
+    expire_all_holds(db_session)
+
+    assert book_hold(client, test_movie, test_showtime, 3, hold_id).status_code == 410
+    assert client.get(f"/hold/{hold_id}").status_code == 404
+    assert sweep(async_engine, 100) == 1
+    assert seats_available(db_session) == 100
+    assert db_session.query(Booking).count() == 0
+
+def test_sweeper_expires_a_bounded_batch_per_tick(client, login_user, test_movie, test_showtime, db_session, async_engine):
+    for _ in range(5):
+        hold(client, test_movie, test_showtime, 1)
+    expire_all_holds(db_session)
+
+    assert sweep(async_engine, 2) == 2
+    assert seats_available(db_session) == 97
+    assert sweep(async_engine, 2) == 2
+    assert sweep(async_engine, 2) == 1
+    assert sweep(async_engine, 2) == 0
+    assert seats_available(db_session) == 100
+
+def test_release_hold(client, login_user, test_movie, test_showtime, db_session):
+    hold(client, test_movie, test_showtime, 4)
+    hold_id = db_session.query(SeatHold).one().id
+    client.post(f"/hold/{hold_id}/release")
+    assert seats_available(db_session) == 100
+    assert db_session.query(SeatHold).count() == 0
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking import Booking
+from app.models.idempotency import IdempotencyKey
+from app.services.idempotency import idempotency_store, sweep_expired_keys
+
+def book(client, movie, showtime, key, quantity=1):
+    return client.post("/book", data={
+        "movie_id": movie.id,
+        "showtime_id": showtime.id,
+        "quantity": quantity,
+        "idempotency_key": key,
+    }, follow_redirects=False)
+
+def test_book_form_carries_a_fresh_key(client, login_user, test_movie, test_showtime):
+    first = client.get(f"/book/{test_movie.id}").text
+    second = client.get(f"/book/{test_movie.id}").text
+    assert 'name="idempotency_key"' in first
+    assert first != second
+
+def test_resubmitted_form_replays_the_first_booking(client, login_user, test_movie, test_showtime, db_session):
+    assert book(client, test_movie, test_showtime, "k1").headers["location"] == "/bookings"
+    idempotency_store.clear()  # replay from the table, not the LRU
+    replay = book(client, test_movie, test_showtime, "k1")
+    assert replay.status_code == 303
+    assert replay.headers["location"] == "/bookings"
+    assert db_session.query(Booking).count() == 1
+
+    assert book(client, test_movie, test_showtime, "k2").status_code == 303
+    assert db_session.query(Booking).count() == 2
+
+def test_key_reused_for_another_booking_is_rejected(client, login_user, test_movie, test_showtime, db_session):
+    book(client, test_movie, test_showtime, "k1")
+    assert book(client, test_movie, test_showtime, "k1", quantity=3).status_code == 422
+    assert db_session.query(Booking).count() == 1
+
+def test_parallel_duplicates_book_once(client, login_user, test_movie, test_showtime, db_session):
+    async def run():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", cookies=client.cookies) as async_client:
+            return await asyncio.gather(*(
+                async_client.post("/book", data={
+                    "movie_id": test_movie.id, "showtime_id": test_showtime.id, "quantity": 2,
+                }, headers={"Idempotency-Key": "parallel"})
+                for _ in range(10)
+            ))
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [303] * 10
+    assert {r.headers["location"] for r in responses} == {"/bookings"}
+    assert db_session.query(Booking).count() == 1
+
+def test_sweep_removes_expired_keys(async_engine, db_session):
+    now = datetime.now()
+    db_session.add_all([
+        IdempotencyKey(user="u", key="old", fingerprint="f", status_code=303, location="/", expires_at=now - timedelta(seconds=1)),
+        IdempotencyKey(user="u", key="new", fingerprint="f", status_code=303, location="/", expires_at=now + timedelta(hours=1)),
+    ])
+    db_session.commit()
+
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            return await sweep_expired_keys(db)
+
+    assert asyncio.run(run()) == 1
+    assert [row.key for row in db_session.query(IdempotencyKey)] == ["new"]
@@ -0,0 +1,51 @@
+import asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.services.inventory import SoldOut, ensure_inventory, reserve_seats, seat_label
+
+def test_seat_labels():
+    assert seat_label(0) == "A1"
+    assert seat_label(19) == "A20"
+    assert seat_label(20) == "B1"
+    assert seat_label(26 * 20) == "AA1"
+
+def test_concurrent_reservations_never_oversell(async_engine, test_movie, test_showtime, db_session):
+    capacity, attempts = 20, 100
+    # A pooled engine, like the app's, so attempts queue on checkout
+    pooled_engine = create_async_engine(async_engine.url)
+    Session = async_sessionmaker(pooled_engine, expire_on_commit=False)
+
+    async def create_inventory():
+        async with Session() as db:
+            await ensure_inventory(db, test_showtime.id, capacity=capacity)
+            await db.commit()
+
+    async def attempt(i):
+        async with Session() as db:
+            booking = Booking(movie_id=test_movie.id, showtime_id=test_showtime.id, quantity=1, total=10)
+            db.add(booking)
+            await db.flush()
+            try:
+                await reserve_seats(db, booking)
+            except SoldOut:
+                await db.rollback()
+                return False
+            await db.commit()
+            return True
+
+    async def run():
+        await create_inventory()
+        try:
+            return await asyncio.gather(*(attempt(i) for i in range(attempts)))
+        finally:
+            await pooled_engine.dispose()
+
+    results = asyncio.run(run())
+
+    assert sum(results) == capacity
+    assert db_session.query(Booking).count() == capacity
+    assert db_session.query(SeatInventory).one().seats_available == 0
+    taken = db_session.query(Seat.booking_id).filter(Seat.booking_id.isnot(None)).all()
+    assert len(taken) == len(set(taken)) == capacity
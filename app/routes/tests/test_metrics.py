@@ -0,0 +1,38 @@
+from app.middleware.metrics import MetricsRegistry, RequestStats, N_PLUS_ONE_THRESHOLD
+
+def sample(text, prefix):
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+def test_metrics_record_route_latency_queries_and_renders(client, login_user, test_movie):
+    client.get(f"/book/{test_movie.id}")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    labels = 'method="GET",route="/book/{movie_id}"'
+    text = response.text
+    assert sample(text, f"http_request_duration_seconds_count{{{labels}}}") >= 1
+    assert sample(text, f"http_request_db_queries_sum{{{labels}}}") >= 2
+    assert sample(text, f"http_request_render_seconds_count{{{labels}}}") >= 1
+    assert sample(text, f'http_requests_total{{{labels},status="200"}}') >= 1
+    assert "principal_cache_hits_total" in text
+
+def test_unmatched_requests_share_one_label(client):
+    client.get("/no/such/page")
+    assert 'route="unmatched",status="404"' in client.get("/metrics").text
+
+def test_repeated_statements_flag_n_plus_one():
+    metrics = MetricsRegistry()
+    stats = RequestStats()
+    stats.queries = N_PLUS_ONE_THRESHOLD + 1
+    stats.statements = {"SELECT 1": N_PLUS_ONE_THRESHOLD, "SELECT 2": 1}
+    metrics.record("GET", "/items", 200, 0.01, stats)
+    metrics.record("GET", "/items", 200, 0.01, RequestStats())
+
+    text = metrics.render()
+    assert sample(text, 'http_n_plus_one_suspected_total{method="GET",route="/items"}') == 1
+    assert sample(text, 'http_request_db_queries_bucket{method="GET",route="/items",le="0"}') == 1
+    assert sample(text, 'http_request_db_queries_count{method="GET",route="/items"}') == 2
@@ -0,0 +1,105 @@
+from datetime import date, datetime, time
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.migrations import online, run_migrations
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory
+from app.models.sales import MovieSales, TotalSales
+from app.models.showtime import Showtime
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR UNIQUE, password VARCHAR, is_admin BOOLEAN)",
+    "CREATE TABLE movies (id INTEGER PRIMARY KEY, title VARCHAR UNIQUE, year INTEGER, director VARCHAR, "
+    "rating INTEGER, format VARCHAR, price INTEGER)",
+    "CREATE TABLE bookings (id INTEGER PRIMARY KEY, user VARCHAR, movie_id INTEGER REFERENCES movies (id), "
+    "showtime VARCHAR, quantity INTEGER, total INTEGER)",
+    "INSERT INTO users (id, username, password, is_admin) VALUES (7, 'a', 'x', 0), (8, 'b', 'x', 0)",
+    "INSERT INTO movies (id, title, year, director, rating, format, price) VALUES (1, 'Old Movie', 2000, 'D', 7, 'Standard', 10)",
+    "INSERT INTO bookings (user, movie_id, showtime, quantity, total) VALUES ('a', 1, '14:00', 2, 20)",
+    "INSERT INTO bookings (user, movie_id, showtime, quantity, total) VALUES ('b', 1, '14:00', 1, 10)",
+    "INSERT INTO bookings (user, movie_id, showtime, quantity, total) VALUES ('c', 1, '2024-01-01 20:00', 3, 30)",
+]
+
+def insert_legacy_booking(engine, username):
+    # As a worker still running the previous release would
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO bookings (user, movie_id, quantity, total) VALUES ('{username}', 1, 1, 10)"))
+
+def test_migrations_upgrade_legacy_bookings(tmp_path, monkeypatch):
+    # Backfill one booking per transaction
+    monkeypatch.setattr(online, "MIGRATION_BATCH_SIZE", 1)
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    # A booking arrives between the first two batches of the backfill
+    pauses = []
+
+    def pause(seconds):
+        if not pauses:
+            insert_legacy_booking(engine, "a")
+        pauses.append(seconds)
+
+    monkeypatch.setattr(online, "MIGRATION_BATCH_PAUSE", 0.01)
+    monkeypatch.setattr(online.time, "sleep", pause)
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        # Queued and held by the previous release, by username only
+        conn.execute(text("INSERT INTO waitlist_entries (showtime_id, user, quantity, seq) VALUES (1, 'a', 1, 1)"))
+        conn.execute(text("INSERT INTO seat_holds (showtime_id, user, quantity, expires_at) VALUES (1, 'b', 1, '2030-01-01')"))
+    with engine.connect() as conn:
+        assert run_migrations(conn) == [
+            "m001_showtimes", "m002_booking_indexes", "m003_user_role_version", "m004_booking_sales",
+            "m005_movie_search", "m006_seat_holds", "m007_booking_user_ids", "m010_hold_waitlist_user_ids",
+        ]
+        assert run_migrations(conn) == []
+        # Three bookings, then the one inserted meanwhile, then the hold and the waitlist entry
+        assert len(pauses) == 6
+        # The previous release still writes bookings.user until the deploy ends
+        assert "user" in {c["name"] for c in inspect(conn).get_columns("bookings")}
+        assert conn.execute(text("SELECT user_id FROM bookings ORDER BY id")).scalars().all() == [7, 8, None, 7]
+        assert conn.execute(text("SELECT user_id FROM waitlist_entries")).scalars().all() == [7]
+        assert conn.execute(text("SELECT user_id FROM seat_holds")).scalars().all() == [8]
+
+    insert_legacy_booking(engine, "b")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO waitlist_entries (showtime_id, user, quantity, seq) VALUES (2, 'b', 1, 1)"))
+    with engine.connect() as conn:
+        assert run_migrations(conn, after_deploy=True) == [
+            "m008_drop_booking_usernames", "m009_sales_totals", "m011_finish_hold_waitlist_user_ids",
+        ]
+        assert run_migrations(conn, after_deploy=True) == []
+
+    afternoon = datetime.combine(date.today(), time(14, 0))
+    evening = datetime(2024, 1, 1, 20, 0)
+    with engine.connect() as conn:
+        assert {c["name"] for c in inspect(conn).get_columns("bookings")}.isdisjoint({"showtime", "user"})
+        indexes = {index["name"] for index in inspect(conn).get_indexes("bookings")}
+        assert indexes >= {"ix_bookings_user_id_and_id", "ix_bookings_movie_and_id", "ix_bookings_showtime_and_id"}
+        assert "ix_bookings_user_and_id" not in indexes
+        showtimes = dict(conn.execute(
+            Showtime.__table__.select().with_only_columns(Showtime.starts_at, Showtime.id)
+        ).all())
+        assert set(showtimes) == {afternoon, evening}
+
+        rows = conn.execute(Booking.__table__.select().order_by(Booking.id)).all()
+        assert [row.showtime_id for row in rows[:3]] == [showtimes[afternoon]] * 2 + [showtimes[evening]]
+        # "c" has no account: the booking is kept without an owner
+        assert [row.user_id for row in rows] == [7, 8, None, 7, 8]
+
+        inventory = dict(conn.execute(
+            SeatInventory.__table__.select().with_only_columns(SeatInventory.showtime_id, SeatInventory.seats_available)
+        ).all())
+        assert sorted(inventory.values()) == [97, 97]
+        assert conn.execute(text("SELECT COUNT(*) FROM seats WHERE booking_id IS NOT NULL")).scalar() == 6
+
+        sales = conn.execute(MovieSales.__table__.select()).one()
+        assert (sales.movie_id, sales.bookings, sales.tickets, sales.revenue) == (1, 3, 6, 60)
+        total = conn.execute(TotalSales.__table__.select()).one()
+        assert (total.id, total.bookings, total.tickets, total.revenue) == (1, 3, 6, 60)
+        assert conn.execute(text("SELECT user_id FROM waitlist_entries ORDER BY id")).scalars().all() == [7, 8]
+        assert {"ix_movie_sales_revenue"} == {index["name"] for index in inspect(conn).get_indexes("movie_sales")}
+    engine.dispose()
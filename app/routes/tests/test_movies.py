@@ -1,5 +1,7 @@
 import pytest
+import time
 from app.models.movie import Movie
+from app.services.catalog import catalog_cache
 
 def test_view_movies_list(client, test_movie):
     response = client.get("/")
@@ -13,3 +15,58 @@ def test_view_movies_list(client, test_movie):
 def test_nonexistent_movie(client):
     response = client.get("/movies/999")
     assert response.status_code == 404
+
+
+def test_home_returns_not_modified_for_matching_etag(client, test_movie):
+    response = client.get("/")
+    etag = response.headers["etag"]
+    assert response.headers["last-modified"]
+
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.text == ""
+
+    response = client.get("/", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert response.status_code == 304
+
+
+def test_home_is_served_from_cache(client, test_movie, db_session):
+    client.get("/")
+    db_session.add(Movie(title="Sneaky Movie", year=2020, director="X", rating=5, format="3D", price=9))
+    db_session.commit()
+
+    response = client.get("/")
+    assert "Sneaky Movie" not in response.text
+
+
+def test_home_cache_expires_after_its_max_age(client, test_movie, db_session, monkeypatch):
+    monkeypatch.setattr(catalog_cache, "max_age", 0.05)
+    first = client.get("/")
+    time.sleep(0.06)
+    # Reloaded with nothing new: the validators stay
+    response = client.get("/")
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.headers["last-modified"] == first.headers["last-modified"]
+
+    # A change made without invalidating, as by another process
+    db_session.add(Movie(title="Sneaky Movie", year=2020, director="X", rating=5, format="3D", price=9))
+    db_session.commit()
+    time.sleep(0.06)
+    assert "Sneaky Movie" in client.get("/").text
+
+
+def test_admin_changes_invalidate_home_cache(client, test_movie, login_admin):
+    etag = client.get("/").headers["etag"]
+
+    client.post("/admin/movies/1", data={
+        "title": "Renamed Movie",
+        "year": 2023,
+        "director": "Test Director",
+        "rating": 8,
+        "format": "Standard",
+        "price": 10
+    })
+
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Renamed Movie" in response.text
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from sqlalchemy import exc, text
+
+from app.database import LazyEngine, TimedQueuePool, engine_options, make_engine, pool_status
+from app.routes import metrics as metrics_routes
+
+def test_engine_options_apply_pool_and_timeout_settings():
+    options = engine_options("postgresql+asyncpg://app@db/movies", pool_size=7, statement_timeout=2500, pgbouncer=False)
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 7
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "2500"}}
+
+    options = engine_options("postgresql+asyncpg://app@pgbouncer/movies", pgbouncer=True)
+    assert options["connect_args"] == {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+
+    options = engine_options("sqlite+aiosqlite://", statement_timeout=1000)
+    assert "poolclass" not in options
+    assert options["connect_args"] == {"timeout": 1.0}
+
+def test_pool_records_checkout_waits_and_timeouts(tmp_path):
+    pool_engine = make_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.2)
+
+    async def run():
+        async with pool_engine.connect() as held:
+            await held.execute(text("SELECT 1"))
+            assert pool_status(pool_engine)["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                async with pool_engine.connect():
+                    pass
+        async with pool_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await pool_engine.dispose()
+
+    asyncio.run(run())
+    status = pool_status(pool_engine)
+    assert status["checkouts"] == 2
+    assert status["timeouts"] == 1
+    assert status["wait"].count == 2
+
+def test_metrics_expose_pool_stats(client, tmp_path, monkeypatch):
+    # A throwaway engine in place of the primary one, which reads DATABASE_URL
+    pool_engine = LazyEngine(lambda: make_engine(f"sqlite:///{tmp_path / 'pool.db'}"))
+    monkeypatch.setattr(metrics_routes, "engine", pool_engine)
+    assert "db_pool_checked_out" not in client.get("/metrics").text
+
+    # The pool is reported once the lazily created engine exists
+    pool_engine.get()
+    text = client.get("/metrics").text
+    assert "db_pool_checked_out" in text
+    assert 'db_pool_checkout_wait_seconds_bucket{database="primary",le="+Inf"}' in text
+    asyncio.run(pool_engine.dispose())
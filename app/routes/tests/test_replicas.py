@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.database import Base, replicas, to_async_url
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    # A second database standing in for a replica that has not caught up
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as session:
+        movie = Movie(title="Replica Movie", year=2020, director="R", rating=5, format="Standard", price=10)
+        session.add(movie)
+        session.flush()
+        showtime = Showtime(movie_id=movie.id, screen="Screen 1", starts_at=datetime.now() + timedelta(days=1), capacity=10)
+        session.add(showtime)
+        session.flush()
+        # The same user as on the primary, with the same id
+        user = User(username="testuser", password="testpass")
+        session.add(user)
+        session.add(Booking(user=user, movie_id=movie.id, showtime_id=showtime.id, quantity=1, total=10))
+        session.commit()
+    async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+    monkeypatch.setattr(replicas, "session_factories", [async_sessionmaker(async_engine, expire_on_commit=False)])
+    yield sync_engine
+    sync_engine.dispose()
+
+def test_read_only_pages_use_the_replica(client, login_user, test_showtime, replica):
+    response = client.get("/bookings")
+    assert response.status_code == 200
+    assert "Replica Movie" in response.text
+
+def test_reads_stick_to_primary_after_a_booking(client, login_user, test_movie, test_showtime, replica):
+    response = client.post("/book", data={"movie_id": test_movie.id, "showtime_id": test_showtime.id, "quantity": 1}, follow_redirects=False)
+    assert response.status_code == 303
+
+    response = client.get("/bookings")
+    assert "Test Movie" in response.text
+    assert "Replica Movie" not in response.text
+
+def test_admin_movie_list_reads_the_replica_until_a_change(client, login_admin, test_movie, replica):
+    assert "Replica Movie" in client.get("/admin/movies").text
+
+    client.post(f"/admin/movies/{test_movie.id}/delete")
+    response = client.get("/admin/movies")
+    assert "Replica Movie" not in response.text
+
+def test_replica_queries_and_pools_are_measured(client, login_user, replica, monkeypatch):
+    # Replica engines built from DATABASE_REPLICA_URLS on the first read
+    monkeypatch.setattr(replicas, "urls", [str(replica.url)])
+    monkeypatch.setattr(replicas, "engines", None)
+    monkeypatch.setattr(replicas, "session_factories", None)
+    assert "Replica Movie" in client.get("/bookings").text
+
+    text = client.get("/metrics").text
+    assert 'db_pool_checked_out{database="replica1"} 0' in text
+    queries = next(line for line in text.splitlines() if line.startswith('http_request_db_queries_sum{method="GET",route="/bookings"}'))
+    assert float(queries.split()[-1]) > 0
+    client.portal.call(replicas.engines[0].dispose)
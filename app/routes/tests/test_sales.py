@@ -0,0 +1,72 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking import Booking
+from app.models.sales import MovieSales, ShowtimeSales, DailySales, TotalSales
+from app.services.sales import reconcile_sales, rebuild_sales
+
+def book(client, movie, showtime, quantity):
+    return client.post("/book", data={"movie_id": movie.id, "showtime_id": showtime.id, "quantity": quantity})
+
+def reconcile(async_engine):
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            return await reconcile_sales(db)
+    return asyncio.run(run())
+
+def test_bookings_and_cancellations_update_aggregates(client, login_user, test_movie, test_showtime, db_session, async_engine):
+    book(client, test_movie, test_showtime, 2)
+    book(client, test_movie, test_showtime, 3)
+    first = db_session.query(Booking).order_by(Booking.id).first()
+    client.post("/cancel", data={"booking_id": first.id})
+
+    movie = db_session.get(MovieSales, test_movie.id)
+    assert (movie.bookings, movie.tickets, movie.revenue) == (1, 3, 30)
+    showtime = db_session.get(ShowtimeSales, test_showtime.id)
+    assert (showtime.bookings, showtime.tickets, showtime.revenue) == (1, 3, 30)
+    assert db_session.query(DailySales).one().revenue == 30
+    total = db_session.get(TotalSales, 1)
+    assert (total.bookings, total.tickets, total.revenue) == (1, 3, 30)
+    assert reconcile(async_engine) == []
+
+def test_sales_dashboard(client, login_user, test_movie, test_showtime, test_admin, db_session):
+    book(client, test_movie, test_showtime, 4)
+    client.get("/logout")
+    client.post("/login", data={"username": "admin", "password": "adminpass"})
+
+    response = client.get("/admin/sales")
+    assert response.status_code == 200
+    assert "$40" in response.text
+    assert "Test Movie" in response.text
+
+    # Before migration m009 an existing database has no total row yet
+    db_session.query(TotalSales).delete()
+    db_session.commit()
+    assert "$40" in client.get("/admin/sales").text
+
+def test_top_rows_are_read_from_the_revenue_indexes(db_session):
+    for table in ("movie_sales", "showtime_sales"):
+        plan = " ".join(row[-1] for row in db_session.execute(text(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {table} WHERE bookings > 0 ORDER BY revenue DESC LIMIT 20"
+        )))
+        assert f"ix_{table}_revenue" in plan and "TEMP B-TREE" not in plan
+
+def test_reconciliation_reports_and_rebuild_repairs_drift(client, login_user, test_movie, test_showtime, db_session, async_engine):
+    book(client, test_movie, test_showtime, 2)
+    db_session.get(MovieSales, test_movie.id).revenue = 999
+    db_session.commit()
+
+    db_session.get(TotalSales, 1).tickets = 5
+    db_session.commit()
+
+    assert reconcile(async_engine) == [
+        ("movie_sales", (test_movie.id,), (1, 2, 20), (1, 2, 999)),
+        ("total_sales", (1,), (1, 2, 20), (1, 5, 20)),
+    ]
+
+    async def repair():
+        async with AsyncSession(async_engine) as db:
+            await rebuild_sales(db)
+    asyncio.run(repair())
+    assert reconcile(async_engine) == []
@@ -0,0 +1,62 @@
+import pytest
+
+from app.models.movie import Movie
+from app.services.search import SuggestionIndex
+
+@pytest.fixture
+def catalog(db_session):
+    movies = [
+        Movie(title="The Godfather", year=1972, director="Francis Ford Coppola", rating=10, format="Standard", price=10),
+        Movie(title="The Godfather Part II", year=1974, director="Francis Ford Coppola", rating=9, format="Standard", price=10),
+        Movie(title="Gone Girl", year=2014, director="David Fincher", rating=8, format="IMAX", price=15),
+        Movie(title="Apocalypse Now", year=1979, director="Francis Ford Coppola", rating=9, format="IMAX", price=12),
+    ]
+    db_session.add_all(movies)
+    db_session.commit()
+    return movies
+
+def titles(response):
+    return [title for title in ("The Godfather Part II", "The Godfather", "Gone Girl", "Apocalypse Now")
+            if f">{title}<" in response.text]
+
+def test_search_matches_title_and_director_prefixes(client, catalog):
+    assert set(titles(client.get("/search?q=godf"))) == {"The Godfather", "The Godfather Part II"}
+    assert set(titles(client.get("/search?q=coppola"))) == {"The Godfather", "The Godfather Part II", "Apocalypse Now"}
+    assert titles(client.get("/search?q=fincher gon")) == ["Gone Girl"]
+    assert client.get('/search?q="*)(').status_code == 200
+
+def test_search_facets_narrow_and_count(client, catalog):
+    response = client.get("/search?q=coppola&format=IMAX")
+    assert titles(response) == ["Apocalypse Now"]
+    assert "1 movie found" in response.text
+    # The format facet still counts the other formats for the query
+    assert 'format=Standard" class="hover:underline ">Standard</a>\n            <span class="text-gray-500">(2)</span>' in response.text
+
+def test_search_pages(client, catalog, monkeypatch):
+    monkeypatch.setattr("app.services.search.SEARCH_PAGE_SIZE", 2)
+    first = client.get("/search?q=coppola")
+    second = client.get("/search?q=coppola&page=2")
+    assert len(titles(first)) == 2 and len(titles(second)) == 1
+    assert set(titles(first) + titles(second)) == {"The Godfather", "The Godfather Part II", "Apocalypse Now"}
+    assert "Page 2 of 2" in second.text
+    assert client.get("/search?year=abc").status_code == 400
+
+def test_search_index_follows_movie_changes(client, catalog, db_session):
+    catalog[2].title = "Fight Club"
+    db_session.commit()
+    assert "Fight Club" in client.get("/search?q=fight").text
+    assert titles(client.get("/search?q=gone")) == []
+
+def test_suggest_autocompletes_from_the_catalog(client, catalog):
+    response = client.get("/search/suggest?q=the god")
+    assert [movie["title"] for movie in response.json()] == ["The Godfather", "The Godfather Part II"]
+    assert client.get("/search/suggest?q=").json() == []
+
+def test_suggestion_index_requires_earlier_words():
+    index = SuggestionIndex([
+        {"id": 1, "title": "Gone Girl", "director": "David Fincher"},
+        {"id": 2, "title": "Gone Baby Gone", "director": "Ben Affleck"},
+    ])
+    assert [movie["id"] for movie in index.suggest("go")] == [2, 1]
+    assert [movie["id"] for movie in index.suggest("fincher go")] == [1]
+    assert index.suggest("zz") == []
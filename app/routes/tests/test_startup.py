@@ -0,0 +1,60 @@
+import asyncio
+import os
+import subprocess
+import sys
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.main import create_app
+from app.migrations import MIGRATIONS, upgrade_database
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.utils import seed
+
+def test_importing_the_app_creates_no_engine():
+    script = "import app.main; from app.database import engine, replicas; print(engine.created, replicas.session_factories)"
+    env = dict(os.environ, DATABASE_URL="postgresql://nobody@unreachable/movies", DATABASE_REPLICA_URLS="")
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "None"]
+
+def test_upgrade_database_creates_the_schema_once(tmp_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}", poolclass=NullPool)
+
+    async def run():
+        applied = (
+            await upgrade_database(async_engine),
+            await upgrade_database(async_engine, after_deploy=True),
+            await upgrade_database(async_engine, after_deploy=True),
+        )
+        async with async_engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+        return applied, tables
+
+    (first, after_deploy, again), tables = asyncio.run(run())
+    deploy = MIGRATIONS.index("m008_drop_booking_usernames")
+    assert "m010_hold_waitlist_user_ids" in MIGRATIONS[:deploy]
+    assert first == MIGRATIONS[:deploy]
+    assert after_deploy == MIGRATIONS[deploy:]
+    assert again == []
+    assert {"users", "movies", "bookings", "schema_migrations"} <= set(tables)
+
+def test_seeding_is_idempotent(async_engine, db_session, monkeypatch):
+    monkeypatch.setattr(seed, "SessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    asyncio.run(seed.initialize_data())
+    counts = (db_session.query(Movie).count(), db_session.query(Showtime).count(), db_session.query(User).count())
+    asyncio.run(seed.initialize_data())
+    assert (db_session.query(Movie).count(), db_session.query(Showtime).count(), db_session.query(User).count()) == counts
+    assert counts[0] == 3 and counts[2] == 1
+
+def test_app_seeds_on_startup_only_when_asked(async_engine, db_session, monkeypatch):
+    monkeypatch.setattr(seed, "SessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    with TestClient(create_app(seed=False, background_tasks=False)):
+        pass
+    assert db_session.query(User).count() == 0
+
+    with TestClient(create_app(seed=True, background_tasks=False)):
+        pass
+    assert db_session.query(User).filter(User.username == "admin", User.is_admin).count() == 1
@@ -0,0 +1,179 @@
+import asyncio
+import warnings
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import SAWarning
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.models.sales import ShowtimeSales
+from app.models.user import User
+from app.models.waitlist import WaitlistQueue, WaitlistEntry, WaitlistDeparture
+from app.services.bookings import cancel_bookings
+from app.services.waitlist import SeatsMissing, leave_waitlist, waitlist_entries, promote_waitlist
+
+def book(client, movie, showtime, quantity):
+    return client.post("/book", data={
+        "movie_id": movie.id, "showtime_id": showtime.id, "quantity": quantity,
+    }, follow_redirects=False)
+
+def join(client, movie, showtime, quantity):
+    return client.post("/waitlist", data={
+        "movie_id": movie.id, "showtime_id": showtime.id, "quantity": quantity,
+    }, follow_redirects=False)
+
+def wait(db_session, showtime, user, quantity):
+    # Queue another user directly, as join_waitlist would
+    account = User(username=user, password="x")
+    db_session.add(account)
+    db_session.flush()
+    queue = db_session.get(WaitlistQueue, showtime.id)
+    queue.next_seq += 1
+    db_session.add(WaitlistEntry(
+        showtime_id=showtime.id, user_id=account.id, user=user, quantity=quantity, seq=queue.next_seq
+    ))
+    db_session.commit()
+    return account
+
+def cancel(client, db_session, *bookings):
+    for booking in bookings:
+        client.post("/cancel", data={"booking_id": booking.id})
+    db_session.expire_all()
+
+def test_cannot_join_while_seats_are_available(client, login_user, test_movie, test_showtime):
+    book(client, test_movie, test_showtime, 99)
+    assert join(client, test_movie, test_showtime, 1).status_code == 409
+    assert join(client, test_movie, test_showtime, 2).status_code == 303
+
+def test_cancellation_promotes_waiting_users_in_order(client, login_user, test_movie, test_showtime, db_session):
+    book(client, test_movie, test_showtime, 97)
+    book(client, test_movie, test_showtime, 3)
+    assert join(client, test_movie, test_showtime, 2).status_code == 303
+    assert join(client, test_movie, test_showtime, 1).status_code == 409
+    wait(db_session, test_showtime, "second", 1)
+    wait(db_session, test_showtime, "third", 1)
+
+    small = db_session.query(Booking).filter(Booking.quantity == 3).one()
+    cancel(client, db_session, small)
+
+    promoted = db_session.query(Booking).filter(Booking.quantity < 97).order_by(Booking.id).all()
+    assert [(b.user.username, b.quantity, b.total) for b in promoted] == [("testuser", 2, 20), ("second", 1, 10)]
+    assert db_session.query(SeatInventory).one().seats_available == 0
+    for booking in promoted:
+        assert db_session.query(Seat).filter(Seat.booking_id == booking.id).count() == booking.quantity
+    assert [e.user for e in db_session.query(WaitlistEntry)] == ["third"]
+    assert db_session.get(ShowtimeSales, test_showtime.id).tickets == 100
+
+    response = client.get("/bookings")
+    assert "Waitlist" not in response.text
+
+def test_promotion_is_strict_fifo(client, login_user, test_movie, test_showtime, db_session):
+    book(client, test_movie, test_showtime, 99)
+    book(client, test_movie, test_showtime, 1)
+    assert join(client, test_movie, test_showtime, 3).status_code == 303
+    wait(db_session, test_showtime, "second", 1)
+
+    cancel(client, db_session, db_session.query(Booking).filter(Booking.quantity == 1).one())
+
+    # The head needs 3 seats, so the 1-seat entry behind it is not served first
+    assert db_session.query(Booking).count() == 1
+    assert db_session.query(WaitlistEntry).count() == 2
+    assert db_session.query(SeatInventory).one().seats_available == 1
+
+def test_waitlist_position_and_leave(client, login_user, test_movie, test_showtime, db_session):
+    book(client, test_movie, test_showtime, 99)
+    book(client, test_movie, test_showtime, 1)
+    db_session.add(WaitlistQueue(showtime_id=test_showtime.id, next_seq=0, head_seq=0))
+    db_session.commit()
+    wait(db_session, test_showtime, "first", 1)
+    wait(db_session, test_showtime, "second", 1)
+    assert join(client, test_movie, test_showtime, 2).status_code == 303
+    assert "#3" in client.get("/bookings").text
+
+    # Leaving from the middle moves everyone behind up
+    second = db_session.query(WaitlistEntry).filter_by(user="second").one()
+    client.post("/login", data={"username": "second", "password": "x"})
+    client.post(f"/waitlist/{second.id}/leave")
+    client.post("/login", data={"username": "testuser", "password": "testpass"})
+    assert "#2" in client.get("/bookings").text
+    assert db_session.get(WaitlistDeparture, (test_showtime.id, second.seq)).departed == 1
+
+    cancel(client, db_session, db_session.query(Booking).filter(Booking.quantity == 1).one())
+    assert db_session.query(Booking).filter(Booking.user.has(username="first")).count() == 1
+    assert "next" in client.get("/bookings").text
+
+    entry = db_session.query(WaitlistEntry).one()
+    client.post(f"/waitlist/{entry.id}/leave")
+    assert db_session.query(WaitlistEntry).count() == 0
+
+def test_positions_count_only_entries_still_waiting(async_engine, db_session, test_showtime):
+    db_session.add(WaitlistQueue(showtime_id=test_showtime.id, next_seq=0, head_seq=0))
+    db_session.commit()
+    for i in range(40):
+        wait(db_session, test_showtime, f"user{i}", 1)
+    entries = {entry.user: (entry.id, entry.user_id) for entry in db_session.query(WaitlistEntry)}
+
+    async def leave(*users):
+        async with AsyncSession(async_engine) as db:
+            return [await leave_waitlist(db, *entries[user]) for user in users]
+
+    async def positions(users):
+        async with AsyncSession(async_engine) as db:
+            return {user: position for user in users for _, position in await waitlist_entries(db, entries[user][1])}
+
+    assert asyncio.run(leave("user1")) == [True]
+    # user0 and user2 are served, as promote_waitlist would
+    db_session.query(WaitlistEntry).filter(WaitlistEntry.user.in_(["user0", "user2"])).delete()
+    db_session.get(WaitlistQueue, test_showtime.id).head_seq = 3
+    db_session.commit()
+    leaving = {5, 6, 7, 16, 31, 39}
+    assert asyncio.run(leave(*(f"user{i}" for i in sorted(leaving)), "user1")) == [True] * len(leaving) + [False]
+
+    waiting = [f"user{i}" for i in range(3, 40) if i not in leaving]
+    assert asyncio.run(positions(waiting)) == {user: position for position, user in enumerate(waiting, 1)}
+
+def test_renamed_users_keep_their_place_and_promoted_booking(client, login_user, test_movie, test_showtime, db_session):
+    book(client, test_movie, test_showtime, 99)
+    book(client, test_movie, test_showtime, 1)
+    assert join(client, test_movie, test_showtime, 1).status_code == 303
+    db_session.query(User).filter_by(username="testuser").one().username = "renamed"
+    db_session.commit()
+
+    assert "next" in client.get("/bookings").text
+    cancel(client, db_session, db_session.query(Booking).filter(Booking.quantity == 1).one())
+    promoted = db_session.query(Booking).filter(Booking.quantity == 1).one()
+    assert promoted.user.username == "renamed"
+
+def test_promoted_booking_can_reuse_a_cancelled_id(client, login_user, test_movie, test_showtime, db_session, async_engine):
+    book(client, test_movie, test_showtime, 97)
+    book(client, test_movie, test_showtime, 3)
+    assert join(client, test_movie, test_showtime, 3).status_code == 303
+    last = db_session.query(Booking).filter(Booking.quantity == 3).one().id
+
+    async def run():
+        # As the app's sessions are
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            booking = await db.get(Booking, last)
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", SAWarning)
+                return [(booking.id, booking.user_id) for booking in await cancel_bookings(db, [booking])]
+
+    # SQLite hands the cancelled booking's id to the promoted one
+    assert asyncio.run(run()) == [(last, db_session.query(User).filter_by(username="testuser").one().id)]
+
+def test_promotion_refuses_seats_the_inventory_miscounts(client, login_user, test_movie, test_showtime, db_session, async_engine):
+    book(client, test_movie, test_showtime, 100)
+    assert join(client, test_movie, test_showtime, 1).status_code == 303
+    # Counted as available, yet every seat is still booked
+    db_session.query(SeatInventory).one().seats_available = 1
+    db_session.commit()
+
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            with pytest.raises(SeatsMissing):
+                await promote_waitlist(db, test_showtime.id)
+            await db.rollback()
+            return (await db.scalars(select(WaitlistEntry.user))).all()
+
+    assert asyncio.run(run()) == ["testuser"]
@@ -0,0 +1,6 @@
+"""
+Import all schemas to make them available from the schemas package.
+"""
+from app.schemas.booking import BookingRequest, BookingSummary, BookingRow, BookingPage, RoleUpdate
+from app.schemas.movie import MovieRecord, MovieSummary, ShowtimeSummary, MovieDetail
+from app.schemas.sales import SalesReport
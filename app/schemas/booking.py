@@ -0,0 +1,46 @@
+"""
+Booking schemas.
+"""
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+class BookingRequest(BaseModel):
+    """A booking as submitted to the API; ``hold_id`` books a seat hold."""
+    movie_id: int
+    showtime_id: int
+    quantity: int = Field(gt=0)
+    hold_id: Optional[int] = None
+
+class BookingSummary(BaseModel):
+    """One of the current user's bookings."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    movie_id: Optional[int]
+    movie: Optional[str]
+    showtime_id: Optional[int]
+    starts_at: Optional[datetime]
+    screen: Optional[str]
+    quantity: int
+    total: int
+
+class BookingRow(BaseModel):
+    """A booking as listed in the admin views."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user: Optional[str]
+    movie: Optional[str]
+    showtime: Optional[datetime]
+    quantity: int
+    total: int
+
+class BookingPage(BaseModel):
+    """One page of admin booking rows and the cursor of the next one."""
+    bookings: list[BookingRow]
+    next_after: Optional[int]
+
+class RoleUpdate(BaseModel):
+    """New role of a user."""
+    is_admin: bool
@@ -0,0 +1,41 @@
+"""
+Movie schemas.
+"""
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+
+class MovieRecord(BaseModel):
+    """A movie as accepted from imports, with the same rules as the admin form."""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    title: str = Field(min_length=1)
+    year: int = Field(gt=1900, lt=2100)
+    director: str = Field(min_length=1)
+    rating: int = Field(ge=1, le=10)
+    format: str = Field(min_length=1)
+    price: int = Field(gt=0)
+
+class MovieSummary(BaseModel):
+    """A movie as listed by the API."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    year: int
+    director: str
+    rating: int
+    format: str
+    price: int
+
+class ShowtimeSummary(BaseModel):
+    """An upcoming showtime and how many seats it has left."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    screen: str
+    starts_at: datetime
+    seats_available: int
+
+class MovieDetail(MovieSummary):
+    """A movie with its upcoming showtimes, as needed to book it."""
+    showtimes: list[ShowtimeSummary]
@@ -0,0 +1,32 @@
+"""
+Sales dashboard schemas.
+"""
+from datetime import date, datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+class SalesTotals(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    bookings: int
+    tickets: int
+    revenue: int
+
+class MovieSalesRow(SalesTotals):
+    movie_id: int
+    title: Optional[str]
+
+class ShowtimeSalesRow(SalesTotals):
+    showtime_id: int
+    title: Optional[str]
+    screen: Optional[str]
+    starts_at: Optional[datetime]
+
+class DailySalesRow(SalesTotals):
+    day: date
+
+class SalesReport(SalesTotals):
+    """Everything the admin sales dashboard shows."""
+    movies: list[MovieSalesRow]
+    showtimes: list[ShowtimeSalesRow]
+    days: list[DailySalesRow]
@@ -0,0 +1,17 @@
+"""
+Import all services to make them available from the services package.
+"""
+from app.services.availability import FeedFull, availability_feed, announce_availability
+from app.services.bookings import booking_rows, fetch_booking_page, fetch_user_bookings, book_seats, cancel_bookings, export_bookings
+from app.services.catalog import catalog_cache
+from app.services.history import HistorySummary, history_summaries, history_summary
+from app.services.holds import HoldExpired, create_hold, convert_hold, release_hold, expire_holds
+from app.services.idempotency import IdempotencyConflict, KeyTooLong, idempotency_store, request_fingerprint
+from app.services.inventory import SoldOut, reserve_seats, release_claimed_seats
+from app.services.movie_import import ImportReport, import_movies
+from app.services.passwords import HasherOverloaded, password_hasher
+from app.services.principals import Principal, principal_cache, get_principal, set_user_role
+from app.services.sales import record_booking, record_bookings, record_cancellations, reconcile_sales, rebuild_sales, sales_dashboard
+from app.services.search import search_movies, suggestion_cache
+from app.services.showtimes import ShowtimeNotFound, ShowtimeStarted, bookable_showtime, schedule_default_showtimes, top_up_schedules, showtime_availability
+from app.services.waitlist import AlreadyWaiting, SeatsAvailable, SeatsMissing, join_waitlist, leave_waitlist, waitlist_entries, promote_waitlist
@@ -0,0 +1,219 @@
+"""
+Live seat availability for the booking page.
+
+Every booking, cancellation and seat hold publishes, once committed, the
+seats left in the showtimes it touched to the availability feed. Booking
+pages listen through a server-sent events stream per movie. Each listener
+keeps only the latest count per showtime until its next event, so a burst
+of bookings reaches it as at most AVAILABILITY_MAX_EVENTS_PER_SECOND events
+a second, and an idle listener costs a suspended generator and a small dict.
+
+Updates reach the listeners of this worker directly or, with REDIS_URL set,
+go through a Redis channel every worker listens to. The counts are advisory:
+two updates read concurrently may arrive out of order, and the next change
+to the showtime corrects it; booking itself always checks the inventory.
+"""
+import asyncio
+import json
+import logging
+from sqlalchemy import select, func
+
+from app.config import REDIS_URL, AVAILABILITY_MAX_EVENTS_PER_SECOND, AVAILABILITY_KEEPALIVE, AVAILABILITY_MAX_SUBSCRIBERS
+from app.models.inventory import SeatInventory
+from app.models.showtime import Showtime
+
+logger = logging.getLogger(__name__)
+
+class FeedFull(Exception):
+    """Raised when a worker already has as many listeners as it accepts."""
+
+class Subscription:
+    """One listener's pending updates for one movie."""
+    __slots__ = ("movie_id", "pending", "ready")
+
+    def __init__(self, movie_id):
+        self.movie_id = movie_id
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, seats):
+        self.pending.update(seats)
+        self.ready.set()
+
+    async def next_batch(self, timeout):
+        """
+        Wait up to ``timeout`` seconds for updates and return them as
+        {showtime_id: seats_available} (empty if none came).
+        """
+        if not self.pending:
+            # A timer rather than wait_for, which would start a task per wait
+            timer = asyncio.get_running_loop().call_later(timeout, self.ready.set)
+            try:
+                await self.ready.wait()
+            finally:
+                timer.cancel()
+        self.ready.clear()
+        batch, self.pending = self.pending, {}
+        return batch
+
+class RedisAvailabilityBroker:
+    """Carries updates between workers over a Redis pub/sub channel."""
+
+    def __init__(self, url, channel="availability"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.channel = channel
+
+    async def publish(self, updates):
+        await self.client.publish(self.channel, json.dumps(updates))
+
+    async def listen(self):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield {
+                        int(movie_id): {int(showtime_id): seats for showtime_id, seats in showtimes.items()}
+                        for movie_id, showtimes in json.loads(message["data"]).items()
+                    }
+        finally:
+            await pubsub.aclose()
+
+class AvailabilityFeed:
+    """
+    Listeners by movie in this worker. Without a ``broker`` updates are
+    delivered to them directly; with one they go out through it and come
+    back in through ``listen``.
+    """
+
+    def __init__(self, broker=None, max_subscribers=AVAILABILITY_MAX_SUBSCRIBERS):
+        self.broker = broker
+        self.max_subscribers = max_subscribers
+        self.subscriptions = {}
+        self.subscribers = 0
+        self.published = 0
+
+    @property
+    def full(self):
+        return self.subscribers >= self.max_subscribers
+
+    def subscribe(self, movie_id):
+        if self.full:
+            raise FeedFull(f"{self.subscribers} listeners already")
+        subscription = Subscription(movie_id)
+        self.subscriptions.setdefault(movie_id, set()).add(subscription)
+        self.subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        listeners = self.subscriptions.get(subscription.movie_id)
+        if listeners and subscription in listeners:
+            listeners.remove(subscription)
+            self.subscribers -= 1
+            if not listeners:
+                del self.subscriptions[subscription.movie_id]
+
+    def deliver(self, updates):
+        """
+        Hand {movie_id: {showtime_id: seats}} to this worker's listeners.
+        """
+        for movie_id, seats in updates.items():
+            for subscription in self.subscriptions.get(movie_id, ()):
+                subscription.push(seats)
+
+    async def publish(self, updates):
+        self.published += 1
+        if self.broker is None:
+            self.deliver(updates)
+        else:
+            await self.broker.publish(updates)
+
+    async def listen(self):
+        async for updates in self.broker.listen():
+            self.deliver(updates)
+
+    def clear(self):
+        self.subscriptions.clear()
+        self.subscribers = 0
+        self.published = 0
+
+if REDIS_URL:
+    availability_feed = AvailabilityFeed(RedisAvailabilityBroker(REDIS_URL))
+else:
+    availability_feed = AvailabilityFeed()
+
+async def announce_availability(db, showtime_ids):
+    """
+    Publish the seats left in ``showtime_ids``; call after committing the
+    change. Failures are logged, never raised: the change itself is done.
+    """
+    if not showtime_ids or (availability_feed.broker is None and not availability_feed.subscriptions):
+        return
+    try:
+        rows = await db.execute(
+            select(
+                Showtime.movie_id,
+                Showtime.id,
+                func.coalesce(SeatInventory.seats_available, Showtime.capacity),
+            )
+            .outerjoin(SeatInventory, SeatInventory.showtime_id == Showtime.id)
+            .filter(Showtime.id.in_(set(showtime_ids)))
+        )
+        updates = {}
+        for movie_id, showtime_id, seats in rows:
+            updates.setdefault(movie_id, {})[showtime_id] = seats
+        await availability_feed.publish(updates)
+    except Exception:
+        logger.exception("Could not publish seat availability")
+
+def sse_event(seats):
+    return f"event: availability\ndata: {json.dumps(seats)}\n\n".encode()
+
+async def availability_events(
+    movie_id, read_snapshot, feed=availability_feed,
+    max_rate=AVAILABILITY_MAX_EVENTS_PER_SECOND, keepalive=AVAILABILITY_KEEPALIVE,
+):
+    """
+    Server-sent events for the showtimes of ``movie_id``: the seats left in
+    each, as awaited from ``read_snapshot()``, then every change, merged into
+    at most ``max_rate`` events a second, with a comment every ``keepalive``
+    idle seconds so proxies keep the connection open.
+
+    The subscription is taken here, once the response is streaming, and
+    before the snapshot is read so no change falls in between; a client that
+    goes away before the first event never holds one. Unsubscribes when the
+    client goes away.
+    """
+    try:
+        subscription = feed.subscribe(movie_id)
+    except FeedFull:
+        # Filled up since the request was accepted: the browser retries shortly
+        yield b"retry: 5000\n\n"
+        return
+    try:
+        yield b"retry: 5000\n" + sse_event(await read_snapshot())
+        while True:
+            batch = await subscription.next_batch(keepalive)
+            if not batch:
+                yield b": keepalive\n\n"
+                continue
+            yield sse_event(batch)
+            if max_rate:
+                # Updates arriving meanwhile are merged into the next event
+                await asyncio.sleep(1 / max_rate)
+    finally:
+        feed.unsubscribe(subscription)
+
+async def run_availability_listener(feed=availability_feed, retry_interval=1.0):
+    """
+    Deliver updates published by every worker to this worker's listeners
+    until cancelled, reconnecting to the broker when it fails.
+    """
+    while True:
+        try:
+            await feed.listen()
+        except Exception:
+            logger.exception("Availability listener failed")
+        await asyncio.sleep(retry_interval)
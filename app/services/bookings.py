@@ -0,0 +1,247 @@
+"""
+Booking placement, cancellation and queries shared by the pages and the
+JSON API.
+"""
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import BOOKING_PAGE_SIZE
+from app.models.booking import Booking
+from app.models.inventory import Seat
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.services.availability import announce_availability
+from app.services.history import history_summaries
+from app.services.holds import convert_hold
+from app.services.idempotency import idempotency_store, request_fingerprint
+from app.services.inventory import reserve_seats, release_claimed_seats
+from app.services.sales import record_booking, record_cancellations
+from app.services.showtimes import bookable_showtime
+from app.services.waitlist import promote_waitlist
+
+def booking_rows(filters):
+    """
+    Select only the columns the admin views show, with ``filters`` applied.
+    Rows are (id, user, movie, showtime, quantity, total), ``user`` being the
+    username.
+    """
+    query = (
+        select(
+            Booking.id,
+            User.username.label("user"),
+            Movie.title.label("movie"),
+            Showtime.starts_at.label("showtime"),
+            Booking.quantity,
+            Booking.total,
+        )
+        .outerjoin(User, Booking.user_id == User.id)
+        .outerjoin(Movie, Booking.movie_id == Movie.id)
+        .outerjoin(Showtime, Booking.showtime_id == Showtime.id)
+    )
+    if filters.movie_id is not None:
+        query = query.filter(Booking.movie_id == filters.movie_id)
+    if filters.user is not None:
+        # Resolved through the unique username index, then (user_id, id)
+        query = query.filter(User.username == filters.user)
+    if filters.starts_from is not None:
+        query = query.filter(Showtime.starts_at >= filters.starts_from)
+    if filters.starts_to is not None:
+        query = query.filter(Showtime.starts_at < filters.starts_to)
+    return query
+
+async def fetch_booking_page(db, filters, after=0, limit=50):
+    """
+    Return one page of booking rows with ids greater than ``after``, in id
+    order, and the cursor for the next page (None on the last page).
+    Seeks on the primary key, so every page costs the same however deep it is.
+    """
+    result = await db.execute(
+        booking_rows(filters)
+        .filter(Booking.id > after)
+        .order_by(Booking.id)
+        .limit(limit + 1)
+    )
+    rows = result.mappings().all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+def user_booking_rows(user_id):
+    """
+    Select the columns a user's booking list shows, newest first. Rows are
+    (id, movie_id, movie, price, showtime_id, starts_at, screen, quantity,
+    total).
+    """
+    return (
+        select(
+            Booking.id,
+            Booking.movie_id,
+            Movie.title.label("movie"),
+            Movie.price,
+            Booking.showtime_id,
+            Showtime.starts_at,
+            Showtime.screen,
+            Booking.quantity,
+            Booking.total,
+        )
+        .outerjoin(Movie, Booking.movie_id == Movie.id)
+        .outerjoin(Showtime, Booking.showtime_id == Showtime.id)
+        .filter(Booking.user_id == user_id)
+        .order_by(Booking.id.desc())
+    )
+
+async def fetch_user_bookings(db, user_id, before=None, limit=BOOKING_PAGE_SIZE):
+    """
+    Return one page of the user's booking rows with ids below ``before``,
+    newest first, and the cursor for the next (older) page, None on the last.
+    Seeks on the (user_id, id) index, so every page costs the same however
+    many bookings the user has.
+    """
+    query = user_booking_rows(user_id)
+    if before is not None:
+        query = query.filter(Booking.id < before)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+async def place_booking(db, user_id, showtime, quantity, hold_id=None):
+    """
+    Book ``quantity`` seats of ``showtime`` (loaded with its movie) for user
+    ``user_id``, taking the seats of hold ``hold_id`` if given, and add the
+    booking to the sales aggregates. Raises SoldOut or HoldExpired; the
+    caller commits or rolls back.
+    """
+    booking = Booking(
+        user_id=user_id,
+        movie_id=showtime.movie_id,
+        showtime=showtime,
+        quantity=quantity,
+        total=showtime.movie.price * quantity,
+    )
+    db.add(booking)
+    await db.flush()
+    if hold_id is None:
+        await reserve_seats(db, booking)
+    else:
+        await convert_hold(db, hold_id, booking)
+    await record_booking(db, booking)
+    return booking
+
+async def book_seats(db, user, user_id, movie_id, showtime_id, quantity, hold_id=None,
+                     idempotency_key=None, path="", location="/bookings"):
+    """
+    Book seats for a request from the pages or the API: claim
+    ``idempotency_key`` (if given) for the request to ``path``, place the
+    booking and commit, recording a 303 to ``location`` (formatted with the
+    booking's ``id``) as the key's response; then evict the user's summary
+    and announce the showtime's new availability.
+
+    Returns (booking, None), with the booking's showtime and movie loaded, or
+    (None, StoredResponse) when the key was used before and its response is
+    to be replayed. Raises ShowtimeNotFound, ShowtimeStarted, SoldOut,
+    HoldExpired, KeyTooLong or IdempotencyConflict, with nothing committed.
+    """
+    if idempotency_key:
+        fingerprint = request_fingerprint(path, movie_id, showtime_id, quantity, hold_id)
+        if replay := await idempotency_store.claim(db, user, idempotency_key, fingerprint):
+            return None, replay
+    try:
+        showtime = await bookable_showtime(db, movie_id, showtime_id)
+        booking = await place_booking(db, user_id, showtime, quantity, hold_id)
+    except Exception:
+        await db.rollback()
+        raise
+    if idempotency_key:
+        await idempotency_store.complete(db, user, idempotency_key, 303, location.format(id=booking.id))
+    else:
+        await db.commit()
+    history_summaries.invalidate(user_id)
+    if not hold_id:
+        # Booking held seats leaves the count where the hold put it
+        await announce_availability(db, [showtime.id])
+    return booking, None
+
+async def cancel_bookings(db, bookings):
+    """
+    Cancel ``bookings`` in one transaction: free their seats, update the
+    sales aggregates, then promote each affected showtime's waitlist once
+    into the seats that came back. Commits, evicts the summaries of everyone
+    involved and announces the showtimes' new availability; returns the
+    promoted bookings.
+    """
+    if not bookings:
+        return []
+    booking_ids = [booking.id for booking in bookings]
+    showtime_ids = await release_claimed_seats(db, Seat.booking_id, booking_ids)
+    await record_cancellations(db, bookings)
+    await db.execute(
+        delete(Booking)
+        .filter(Booking.id.in_(booking_ids))
+        .execution_options(synchronize_session=False)
+    )
+    # Gone from the database, so out of the session too: a promoted booking
+    # may be given one of their ids
+    for booking in bookings:
+        if booking in db:
+            db.expunge(booking)
+    promoted = []
+    for showtime_id in sorted(set(showtime_ids)):
+        promoted += await promote_waitlist(db, showtime_id)
+    await db.commit()
+    history_summaries.invalidate(*{booking.user_id for booking in bookings + promoted})
+    await announce_availability(db, showtime_ids)
+    return promoted
+
+EXPORT_COLUMNS = ("id", "user", "movie", "showtime", "quantity", "total")
+EXPORT_BATCH_SIZE = 1000
+
+def _encode_csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+    return buffer.getvalue().encode()
+
+def _encode_ndjson(rows, header=False):
+    return b"".join(json.dumps(dict(row), default=str).encode() + b"\n" for row in rows)
+
+EXPORT_ENCODERS = {"csv": _encode_csv, "ndjson": _encode_ndjson}
+
+async def export_bookings(bind, filters, format="csv", compress=False):
+    """
+    Yield every booking matching ``filters`` as CSV or NDJSON bytes, optionally
+    gzip-compressed, reading the rows through a server-side cursor in batches
+    of EXPORT_BATCH_SIZE so memory stays flat however many rows there are.
+
+    Opens its own session on ``bind`` because the response body is produced
+    after the request's session has been closed.
+    """
+    encode = EXPORT_ENCODERS[format]
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    header = True
+
+    async with AsyncSession(bind=bind) as db:
+        result = await db.stream(
+            booking_rows(filters)
+            .order_by(Booking.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.mappings().partitions():
+            chunk = encode(rows, header=header)
+            header = False
+            yield compressor.compress(chunk) if compressor else chunk
+
+    if header:
+        # No rows: still send the CSV header
+        chunk = encode([], header=True)
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,156 @@
+"""
+Cached movie catalog for the home page.
+
+The catalog only changes through the admin movie handlers, so it is loaded
+once into plain dicts, rendered once into an HTML fragment and served from
+memory until one of those handlers calls ``catalog_cache.invalidate()``.
+With REDIS_URL set, invalidations bump a version number in Redis so every
+worker reloads; otherwise the version lives in this process, and other
+workers (or the import command) only catch up once their copy is
+CATALOG_CACHE_MAX_AGE seconds old.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import select
+
+from app.config import TEMPLATES_DIR, REDIS_URL, CATALOG_VERSION_CHECK_INTERVAL, CATALOG_CACHE_MAX_AGE
+from app.models.movie import Movie
+from app.utils.assets import assets
+
+logger = logging.getLogger(__name__)
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+
+CATALOG_COLUMNS = (Movie.id, Movie.title, Movie.year, Movie.director, Movie.rating, Movie.format, Movie.price)
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """One loaded version of the catalog."""
+    version: int
+    movies: list
+    fragment: str
+    etag: str
+    last_modified: datetime
+    loaded_at: float
+
+    def etag_for(self, user, is_admin):
+        """
+        ETag for a page embedding this catalog; pages differ per user
+        because of the navigation bar, and link the current stylesheet.
+        """
+        viewer = hashlib.blake2b(f"{user}:{is_admin}:{assets.version}".encode(), digest_size=6).hexdigest()
+        return f'W/"{self.etag}-{viewer}"'
+
+class LocalVersionStore:
+    """Catalog version held by this process only."""
+
+    def __init__(self):
+        self.version = 0
+
+    async def get(self):
+        return self.version
+
+    async def bump(self):
+        self.version += 1
+        return self.version
+
+class RedisVersionStore:
+    """Catalog version shared by every worker through Redis."""
+
+    def __init__(self, url, key="catalog:version"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.key = key
+
+    async def get(self):
+        return int(await self.client.get(self.key) or 0)
+
+    async def bump(self):
+        return await self.client.incr(self.key)
+
+class CatalogCache:
+    """
+    Process-wide catalog cache. ``get`` only touches the database when the
+    catalog version has moved since the last load, or the loaded catalog is
+    older than ``max_age`` seconds.
+    """
+
+    def __init__(self, store, check_interval=0.0, max_age=CATALOG_CACHE_MAX_AGE):
+        self.store = store
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.snapshot = None
+        self.lock = asyncio.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    async def current_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.check_interval:
+            self._version = await self.store.get()
+            self._checked_at = now
+        return self._version
+
+    async def get(self, db):
+        """
+        Return the current CatalogSnapshot, loading it with ``db`` on a miss.
+        """
+        version = await self.current_version()
+        if self.is_fresh(self.snapshot, version):
+            return self.snapshot
+
+        async with self.lock:
+            if not self.is_fresh(self.snapshot, version):
+                self.snapshot = await self.load(db, version, self.snapshot)
+            return self.snapshot
+
+    def is_fresh(self, snapshot, version):
+        return (
+            snapshot is not None
+            and snapshot.version == version
+            and (not self.max_age or time.monotonic() - snapshot.loaded_at < self.max_age)
+        )
+
+    async def load(self, db, version, previous=None):
+        result = await db.execute(select(*CATALOG_COLUMNS).order_by(Movie.id))
+        movies = [dict(row) for row in result.mappings()]
+        fragment = templates.get_template("movie_catalog.html").render(movies=movies)
+        etag = hashlib.blake2b(fragment.encode(), digest_size=12).hexdigest()
+        logger.debug(f"Loaded catalog version {version} ({len(movies)} movies)")
+        return CatalogSnapshot(
+            version=version,
+            movies=movies,
+            fragment=fragment,
+            etag=etag,
+            # A reload that found nothing new keeps the page's validators
+            last_modified=(
+                previous.last_modified if previous is not None and previous.etag == etag
+                else datetime.now(timezone.utc).replace(microsecond=0)
+            ),
+            loaded_at=time.monotonic(),
+        )
+
+    async def invalidate(self):
+        """
+        Drop the cached catalog here and, through the store, in every worker.
+        """
+        self.snapshot = None
+        self._version = await self.store.bump()
+        self._checked_at = time.monotonic()
+
+    def clear(self):
+        """
+        Forget the cached catalog without bumping the shared version.
+        """
+        self.snapshot = None
+        self._version = None
+
+if REDIS_URL:
+    catalog_cache = CatalogCache(RedisVersionStore(REDIS_URL), CATALOG_VERSION_CHECK_INTERVAL)
+else:
+    catalog_cache = CatalogCache(LocalVersionStore())
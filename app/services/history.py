@@ -0,0 +1,111 @@
+"""
+Per-user booking summaries and their cache.
+
+The summary at the top of a user's booking history (bookings, total spent,
+upcoming shows) aggregates every booking the user ever made, so it is cached
+per user. Bookings, cancellations and waitlist promotions evict the users
+they touch once committed in this worker; changes made by other workers show
+up within the TTL. An entry never outlives the user's next show, after which
+its upcoming count would be wrong.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, func, case
+
+from app.config import BOOKING_SUMMARY_CACHE_SIZE, BOOKING_SUMMARY_CACHE_TTL
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+
+@dataclass(frozen=True)
+class HistorySummary:
+    """Totals over all of a user's bookings."""
+    bookings: int
+    total_spent: int
+    upcoming: int
+    next_movie: Optional[str] = None
+    next_starts_at: Optional[datetime] = None
+
+class HistorySummaryCache:
+    """
+    LRU cache of summaries by user id with a TTL, counting hits and misses.
+    """
+
+    def __init__(self, maxsize=BOOKING_SUMMARY_CACHE_SIZE, ttl=BOOKING_SUMMARY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self.entries[user_id]
+        self.misses += 1
+        return None
+
+    def put(self, user_id, summary):
+        ttl = self.ttl
+        if summary.next_starts_at is not None:
+            ttl = min(ttl, (summary.next_starts_at - datetime.now()).total_seconds())
+        self.entries[user_id] = (summary, time.monotonic() + ttl)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+history_summaries = HistorySummaryCache()
+
+async def load_history_summary(db, user_id, now=None):
+    now = now or datetime.now()
+    bookings, total_spent, upcoming = (await db.execute(
+        select(
+            func.count(Booking.id),
+            func.coalesce(func.sum(Booking.total), 0),
+            func.count(case((Showtime.starts_at >= now, Booking.id))),
+        )
+        .outerjoin(Showtime, Booking.showtime_id == Showtime.id)
+        .filter(Booking.user_id == user_id)
+    )).one()
+    next_show = None
+    if upcoming:
+        next_show = (await db.execute(
+            select(Movie.title, Showtime.starts_at)
+            .select_from(Booking)
+            .join(Showtime, Booking.showtime_id == Showtime.id)
+            .outerjoin(Movie, Booking.movie_id == Movie.id)
+            .filter(Booking.user_id == user_id, Showtime.starts_at >= now)
+            .order_by(Showtime.starts_at)
+            .limit(1)
+        )).first()
+    return HistorySummary(
+        bookings=bookings,
+        total_spent=total_spent,
+        upcoming=upcoming,
+        next_movie=next_show.title if next_show else None,
+        next_starts_at=next_show.starts_at if next_show else None,
+    )
+
+async def history_summary(db, user_id):
+    """
+    Return the cached summary of the user's bookings, loading it on a miss.
+    """
+    summary = history_summaries.get(user_id)
+    if summary is None:
+        summary = await load_history_summary(db, user_id)
+        history_summaries.put(user_id, summary)
+    return summary
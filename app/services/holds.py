@@ -0,0 +1,142 @@
+"""
+Seat holds.
+
+A hold takes seats from a showtime's inventory exactly like a booking does,
+but owns them through ``Seat.hold_id`` and carries an expiry time. Booking
+with a hold deletes the hold and hands its seats to the booking, so the
+checkout can no longer fail for lack of seats. Expired holds are deleted and
+their seats returned by a background sweeper, oldest first via the index on
+``expires_at``, at most HOLD_SWEEP_BATCH per tick however many are pending.
+
+Whoever deletes the hold row owns its seats: conversion deletes it only if
+it has not expired, the sweeper only if it has, and on PostgreSQL the
+sweeper skips holds locked by an in-flight conversion.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+
+from app.config import SEAT_HOLD_MINUTES, HOLD_SWEEP_BATCH
+from app.database import SessionLocal
+from app.models.inventory import Seat, SeatHold
+from app.services.availability import announce_availability
+from app.services.history import history_summaries
+from app.services.inventory import claim_seats, release_claimed_seats
+from app.services.waitlist import promote_waitlist
+
+logger = logging.getLogger(__name__)
+
+class HoldExpired(Exception):
+    """Raised when a hold no longer exists or does not match the booking."""
+
+async def create_hold(db, user, user_id, showtime_id, quantity, minutes=SEAT_HOLD_MINUTES):
+    """
+    Hold ``quantity`` seats of a showtime for ``user`` (whose id is
+    ``user_id``) and return the flushed SeatHold. Raises SoldOut; the caller
+    commits or rolls back.
+    """
+    hold = SeatHold(
+        user_id=user_id,
+        user=user,
+        showtime_id=showtime_id,
+        quantity=quantity,
+        expires_at=datetime.now() + timedelta(minutes=minutes),
+    )
+    db.add(hold)
+    await db.flush()
+    await claim_seats(db, showtime_id, quantity, hold_id=hold.id)
+    return hold
+
+async def convert_hold(db, hold_id, booking):
+    """
+    Give the seats of an unexpired hold to a flushed ``booking`` for the same
+    user, showtime and quantity. Raises HoldExpired otherwise.
+    """
+    result = await db.execute(
+        delete(SeatHold)
+        .filter(
+            SeatHold.id == hold_id,
+            SeatHold.user_id == booking.user_id,
+            SeatHold.showtime_id == booking.showtime_id,
+            SeatHold.quantity == booking.quantity,
+            SeatHold.expires_at > datetime.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise HoldExpired(f"Hold {hold_id} has expired")
+    await db.execute(
+        update(Seat)
+        .filter(Seat.hold_id == hold_id)
+        .values(hold_id=None, booking_id=booking.id)
+        .execution_options(synchronize_session=False)
+    )
+
+async def _release(db, hold_ids):
+    """
+    Return the seats of deleted holds to their inventories and offer them to
+    the waitlists. Returns the showtimes whose seats came back and the users
+    of the bookings that promoted.
+    """
+    promoted = []
+    showtime_ids = await release_claimed_seats(db, Seat.hold_id, hold_ids)
+    for showtime_id in showtime_ids:
+        promoted += await promote_waitlist(db, showtime_id)
+    return showtime_ids, [booking.user_id for booking in promoted]
+
+async def release_hold(db, hold_id, user_id):
+    """
+    Give up a hold of user ``user_id`` early. Returns False if it was
+    already gone.
+    """
+    deleted = (await db.execute(
+        delete(SeatHold)
+        .filter(SeatHold.id == hold_id, SeatHold.user_id == user_id)
+        .returning(SeatHold.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    showtime_ids, promoted_users = await _release(db, deleted) if deleted else ([], [])
+    await db.commit()
+    history_summaries.invalidate(*promoted_users)
+    await announce_availability(db, showtime_ids)
+    return bool(deleted)
+
+async def expire_holds(db, now=None, limit=HOLD_SWEEP_BATCH):
+    """
+    Delete up to ``limit`` of the oldest expired holds, release their seats
+    and commit. Returns how many holds expired.
+    """
+    expired_ids = (
+        select(SeatHold.id)
+        .filter(SeatHold.expires_at <= (now or datetime.now()))
+        .order_by(SeatHold.expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    expired = (await db.execute(
+        delete(SeatHold)
+        .filter(SeatHold.id.in_(expired_ids))
+        .returning(SeatHold.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    showtime_ids, promoted_users = await _release(db, expired) if expired else ([], [])
+    await db.commit()
+    history_summaries.invalidate(*promoted_users)
+    await announce_availability(db, showtime_ids)
+    return len(expired)
+
+async def run_hold_sweeper(interval, batch=HOLD_SWEEP_BATCH):
+    """
+    Expire at most ``batch`` holds every ``interval`` seconds until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as db:
+                expired = await expire_holds(db, limit=batch)
+            if expired:
+                logger.debug(f"Expired {expired} seat holds")
+        except Exception:
+            logger.exception("Seat hold sweep failed")
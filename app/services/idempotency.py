@@ -0,0 +1,156 @@
+"""
+Idempotent request handling.
+
+A client sends the same key with every retry of one submission. The first
+request claims the key by inserting its row in the same transaction as the
+work it does, and records its response there before committing; a retry
+(or a concurrent duplicate, which waits on the row's primary key) finds the
+row and replays that response instead of repeating the work. If the work
+fails, the rollback releases the key so the client can try again.
+
+Completed responses never change, so they are also kept in an in-memory LRU
+in front of the table. Rows expire after IDEMPOTENCY_KEY_TTL seconds and
+are deleted by a periodic sweep.
+"""
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+
+from app.config import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_CACHE_SIZE
+from app.database import SessionLocal, dialect_insert
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with other parameters."""
+
+class KeyTooLong(Exception):
+    """The key is longer than MAX_KEY_LENGTH."""
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """Response recorded for a key."""
+    fingerprint: str
+    status_code: int
+    location: str
+    expires_at: datetime
+
+def request_fingerprint(*parts):
+    """
+    Hash of the parameters that make up a request.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+class IdempotencyStore:
+    """
+    Claims keys and records responses in ``idempotency_keys``, with an LRU
+    of completed responses in front.
+    """
+
+    def __init__(self, maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_KEY_TTL):
+        self.maxsize = maxsize
+        self.ttl = timedelta(seconds=ttl)
+        self.entries = OrderedDict()
+
+    def cached(self, user, key):
+        stored = self.entries.get((user, key))
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.now():
+            del self.entries[(user, key)]
+            return None
+        self.entries.move_to_end((user, key))
+        return stored
+
+    def remember(self, user, key, stored):
+        self.entries[(user, key)] = stored
+        self.entries.move_to_end((user, key))
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def claim(self, db, user, key, fingerprint):
+        """
+        Claim ``key`` for a new request in ``db``'s transaction. Returns None
+        when claimed (the caller does the work, then calls ``complete``), or
+        the StoredResponse to replay. Raises IdempotencyConflict if the key
+        was used with another fingerprint, KeyTooLong if it cannot be stored.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise KeyTooLong(key[:MAX_KEY_LENGTH])
+        stored = self.cached(user, key)
+        if stored is None:
+            now = datetime.now()
+            stmt = dialect_insert(db, IdempotencyKey).values(
+                user=user, key=key, fingerprint=fingerprint, expires_at=now + self.ttl
+            )
+            # An expired row that has not been swept yet is taken over
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[IdempotencyKey.user, IdempotencyKey.key],
+                set_={
+                    "fingerprint": stmt.excluded.fingerprint,
+                    "status_code": None,
+                    "location": None,
+                    "expires_at": stmt.excluded.expires_at,
+                },
+                where=IdempotencyKey.expires_at <= now,
+            ).returning(IdempotencyKey.key)
+            if await db.scalar(stmt) is not None:
+                return None
+
+            await db.rollback()
+            row = (await db.execute(
+                select(IdempotencyKey).filter(IdempotencyKey.user == user, IdempotencyKey.key == key)
+            )).scalar_one()
+            stored = StoredResponse(row.fingerprint, row.status_code, row.location, row.expires_at)
+            self.remember(user, key, stored)
+
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyConflict(key)
+        return stored
+
+    async def complete(self, db, user, key, status_code, location):
+        """
+        Record the response for a claimed key and commit ``db``'s transaction.
+        """
+        row = (await db.execute(
+            update(IdempotencyKey)
+            .filter(IdempotencyKey.user == user, IdempotencyKey.key == key)
+            .values(status_code=status_code, location=location)
+            .returning(IdempotencyKey.fingerprint, IdempotencyKey.expires_at)
+        )).one()
+        await db.commit()
+        self.remember(user, key, StoredResponse(row.fingerprint, status_code, location, row.expires_at))
+
+    def clear(self):
+        self.entries.clear()
+
+async def sweep_expired_keys(db):
+    """
+    Delete expired keys; returns how many were removed.
+    """
+    result = await db.execute(delete(IdempotencyKey).filter(IdempotencyKey.expires_at <= datetime.now()))
+    await db.commit()
+    return result.rowcount
+
+async def run_key_sweeper(interval):
+    """
+    Sweep expired keys every ``interval`` seconds until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as db:
+                removed = await sweep_expired_keys(db)
+            if removed:
+                logger.info(f"Swept {removed} expired idempotency keys")
+        except Exception:
+            logger.exception("Idempotency key sweep failed")
+
+idempotency_store = IdempotencyStore()
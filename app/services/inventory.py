@@ -0,0 +1,139 @@
+"""
+Seat inventory engine.
+
+Availability lives in one counter row per showtime. Reservations decrement it
+with a single conditional UPDATE, so the database - not Python - decides
+whether enough seats are left and concurrent bookings can never oversell.
+Seats are then claimed from the showtime's seat map in the same transaction.
+"""
+import logging
+from sqlalchemy import select, update, insert, func
+
+from app.database import dialect_insert
+from app.models.inventory import SeatInventory, Seat
+from app.models.showtime import Showtime
+
+logger = logging.getLogger(__name__)
+
+SEATS_PER_ROW = 20
+
+class SoldOut(Exception):
+    """Raised when a showtime does not have enough seats left."""
+
+def seat_label(index):
+    """
+    Return the label ("A1", "A2", ... "B1") of the seat at ``index``.
+    """
+    row, number = divmod(index, SEATS_PER_ROW)
+    prefix = ""
+    while True:
+        row, letter = divmod(row, 26)
+        prefix = chr(ord("A") + letter) + prefix
+        if not row:
+            break
+        row -= 1
+    return f"{prefix}{number + 1}"
+
+async def ensure_inventory(db, showtime_id, capacity=None):
+    """
+    Return the inventory id for a showtime, creating the counter row and its
+    seat map on first use. Concurrent first bookings race on the unique
+    constraint and only one of them creates the seats.
+    """
+    inventory_id = await db.scalar(
+        select(SeatInventory.id).filter(SeatInventory.showtime_id == showtime_id)
+    )
+    if inventory_id:
+        return inventory_id
+
+    if capacity is None:
+        capacity = await db.scalar(select(Showtime.capacity).filter(Showtime.id == showtime_id))
+    inventory_id = await db.scalar(
+        dialect_insert(db, SeatInventory)
+        .values(showtime_id=showtime_id, capacity=capacity, seats_available=capacity)
+        .on_conflict_do_nothing(index_elements=["showtime_id"])
+        .returning(SeatInventory.id)
+    )
+    if inventory_id is None:
+        # Another transaction created it first
+        return await ensure_inventory(db, showtime_id)
+
+    await db.execute(insert(Seat), [
+        {"inventory_id": inventory_id, "label": seat_label(i)} for i in range(capacity)
+    ])
+    logger.debug(f"Created seat inventory for showtime {showtime_id} ({capacity} seats)")
+    return inventory_id
+
+async def claim_seats(db, showtime_id, quantity, **owner):
+    """
+    Take ``quantity`` seats of a showtime for ``owner`` (``booking_id=`` or
+    ``hold_id=``) in the current transaction. Raises SoldOut if they do not
+    fit; the caller should roll back in that case.
+    """
+    inventory_id = await ensure_inventory(db, showtime_id)
+
+    result = await db.execute(
+        update(SeatInventory)
+        .filter(
+            SeatInventory.id == inventory_id,
+            SeatInventory.seats_available >= quantity,
+        )
+        .values(seats_available=SeatInventory.seats_available - quantity)
+    )
+    if result.rowcount != 1:
+        raise SoldOut(f"Not enough seats for showtime {showtime_id}")
+
+    # The counter row lock taken above serializes claims per showtime;
+    # SKIP LOCKED keeps PostgreSQL from waiting on rows it cannot take anyway
+    free_seats = (
+        select(Seat.id)
+        .filter(Seat.inventory_id == inventory_id, Seat.booking_id.is_(None), Seat.hold_id.is_(None))
+        .order_by(Seat.id)
+        .limit(quantity)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Seat)
+        .filter(Seat.id.in_(free_seats))
+        .values(**owner)
+        .execution_options(synchronize_session=False)
+    )
+
+async def reserve_seats(db, booking):
+    """
+    Reserve seats for a flushed, uncommitted ``booking``.
+    Raises SoldOut if the showtime cannot fit ``booking.quantity`` more seats;
+    the caller should roll back in that case.
+    """
+    await claim_seats(db, booking.showtime_id, booking.quantity, booking_id=booking.id)
+
+async def release_claimed_seats(db, owner_column, owner_ids):
+    """
+    Free every seat whose ``owner_column`` (``Seat.booking_id`` or
+    ``Seat.hold_id``) is in ``owner_ids`` and count them back, one counter
+    update per showtime. Returns the ids of the showtimes that got seats back.
+    """
+    released = (await db.execute(
+        select(Seat.inventory_id, func.count())
+        .filter(owner_column.in_(owner_ids))
+        .group_by(Seat.inventory_id)
+    )).all()
+    if not released:
+        return []
+    await db.execute(
+        update(Seat)
+        .filter(owner_column.in_(owner_ids))
+        .values({owner_column.key: None})
+        .execution_options(synchronize_session=False)
+    )
+    showtime_ids = []
+    for inventory_id, count in released:
+        showtime_ids.append(await db.scalar(
+            update(SeatInventory)
+            .filter(SeatInventory.id == inventory_id)
+            .values(seats_available=SeatInventory.seats_available + count)
+            .returning(SeatInventory.showtime_id)
+        ))
+    return showtime_ids
+
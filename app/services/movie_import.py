@@ -0,0 +1,164 @@
+"""
+Bulk movie import.
+
+Rows are streamed from CSV or JSON, read a chunk at a time in a worker
+thread so a large upload never blocks the event loop, validated one by one
+and upserted on ``Movie.title`` in chunks with a single multi-row INSERT ...
+ON CONFLICT DO UPDATE per chunk. New movies get their default showtimes in
+the same transaction, as ``create_movie`` gives them. Each chunk commits on its own;
+invalid rows, and rows of a chunk the database rejects, are reported with
+their line number instead of aborting the load.
+"""
+import asyncio
+import csv
+import itertools
+import json
+import logging
+from dataclasses import dataclass, field
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import dialect_insert
+from app.models.movie import Movie
+from app.schemas.movie import MovieRecord
+from app.services.catalog import catalog_cache
+from app.services.showtimes import schedule_unscheduled_movies
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 2000
+UPDATE_COLUMNS = ("year", "director", "rating", "format", "price")
+
+@dataclass
+class ImportReport:
+    """Outcome of an import; ``errors`` holds (line number, message) pairs."""
+    rows: int = 0
+    imported: int = 0
+    errors: list = field(default_factory=list)
+
+    def summary(self, max_errors=100):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "error_count": len(self.errors),
+            "errors": [{"line": line, "error": message} for line, message in self.errors[:max_errors]],
+        }
+
+def read_records(stream, format):
+    """
+    Yield (line number, raw record) from a text stream. CSV rows come out as
+    dicts; JSON is either one array (loaded whole) or JSON Lines (one object
+    per line, streamed and decoded later so bad lines are reported per row).
+    """
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    first_line = stream.readline()
+    if first_line.lstrip().startswith("["):
+        for index, record in enumerate(json.loads(first_line + stream.read()), start=1):
+            yield index, record
+        return
+
+    for number, line in enumerate(itertools.chain([first_line], stream), start=1):
+        if line.strip():
+            yield number, line
+
+def read_batch(records, size):
+    """
+    Return the next ``size`` records, and the error that stopped reading
+    early, if any. Runs in a worker thread: the stream may be a file on disk.
+    """
+    batch = []
+    try:
+        batch.extend(itertools.islice(records, size))
+    except (ValueError, csv.Error) as exc:
+        return batch, exc
+    return batch, None
+
+def validate_record(raw):
+    """
+    Return the movie values for a raw record, raising ValueError if invalid.
+    """
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object")
+    return MovieRecord.model_validate(raw).model_dump()
+
+def error_message(exc):
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+    return str(getattr(exc, "orig", None) or exc)
+
+def upsert_statement(db):
+    statement = dialect_insert(db, Movie.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=["title"],
+        set_={column: statement.excluded[column] for column in UPDATE_COLUMNS},
+    )
+
+async def flush_chunk(db, chunk, report):
+    """
+    Upsert one chunk, falling back to row by row if the database rejects it
+    so the offending rows can be reported.
+    """
+    statement = upsert_statement(db)
+    try:
+        await db.execute(statement, [values for _, values in chunk.values()])
+        await schedule_unscheduled_movies(db, list(chunk))
+        await db.commit()
+        report.imported += len(chunk)
+        return
+    except SQLAlchemyError:
+        await db.rollback()
+
+    for title, (line, values) in chunk.items():
+        try:
+            await db.execute(statement, [values])
+            await schedule_unscheduled_movies(db, [title])
+            await db.commit()
+            report.imported += 1
+        except SQLAlchemyError as exc:
+            await db.rollback()
+            report.errors.append((line, error_message(exc)))
+
+async def import_movies(db, stream, format="csv", chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import movies from ``stream`` ("csv" or "json") and return an ImportReport.
+    A title appearing twice keeps its last row.
+    """
+    report = ImportReport()
+    chunk = {}
+    records = read_records(stream, format)
+    while True:
+        # Read off the event loop, a chunk's worth of rows at a time
+        batch, error = await asyncio.to_thread(read_batch, records, chunk_size)
+        for line, raw in batch:
+            report.rows += 1
+            try:
+                values = validate_record(raw)
+            except ValueError as exc:
+                report.errors.append((line, error_message(exc)))
+                continue
+            # Keyed by title: one statement may not upsert the same row twice
+            chunk[values["title"]] = (line, values)
+            if len(chunk) >= chunk_size:
+                await flush_chunk(db, chunk, report)
+                chunk = {}
+        if error:
+            # The input itself is broken (bad encoding, malformed JSON array):
+            # keep what was read so far and report where reading stopped
+            report.errors.append((report.rows + 1, f"unreadable input: {error}"))
+            break
+        if len(batch) < chunk_size:
+            break
+    if chunk:
+        await flush_chunk(db, chunk, report)
+
+    if report.imported:
+        await catalog_cache.invalidate()
+    logger.info(f"Imported {report.imported} of {report.rows} movie rows ({len(report.errors)} errors)")
+    return report
@@ -0,0 +1,48 @@
+"""
+Movie administration shared by the admin pages and the JSON API.
+
+Every change commits and invalidates the catalog cache. Duplicate titles
+raise IntegrityError; the caller rolls back.
+"""
+from sqlalchemy import select
+
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.services.catalog import catalog_cache
+from app.services.showtimes import schedule_default_showtimes
+
+class MovieHasBookings(Exception):
+    """Raised when deleting a movie somebody has booked."""
+
+async def create_movie(db, **fields):
+    """
+    Add a movie with its default showtimes and return it.
+    """
+    movie = Movie(**fields)
+    db.add(movie)
+    await db.flush()
+    schedule_default_showtimes(db, movie)
+    await db.commit()
+    await catalog_cache.invalidate()
+    return movie
+
+async def edit_movie(db, movie, **fields):
+    """
+    Overwrite ``fields`` of a loaded movie.
+    """
+    for name, value in fields.items():
+        setattr(movie, name, value)
+    await db.commit()
+    await catalog_cache.invalidate()
+    return movie
+
+async def remove_movie(db, movie):
+    """
+    Delete a loaded movie and, through the database, its showtimes. Raises
+    MovieHasBookings if it has any: the bookings keep pointing at them.
+    """
+    if await db.scalar(select(Booking.id).filter(Booking.movie_id == movie.id).limit(1)) is not None:
+        raise MovieHasBookings(movie.id)
+    await db.delete(movie)
+    await db.commit()
+    await catalog_cache.invalidate()
@@ -0,0 +1,78 @@
+"""
+Password hashing off the event loop.
+
+bcrypt deliberately burns ~100ms+ of CPU per call, which would stall every
+other request if run inside an async handler. Hashing and verification run
+on a small thread pool instead (bcrypt releases the GIL), and once
+PASSWORD_HASH_QUEUE_LIMIT calls are running or waiting, new ones are
+rejected immediately rather than queued behind a burst.
+"""
+import asyncio
+import hmac
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+class HasherOverloaded(Exception):
+    """Raised when too many hash/verify calls are already pending."""
+
+def is_bcrypt_hash(stored):
+    return stored.startswith(BCRYPT_PREFIXES)
+
+class PasswordHasher:
+    """
+    bcrypt hashing on a bounded thread pool with load shedding.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=PASSWORD_HASH_WORKERS, queue_limit=PASSWORD_HASH_QUEUE_LIMIT):
+        self.rounds = rounds
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.queue_limit:
+            logger.warning(f"Password hashing overloaded ({self.pending} pending), shedding request")
+            raise HasherOverloaded()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=self.rounds)).decode()
+
+    async def hash(self, password):
+        """
+        Return a bcrypt hash of ``password`` at the configured cost.
+        """
+        return await self._run(self._hash, password)
+
+    def needs_rehash(self, stored):
+        """
+        True for legacy plaintext passwords and hashes of a different cost.
+        """
+        if not is_bcrypt_hash(stored):
+            return True
+        return int(stored.split("$")[2]) != self.rounds
+
+    async def verify(self, password, stored):
+        """
+        Check ``password`` against a stored bcrypt hash or, for rows written
+        before hashing was introduced, a legacy plaintext password.
+        """
+        if not stored:
+            return False
+        if not is_bcrypt_hash(stored):
+            return hmac.compare_digest(password.encode(), stored.encode())
+        return await self._run(bcrypt.checkpw, password.encode(), stored.encode())
+
+password_hasher = PasswordHasher()
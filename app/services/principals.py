@@ -0,0 +1,112 @@
+"""
+Authorization principals and their cache.
+
+Admin checks compare the role claims in the (signed) session cookie with a
+cached principal for the user, so the hot path needs no database query.
+Every role change bumps ``User.role_version``; a session whose claimed
+version no longer matches is rejected. Role changes evict the principal in
+the worker that made them; other workers pick them up within the TTL.
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from sqlalchemy import select, update
+
+from app.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Principal:
+    """The authorization-relevant part of a user."""
+    username: str
+    is_admin: bool
+    role_version: int
+    user_id: int
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            username=user.username,
+            is_admin=bool(user.is_admin),
+            role_version=user.role_version or 0,
+            user_id=user.id,
+        )
+
+class PrincipalCache:
+    """
+    LRU cache of principals by username with a TTL, counting hits and misses.
+    """
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username):
+        entry = self.entries.get(username)
+        if entry is not None and entry[1] > time.monotonic():
+            self.entries.move_to_end(username)
+            self.hits += 1
+            return entry[0]
+        if entry is not None:
+            del self.entries[username]
+        self.misses += 1
+        return None
+
+    def put(self, principal):
+        self.entries[principal.username] = (principal, time.monotonic() + self.ttl)
+        self.entries.move_to_end(principal.username)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, username):
+        self.entries.pop(username, None)
+
+    def clear(self):
+        self.entries.clear()
+
+principal_cache = PrincipalCache()
+
+def session_claims(principal):
+    """
+    Role claims stored in the session at login.
+    """
+    return {
+        "user": principal.username,
+        "user_id": principal.user_id,
+        "is_admin": principal.is_admin,
+        "role_version": principal.role_version,
+    }
+
+async def get_principal(db, username):
+    """
+    Return the cached principal for ``username``, loading it on a miss.
+    """
+    principal = principal_cache.get(username)
+    if principal is None:
+        user = await db.scalar(select(User).filter(User.username == username))
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        principal_cache.put(principal)
+    return principal
+
+async def set_user_role(db, username, is_admin):
+    """
+    Grant or revoke admin rights, revoking every session issued before.
+    Returns False if there is no such user.
+    """
+    result = await db.execute(
+        update(User)
+        .filter(User.username == username)
+        .values(is_admin=is_admin, role_version=User.role_version + 1)
+    )
+    await db.commit()
+    principal_cache.invalidate(username)
+    logger.info(f"Set admin={is_admin} for user {username}")
+    return result.rowcount == 1
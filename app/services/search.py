@@ -0,0 +1,165 @@
+"""
+Movie search and autocomplete.
+
+Search matches every query word against titles and directors (the last
+word as a prefix, so results follow the user's typing) through the
+full-text index, narrows by the format/year/rating facets and pages the
+ranked results. Facet counts cover the other active facets, so each facet
+shows what selecting one of its values would return.
+
+Autocomplete runs on every keystroke and is answered from memory: a sorted
+word index built from the cached catalog, searched with bisect.
+"""
+import math
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from sqlalchemy import select, func, or_, literal_column, table, column
+
+from app.config import SEARCH_PAGE_SIZE
+from app.models.movie import Movie
+from app.models.search import SEARCH_DOCUMENT
+
+MAX_TERMS = 8
+SUGGESTION_LIMIT = 10
+
+FACETS = {"format": Movie.format, "year": Movie.year, "rating": Movie.rating}
+RESULT_COLUMNS = (Movie.id, Movie.title, Movie.year, Movie.director, Movie.rating, Movie.format, Movie.price)
+
+movie_search = table("movie_search", column("rowid"), column("rank"))
+
+def search_terms(query):
+    """
+    Lowercased words of ``query``; punctuation never reaches the index.
+    """
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+def match_text(stmt, dialect, terms):
+    """
+    Restrict ``stmt`` (selecting from movies) to movies matching ``terms``.
+    Returns the statement and its rank ordering.
+    """
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(terms[:-1] + [terms[-1] + ":*"]))
+        return stmt.where(SEARCH_DOCUMENT.op("@@")(tsquery)), func.ts_rank(SEARCH_DOCUMENT, tsquery).desc()
+    if dialect == "sqlite":
+        matched = (
+            select(movie_search.c.rowid, movie_search.c.rank)
+            .where(literal_column("movie_search").op("MATCH")(" ".join(f'"{term}"' for term in terms) + "*"))
+            .subquery()
+        )
+        return stmt.join(matched, matched.c.rowid == Movie.id), matched.c.rank
+    conditions = [
+        or_(func.lower(Movie.title).contains(term), func.lower(Movie.director).contains(term))
+        for term in terms
+    ]
+    return stmt.where(*conditions), Movie.title
+
+@dataclass
+class SearchResults:
+    """One page of search results with facet counts."""
+    query: str
+    movies: list
+    total: int
+    page: int
+    pages: int
+    facets: dict
+
+async def search_movies(db, query="", filters=None, page=1, page_size=None):
+    """
+    Search movies by title and director, narrowed by ``filters`` (a
+    MovieFilters), returning the requested page and facet counts.
+    """
+    page_size = page_size or SEARCH_PAGE_SIZE
+    dialect = db.get_bind().dialect.name
+    terms = search_terms(query)
+    active = filters.params() if filters else {}
+
+    def matching(stmt, skip=None):
+        stmt = stmt.where(*(FACETS[name] == value for name, value in active.items() if name != skip))
+        if terms:
+            return match_text(stmt, dialect, terms)
+        return stmt, Movie.title
+
+    stmt, rank = matching(select(*RESULT_COLUMNS))
+    counted, _ = matching(select(func.count()).select_from(Movie))
+    total = await db.scalar(counted)
+    rows = (await db.execute(
+        stmt.order_by(rank, Movie.id).limit(page_size).offset((page - 1) * page_size)
+    )).mappings().all()
+
+    facets = {}
+    for name, facet in FACETS.items():
+        stmt, _ = matching(select(facet, func.count()).select_from(Movie), skip=name)
+        facets[name] = (await db.execute(stmt.where(facet.isnot(None)).group_by(facet).order_by(facet))).all()
+
+    return SearchResults(
+        query=query,
+        movies=[dict(row) for row in rows],
+        total=total,
+        page=page,
+        pages=max(1, math.ceil(total / page_size)),
+        facets=facets,
+    )
+
+class SuggestionIndex:
+    """
+    Sorted (word, title, id) entries for every word of every title and
+    director in one catalog snapshot.
+    """
+
+    def __init__(self, movies):
+        entries = []
+        self.words_by_id = {}
+        for movie in movies:
+            words = set(search_terms(f"{movie['title']} {movie['director'] or ''}"))
+            self.words_by_id[movie["id"]] = words
+            entries.extend((word, movie["title"], movie["id"]) for word in words)
+        entries.sort()
+        self.entries = entries
+        self.keys = [entry[0] for entry in entries]
+
+    def suggest(self, query, limit=SUGGESTION_LIMIT):
+        """
+        Up to ``limit`` movies with a word starting with the last query word
+        that also contain the earlier words, as {"id", "title"} dicts.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+        *words, prefix = terms
+        suggestions = []
+        seen = set()
+        for i in range(bisect_left(self.keys, prefix), len(self.keys)):
+            word, title, movie_id = self.entries[i]
+            if not word.startswith(prefix):
+                break
+            if movie_id in seen or not self.words_by_id[movie_id].issuperset(words):
+                continue
+            seen.add(movie_id)
+            suggestions.append({"id": movie_id, "title": title})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+class SuggestionCache:
+    """
+    The SuggestionIndex for the current catalog snapshot, rebuilt when the
+    catalog changes.
+    """
+
+    def __init__(self):
+        self.movies = None
+        self.index = None
+
+    def get(self, snapshot):
+        if self.movies is not snapshot.movies:
+            self.index = SuggestionIndex(snapshot.movies)
+            self.movies = snapshot.movies
+        return self.index
+
+    def clear(self):
+        self.movies = None
+        self.index = None
+
+suggestion_cache = SuggestionCache()
@@ -0,0 +1,158 @@
+"""
+Showtime scheduling and lookups.
+
+Every movie gets the default daily schedule for SCHEDULE_DAYS days when it
+is added, and ``run_schedule_top_up`` keeps extending it so that there are
+always SCHEDULE_DAYS days ahead to book.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, func, literal, union_all, true, DateTime
+from sqlalchemy.orm import joinedload
+
+from app.config import (
+    DEFAULT_SCREEN, DEFAULT_SCREEN_CAPACITY, DEFAULT_SHOWTIMES, SCHEDULE_DAYS, SCHEDULE_TOP_UP_BATCH,
+)
+from app.database import SessionLocal, dialect_insert
+from app.models.inventory import SeatInventory
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+
+logger = logging.getLogger(__name__)
+
+class ShowtimeNotFound(Exception):
+    """The showtime does not exist or is not one of the movie's."""
+
+class ShowtimeStarted(Exception):
+    """The showtime has already started."""
+
+def schedule_start_times(start_date=None, days=SCHEDULE_DAYS):
+    """
+    Start times of the default daily schedule for ``days`` days starting at
+    ``start_date`` (today by default).
+    """
+    start_date = start_date or date.today()
+    return [
+        datetime.combine(start_date + timedelta(days=day), time.fromisoformat(start.strip()))
+        for day in range(days)
+        for start in DEFAULT_SHOWTIMES
+    ]
+
+def default_showtimes(movie_id, start_date=None, days=SCHEDULE_DAYS):
+    """
+    Return the column values of the default daily showtimes of a movie for
+    ``days`` days starting at ``start_date`` (today by default).
+    """
+    return [
+        {"movie_id": movie_id, "screen": DEFAULT_SCREEN, "starts_at": starts_at, "capacity": DEFAULT_SCREEN_CAPACITY}
+        for starts_at in schedule_start_times(start_date, days)
+    ]
+
+async def insert_default_showtimes(db, *criteria, start_date=None, days=SCHEDULE_DAYS):
+    """
+    Add the default showtimes of every movie matching ``criteria`` (filters
+    on Movie) for ``days`` days from ``start_date`` in one INSERT ... SELECT,
+    skipping those already scheduled. Returns how many were added; the
+    caller commits.
+    """
+    schedule = union_all(*(
+        select(literal(starts_at, DateTime).label("starts_at"))
+        for starts_at in schedule_start_times(start_date, days)
+    )).subquery("schedule")
+    stmt = dialect_insert(db, Showtime).from_select(
+        ["movie_id", "screen", "starts_at", "capacity"],
+        select(Movie.id, literal(DEFAULT_SCREEN), schedule.c.starts_at, literal(DEFAULT_SCREEN_CAPACITY))
+        .join(schedule, true())
+        .filter(*criteria),
+    )
+    result = await db.execute(stmt.on_conflict_do_nothing(
+        index_elements=[Showtime.movie_id, Showtime.screen, Showtime.starts_at],
+    ))
+    return result.rowcount
+
+async def top_up_schedules(db, start_date=None, batch=SCHEDULE_TOP_UP_BATCH):
+    """
+    Give every movie the default showtimes of the SCHEDULE_DAYS days from
+    ``start_date`` (today by default) it does not have yet, ``batch`` movies
+    per transaction. Returns how many showtimes were added.
+    """
+    added = 0
+    after = 0
+    while True:
+        movie_ids = (await db.scalars(
+            select(Movie.id).filter(Movie.id > after).order_by(Movie.id).limit(batch)
+        )).all()
+        if not movie_ids:
+            return added
+        added += await insert_default_showtimes(db, Movie.id > after, Movie.id <= movie_ids[-1], start_date=start_date)
+        await db.commit()
+        after = movie_ids[-1]
+
+async def run_schedule_top_up(interval):
+    """
+    Top up every movie's schedule every ``interval`` seconds until
+    cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as db:
+                added = await top_up_schedules(db)
+            if added:
+                logger.info(f"Scheduled {added} showtimes")
+        except Exception:
+            logger.exception("Schedule top-up failed")
+
+def schedule_default_showtimes(db, movie, start_date=None, days=SCHEDULE_DAYS):
+    """
+    Add the default daily showtimes for ``movie`` to the session.
+    """
+    for values in default_showtimes(movie.id, start_date, days):
+        db.add(Showtime(**values))
+
+async def schedule_unscheduled_movies(db, titles):
+    """
+    Insert the default showtimes of the movies among ``titles`` that have
+    none yet (those just created by a bulk import) in one INSERT ... SELECT.
+    Returns how many showtimes were added.
+    """
+    return await insert_default_showtimes(
+        db, Movie.title.in_(titles), ~select(Showtime.id).filter(Showtime.movie_id == Movie.id).exists(),
+    )
+
+async def bookable_showtime(db, movie_id, showtime_id):
+    """
+    Return the showtime (with its movie) if it belongs to the movie and has
+    not started yet; raises ShowtimeNotFound or ShowtimeStarted otherwise.
+    """
+    showtime = await db.scalar(
+        select(Showtime)
+        .options(joinedload(Showtime.movie))
+        .filter(Showtime.id == showtime_id, Showtime.movie_id == movie_id)
+    )
+    if not showtime:
+        raise ShowtimeNotFound(showtime_id)
+    if showtime.starts_at < datetime.now():
+        raise ShowtimeStarted(showtime_id)
+    return showtime
+
+async def showtime_availability(db, movie_id, now=None):
+    """
+    Return (id, screen, starts_at, seats_available) rows for the upcoming
+    showtimes of a movie, soonest first. Showtimes nobody has booked yet
+    have their full capacity available.
+    """
+    result = await db.execute(
+        select(
+            Showtime.id,
+            Showtime.screen,
+            Showtime.starts_at,
+            func.coalesce(SeatInventory.seats_available, Showtime.capacity).label("seats_available"),
+        )
+        .outerjoin(SeatInventory, SeatInventory.showtime_id == Showtime.id)
+        .filter(Showtime.movie_id == movie_id, Showtime.starts_at >= (now or datetime.now()))
+        .order_by(Showtime.starts_at)
+    )
+    return result.all()
+
@@ -0,0 +1,232 @@
+"""
+Waitlists for sold-out showtimes.
+
+Each showtime's queue hands out increasing sequence numbers on join and
+remembers the last one served. A user's position is their number minus the
+last one served, less the entries in between that left the queue, which a
+per-showtime Fenwick tree of departures (WaitlistDeparture) answers in
+O(log n) primary-key lookups; leaving updates O(log n) nodes of it. Nothing
+scans the entries ahead, however long the queue.
+
+Whenever seats come back (cancellations, released or expired holds),
+``promote_waitlist`` books the front of the queue in strict FIFO order, as
+many entries as now fit, with a fixed number of statements in the caller's
+transaction however many entries are promoted.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.orm import joinedload
+
+from app.database import dialect_insert
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.models.waitlist import WaitlistQueue, WaitlistEntry, WaitlistDeparture
+from app.services.sales import record_bookings
+
+logger = logging.getLogger(__name__)
+
+# Sequence numbers the departure trees cover; a showtime's queue stays far
+# below this many joins
+DEPARTURE_TREE_SIZE = 1 << 30
+
+def departure_nodes(seq):
+    """Tree nodes whose sum counts the departures numbered up to ``seq``."""
+    while seq > 0:
+        yield seq
+        seq -= seq & -seq
+
+def departure_updates(seq):
+    """Tree nodes that count a departure numbered ``seq``."""
+    while seq <= DEPARTURE_TREE_SIZE:
+        yield seq
+        seq += seq & -seq
+
+class AlreadyWaiting(Exception):
+    """The user is already on this showtime's waitlist."""
+
+class SeatsAvailable(Exception):
+    """The showtime still has enough seats; book them instead of waiting."""
+
+class SeatsMissing(Exception):
+    """Fewer free seats were found than the inventory counts as available."""
+
+async def join_waitlist(db, user, user_id, showtime_id, quantity):
+    """
+    Put ``user`` (whose id is ``user_id``) at the back of a showtime's
+    waitlist and return the new WaitlistEntry; the caller commits.
+    """
+    seats_available = await db.scalar(
+        select(SeatInventory.seats_available).filter(SeatInventory.showtime_id == showtime_id)
+    )
+    if seats_available is None or seats_available >= quantity:
+        raise SeatsAvailable(f"Showtime {showtime_id} has {quantity} seats available")
+    if await db.scalar(select(WaitlistEntry.id).filter(
+        WaitlistEntry.user_id == user_id, WaitlistEntry.showtime_id == showtime_id
+    )):
+        raise AlreadyWaiting(f"{user} is already waiting for showtime {showtime_id}")
+
+    stmt = dialect_insert(db, WaitlistQueue).values(showtime_id=showtime_id, next_seq=1, head_seq=0)
+    seq = await db.scalar(stmt.on_conflict_do_update(
+        index_elements=[WaitlistQueue.showtime_id],
+        set_={"next_seq": WaitlistQueue.next_seq + 1},
+    ).returning(WaitlistQueue.next_seq))
+
+    entry = WaitlistEntry(showtime_id=showtime_id, user_id=user_id, user=user, quantity=quantity, seq=seq)
+    db.add(entry)
+    await db.flush()
+    return entry
+
+async def leave_waitlist(db, entry_id, user_id):
+    """
+    Remove an entry of user ``user_id`` and count it in its showtime's
+    departures; returns False if it was not there.
+    """
+    left = (await db.execute(
+        delete(WaitlistEntry)
+        .filter(WaitlistEntry.id == entry_id, WaitlistEntry.user_id == user_id)
+        .returning(WaitlistEntry.showtime_id, WaitlistEntry.seq)
+    )).one_or_none()
+    if left is None:
+        await db.rollback()
+        return False
+    showtime_id, seq = left
+    stmt = dialect_insert(db, WaitlistDeparture).values([
+        {"showtime_id": showtime_id, "node": node, "departed": 1} for node in departure_updates(seq)
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[WaitlistDeparture.showtime_id, WaitlistDeparture.node],
+        set_={"departed": WaitlistDeparture.departed + 1},
+    ))
+    await db.commit()
+    return True
+
+async def waitlist_entries(db, user_id):
+    """
+    The waitlist entries of user ``user_id`` with their showtime, movie and
+    position, as (entry, position) pairs.
+    """
+    rows = (await db.execute(
+        select(WaitlistEntry, WaitlistQueue.head_seq)
+        .join(WaitlistQueue, WaitlistQueue.showtime_id == WaitlistEntry.showtime_id)
+        .options(joinedload(WaitlistEntry.showtime).joinedload(Showtime.movie))
+        .filter(WaitlistEntry.user_id == user_id)
+        .order_by(WaitlistEntry.id)
+    )).all()
+    if not rows:
+        return []
+
+    # Every tree node the positions need, fetched in one query
+    nodes = {
+        (entry.showtime_id, node)
+        for entry, head_seq in rows
+        for seq in (entry.seq, head_seq)
+        for node in departure_nodes(seq)
+    }
+    departed = {
+        (showtime_id, node): count
+        for showtime_id, node, count in await db.execute(
+            select(WaitlistDeparture.showtime_id, WaitlistDeparture.node, WaitlistDeparture.departed)
+            .filter(tuple_(WaitlistDeparture.showtime_id, WaitlistDeparture.node).in_(nodes))
+        )
+    }
+
+    def departed_up_to(showtime_id, seq):
+        return sum(departed.get((showtime_id, node), 0) for node in departure_nodes(seq))
+
+    return [
+        (entry, entry.seq - head_seq
+         - (departed_up_to(entry.showtime_id, entry.seq) - departed_up_to(entry.showtime_id, head_seq)))
+        for entry, head_seq in rows
+    ]
+
+async def promote_waitlist(db, showtime_id):
+    """
+    Book the front of a showtime's waitlist into the seats now available, in
+    the current transaction. Returns the new bookings.
+    """
+    inventory_id, seats_available = (await db.execute(
+        select(SeatInventory.id, SeatInventory.seats_available).filter(SeatInventory.showtime_id == showtime_id)
+    )).one_or_none() or (None, 0)
+    if seats_available <= 0:
+        return []
+    showtime = await db.scalar(
+        select(Showtime).options(joinedload(Showtime.movie)).filter(Showtime.id == showtime_id)
+    )
+    if showtime is None or showtime.starts_at <= datetime.now():
+        return []
+
+    # Every entry needs at least one seat, so no more than seats_available
+    # entries can be promoted
+    promoted = []
+    seats = seats_available
+    user_ids = {}
+    for entry, user_id in (await db.execute(
+        # Entries the previous release queued have no user_id until migration
+        # m011 fills it in; until then they are matched by name
+        select(WaitlistEntry, func.coalesce(WaitlistEntry.user_id, User.id))
+        .outerjoin(User, WaitlistEntry.user_id.is_(None) & (User.username == WaitlistEntry.user))
+        .filter(WaitlistEntry.showtime_id == showtime_id)
+        .order_by(WaitlistEntry.seq)
+        .limit(seats_available)
+    )):
+        if entry.quantity > seats:
+            break
+        promoted.append(entry)
+        user_ids[entry.id] = user_id
+        seats -= entry.quantity
+    if not promoted:
+        return []
+
+    bookings = [
+        Booking(
+            user_id=user_ids[entry.id],
+            movie_id=showtime.movie_id,
+            showtime_id=showtime_id,
+            quantity=entry.quantity,
+            total=showtime.movie.price * entry.quantity,
+        )
+        for entry in promoted
+    ]
+    db.add_all(bookings)
+    await db.flush()
+
+    taken = seats_available - seats
+    await db.execute(
+        update(SeatInventory)
+        .filter(SeatInventory.id == inventory_id)
+        .values(seats_available=SeatInventory.seats_available - taken)
+    )
+    free_seats = (await db.execute(
+        select(Seat.id)
+        .filter(Seat.inventory_id == inventory_id, Seat.booking_id.is_(None), Seat.hold_id.is_(None))
+        .order_by(Seat.id)
+        .limit(taken)
+        .with_for_update(skip_locked=True)
+    )).scalars().all()
+    if len(free_seats) < taken:
+        raise SeatsMissing(
+            f"showtime {showtime_id} counts {seats_available} seats available but only {len(free_seats)} are free"
+        )
+    free_seats = iter(free_seats)
+    await db.execute(update(Seat), [
+        {"id": next(free_seats), "booking_id": booking.id}
+        for booking in bookings
+        for _ in range(booking.quantity)
+    ])
+
+    await db.execute(
+        delete(WaitlistEntry)
+        .filter(WaitlistEntry.id.in_([entry.id for entry in promoted]))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(WaitlistQueue)
+        .filter(WaitlistQueue.showtime_id == showtime_id)
+        .values(head_seq=promoted[-1].seq)
+    )
+    await record_bookings(db, bookings)
+    logger.info(f"Promoted {len(promoted)} waitlisted users into showtime {showtime_id}")
+    return bookings
@@ -0,0 +1,17 @@
+// Keeps the seats left in each showtime of the booking form up to date
+(function () {
+  var select = document.querySelector("select[data-availability-url]");
+  if (!select || !window.EventSource) {
+    return;
+  }
+  var source = new EventSource(select.dataset.availabilityUrl);
+  source.addEventListener("availability", function (event) {
+    var seats = JSON.parse(event.data);
+    Array.prototype.forEach.call(select.options, function (option) {
+      if (option.value in seats) {
+        var left = seats[option.value];
+        option.textContent = option.dataset.label + " - " + (left > 0 ? left + " seats left" : "sold out");
+      }
+    });
+  });
+})();
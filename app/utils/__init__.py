@@ -1,4 +1,5 @@
 """
 Import utility functions to make them available from the utils package.
 """
-from app.utils.seed import initialize_data
\ No newline at end of file
+from app.utils.seed import initialize_data
+from app.utils.http import http_date, is_not_modified
@@ -0,0 +1,127 @@
+"""
+Fingerprinted static assets.
+
+Every file under STATIC_DIR is read once, minified if it is CSS, and named
+after a hash of its content (``css/app.css`` -> ``css/app.3f2a9c81d0e4.css``),
+so its URL changes whenever it does and browsers may cache it forever.
+The gzip (and, with the optional ``brotli`` package, brotli) encodings are
+built at the same time, so serving an asset never compresses anything.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import STATIC_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_URL = "/static/"
+
+def minify_css(text):
+    """
+    Strip comments and the whitespace CSS does not need.
+    """
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>~])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """One static file and its precompressed encodings."""
+    name: str
+    fingerprinted_name: str
+    media_type: str
+    body: bytes
+    etag: str
+    gzip: bytes
+    brotli: Optional[bytes]
+
+    def encoded(self, accept_encoding):
+        """
+        Return (body, content encoding or None) for an Accept-Encoding header.
+        """
+        accepted = {token.split(";")[0].strip() for token in (accept_encoding or "").lower().split(",")}
+        if self.brotli is not None and "br" in accepted:
+            return self.brotli, "br"
+        if "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.body, None
+
+def load_asset(directory, name):
+    with open(os.path.join(directory, name), "rb") as fh:
+        body = fh.read()
+    if name.endswith(".css"):
+        body = minify_css(body.decode()).encode()
+    digest = hashlib.blake2b(body, digest_size=6).hexdigest()
+    stem, suffix = os.path.splitext(name)
+    return StaticAsset(
+        name=name,
+        fingerprinted_name=f"{stem}.{digest}{suffix}",
+        media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        body=body,
+        etag=f'"{digest}"',
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        brotli=brotli.compress(body, quality=11) if brotli else None,
+    )
+
+class AssetManifest:
+    """
+    The static files of a directory, looked up by plain or fingerprinted
+    name. Loaded on first use.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._assets = None
+
+    def load(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), self.directory).replace(os.sep, "/")
+                asset = load_asset(self.directory, name)
+                assets[name] = asset
+                assets[asset.fingerprinted_name] = asset
+        self._assets = assets
+
+    def get(self, name):
+        """
+        Return the asset called ``name`` (plain or fingerprinted), or None.
+        """
+        if self._assets is None:
+            self.load()
+        return self._assets.get(name)
+
+    def url(self, name):
+        """
+        The fingerprinted URL of an asset, for templates.
+        """
+        asset = self.get(name)
+        if asset is None:
+            raise KeyError(f"No static asset named {name!r}")
+        return STATIC_URL + asset.fingerprinted_name
+
+    @property
+    def version(self):
+        """
+        A digest of every fingerprint; changes whenever any asset does, so
+        pages linking assets can fold it into their own ETags.
+        """
+        if self._assets is None:
+            self.load()
+        names = sorted({asset.fingerprinted_name for asset in self._assets.values()})
+        return hashlib.blake2b("\n".join(names).encode(), digest_size=6).hexdigest()
+
+    def is_fingerprinted(self, name):
+        asset = self.get(name)
+        return asset is not None and asset.fingerprinted_name == name
+
+assets = AssetManifest(STATIC_DIR)
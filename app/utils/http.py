@@ -0,0 +1,29 @@
+"""
+HTTP helpers for conditional requests.
+"""
+from email.utils import format_datetime, parsedate_to_datetime
+
+def http_date(dt):
+    """
+    Format an aware datetime for Last-Modified style headers.
+    """
+    return format_datetime(dt, usegmt=True)
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Return True if the request's validators show the client already has the
+    representation identified by ``etag`` / ``last_modified``.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
@@ -0,0 +1,38 @@
+"""
+Bulk import movies from the command line:
+
+    python -m app.utils.import_movies movies.csv
+    python -m app.utils.import_movies movies.jsonl --format json --chunk-size 5000
+
+Rows are upserted on title and new movies get the default showtimes;
+invalid rows are listed with their line number. Running workers refresh
+their cached catalog through the version store in Redis, so run this with
+the workers' REDIS_URL; without it they reload it once it is
+CATALOG_CACHE_MAX_AGE seconds old.
+"""
+import argparse
+import asyncio
+
+from app.config import REDIS_URL, CATALOG_CACHE_MAX_AGE
+from app.database import SessionLocal, engine
+from app.services.movie_import import IMPORT_CHUNK_SIZE, import_movies
+
+async def main(args):
+    format = args.format or ("json" if args.path.endswith((".json", ".jsonl", ".ndjson")) else "csv")
+    async with SessionLocal() as db:
+        with open(args.path, encoding="utf-8", newline="") as stream:
+            report = await import_movies(db, stream, format=format, chunk_size=args.chunk_size)
+    await engine.dispose()
+
+    for line, message in report.errors:
+        print(f"line {line}: {message}")
+    print(f"{report.imported} of {report.rows} rows imported, {len(report.errors)} errors")
+    if report.imported and not REDIS_URL:
+        print(f"REDIS_URL is not set: running workers show the imported movies within {CATALOG_CACHE_MAX_AGE:g}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import movies from CSV or JSON.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "json"))
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    asyncio.run(main(parser.parse_args()))
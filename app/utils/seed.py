@@ -2,52 +2,56 @@
 Utility functions for seeding initial data.
 """
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
 
 from app.database import SessionLocal
 from app.models.user import User
 from app.models.movie import Movie
+from app.services.passwords import password_hasher
+from app.services.showtimes import top_up_schedules
 
 logger = logging.getLogger(__name__)
 
-def seed_movies():
+async def seed_movies():
     """
     Seed the database with initial movie data if none exists.
     """
-    db = SessionLocal()
-    try:
-        if db.query(Movie).count() == 0:
+    async with SessionLocal() as db:
+        if await db.scalar(select(func.count(Movie.id))) == 0:
             movies = [
                 Movie(title="Inception", year=2010, director="Christopher Nolan", rating=8, format="IMAX", price=12),
                 Movie(title="The Matrix", year=1999, director="The Wachowskis", rating=8, format="Standard", price=10),
                 Movie(title="Avengers: Endgame", year=2019, director="Anthony and Joe Russo", rating=8, format="3D", price=15),
             ]
             db.add_all(movies)
-            db.commit()
-    finally:
-        db.close()
+            await db.commit()
 
-def create_admin():
+async def seed_showtimes():
+    """
+    Give every movie the default schedule for the days ahead it is missing.
+    """
+    async with SessionLocal() as db:
+        await top_up_schedules(db)
+
+async def create_admin():
     """
     Create an admin user if none exists.
     """
-    db = SessionLocal()
-    try:
-        if not db.query(User).filter(User.username == "admin").first():
+    async with SessionLocal() as db:
+        if not await db.scalar(select(User).filter(User.username == "admin")):
             admin = User(
                 username="admin",
-                password="adminpass",  
+                password=await password_hasher.hash("adminpass"),
                 is_admin=True
             )
             db.add(admin)
-            db.commit()
+            await db.commit()
             logger.debug("Admin user created")
-    finally:
-        db.close()
 
-def initialize_data():
+async def initialize_data():
     """
     Initialize all seed data.
     """
-    seed_movies()
-    create_admin()
+    await seed_movies()
+    await seed_showtimes()
+    await create_admin()
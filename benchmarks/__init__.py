@@ -0,0 +1,6 @@
+"""
+Benchmark scripts for the movie booking system.
+
+Each module is runnable with ``python -m benchmarks.<name>``; none of them
+are collected by pytest.
+"""
@@ -0,0 +1,71 @@
+"""
+Per-request overhead of admission control.
+
+Calls AdmissionMiddleware directly around a no-op ASGI app, without a
+server or HTTP client in the way, and reports the mean time per request for
+a path without limits, an admitted limited request, a rejected one (429)
+and a shed one (503), plus the bare bucket store with few and with many
+distinct clients, minus the cost of calling the no-op app itself:
+
+    python -m benchmarks.bench_admission --requests 200000 --clients 100000
+"""
+import argparse
+import asyncio
+import time
+
+from app.middleware.admission import AdmissionMiddleware, AdmissionRule, AdmissionStats, LocalBucketStore
+
+async def noop_app(scope, receive, send):
+    pass
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+def make_scope(method, path, client="10.0.0.1"):
+    return {"type": "http", "method": method, "path": path, "headers": [], "client": (client, 50000), "session": {}}
+
+async def per_call(requests, call):
+    started = time.perf_counter()
+    for i in range(requests):
+        await call(i)
+    return (time.perf_counter() - started) / requests
+
+async def main(args):
+    unlimited = AdmissionRule("book", (("POST", "/book"),), args.requests * 2, 1e9, max_in_flight=0)
+    exhausted = AdmissionRule("book", (("POST", "/book"),), 1, 1e-9, max_in_flight=0)
+    busy = AdmissionRule("book", (("POST", "/book"),), 0, 0.0, max_in_flight=1)
+
+    admitting = AdmissionMiddleware(noop_app, rules=[unlimited], store=LocalBucketStore(), stats=AdmissionStats())
+    rejecting = AdmissionMiddleware(noop_app, rules=[exhausted], store=LocalBucketStore(), stats=AdmissionStats())
+    shedding = AdmissionMiddleware(noop_app, rules=[busy], store=LocalBucketStore(), stats=AdmissionStats())
+    shedding.stats.in_flight["book"] = 1
+
+    get, post = make_scope("GET", "/"), make_scope("POST", "/book")
+    clients = [make_scope("POST", "/book", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}") for i in range(args.clients)]
+    store = LocalBucketStore(max_keys=args.clients // 2)
+
+    baseline = await per_call(args.requests, lambda i: noop_app(get, receive, send))
+    results = [
+        ("unlimited path", await per_call(args.requests, lambda i: admitting(get, receive, send)) - baseline),
+        ("admitted", await per_call(args.requests, lambda i: admitting(post, receive, send)) - baseline),
+        ("rejected (429)", await per_call(args.requests, lambda i: rejecting(post, receive, send))),
+        ("shed (503)", await per_call(args.requests, lambda i: shedding(post, receive, send))),
+        ("bucket, one client", await per_call(args.requests, lambda i: store.take("book:ip:10.0.0.1", 10, 1.0))),
+        (f"bucket, {args.clients} clients", await per_call(
+            args.requests, lambda i: store.take(f"book:ip:{clients[i % args.clients]['client'][0]}", 10, 1.0)
+        )),
+    ]
+
+    print(f"{args.requests} calls each; {len(store.buckets)} buckets kept of {args.clients} clients")
+    print(f"{'case':<28}{'µs/request':>12}")
+    for name, seconds in results:
+        print(f"{name:<28}{seconds * 1e6:>12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=100000, help="distinct client addresses for the eviction case")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+JSON API against the HTML pages it mirrors.
+
+Requests each page and its ``/api/v1`` equivalent the same number of times
+and reports throughput, latency and response size side by side:
+
+    python -m benchmarks.bench_api --requests 1000 --concurrency 50
+    python -m benchmarks.bench_api --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+
+from benchmarks.bench_concurrency import make_client
+from benchmarks.common import print_results, run_concurrent, summarize
+
+async def main(args):
+    client = await make_client(args.url)
+    async with client:
+        response = await client.post("/login", data={"username": args.username, "password": args.password})
+        if response.status_code not in (200, 303):
+            raise SystemExit(f"login failed: {response.status_code}")
+
+        showtimes = (await client.get(f"/api/v1/movies/{args.movie_id}")).json()["showtimes"]
+        if not showtimes:
+            raise SystemExit(f"movie {args.movie_id} has no upcoming showtimes")
+        for _ in range(args.bookings):
+            await client.post("/api/v1/bookings", json={
+                "movie_id": args.movie_id, "showtime_id": showtimes[0]["id"], "quantity": 1,
+            })
+
+        pairs = (
+            ("/", "/api/v1/movies"),
+            (f"/book/{args.movie_id}", f"/api/v1/movies/{args.movie_id}"),
+            ("/bookings", "/api/v1/bookings"),
+            ("/admin/bookings", "/api/v1/admin/bookings"),
+        )
+        results = []
+        sizes = []
+        for html_path, json_path in pairs:
+            for path in (html_path, json_path):
+                size = 0
+
+                async def get(i, path=path):
+                    nonlocal size
+                    response = await client.get(path)
+                    response.raise_for_status()
+                    size = len(response.content)
+
+                elapsed, latencies, errors = await run_concurrent(args.requests, args.concurrency, get)
+                results.append(summarize(f"GET {path}", elapsed, latencies, errors))
+                sizes.append((path, size))
+
+    print_results(results)
+    print()
+    for (html_path, html_size), (json_path, json_size) in zip(sizes[::2], sizes[1::2]):
+        print(f"{html_path:<20} {html_size:>9} B   {json_path:<28} {json_size:>9} B   {json_size / html_size:6.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight")
+    parser.add_argument("--bookings", type=int, default=50, help="bookings to create first so the lists are not empty")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="adminpass")
+    parser.add_argument("--movie-id", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,135 @@
+"""
+Idle cost and fan-out of the seat availability streams.
+
+Opens ``--streams`` server-sent event streams on one movie's booking page
+against the app in-process (calling it as an ASGI app, since the HTTP
+client would wait for the streams to end), then reports the memory each
+idle stream holds (Python allocations traced while opening them, and the
+growth of the peak RSS), the time for one published update to reach every
+stream, and the most events any stream received in a second while updates
+were published ``--burst`` times a second:
+
+    python -m benchmarks.bench_availability --streams 10000 --burst 200
+"""
+import argparse
+import asyncio
+import gc
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import httpx
+
+from benchmarks.common import percentile, start_app
+
+class Stream:
+    """One open stream and the times its events arrived."""
+
+    def __init__(self, app, scope):
+        self.requested = False
+        self.opened = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.received = []
+        self.task = asyncio.create_task(app(scope, self.receive, self.send))
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] != "http.response.body" or b"event: availability" not in message["body"]:
+            return
+        if self.opened.is_set():
+            self.received.append(time.perf_counter())
+        else:
+            self.opened.set()
+
+def max_rss_mib():
+    # KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def main(args):
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ADMISSION_MAX_IN_FLIGHT", "0")
+    os.environ.setdefault("AVAILABILITY_MAX_SUBSCRIBERS", str(args.streams))
+    os.environ.setdefault("AVAILABILITY_MAX_EVENTS_PER_SECOND", str(args.rate))
+    from app.main import app
+    from app.services.availability import availability_feed
+
+    await start_app(app)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.post("/login", data={"username": args.username, "password": args.password})
+        if response.status_code not in (200, 303):
+            raise SystemExit(f"login failed: {response.status_code}")
+        cookie = f"session={client.cookies['session']}".encode()
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": f"/book/{args.movie_id}/availability", "raw_path": b"", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), (b"cookie", cookie)],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    gc.collect()
+    rss_before = max_rss_mib()
+    tracemalloc.start()
+    started = time.perf_counter()
+    streams = []
+    for first in range(0, args.streams, args.concurrency):
+        batch = [Stream(app, dict(scope)) for _ in range(first, min(first + args.concurrency, args.streams))]
+        await asyncio.gather(*(stream.opened.wait() for stream in batch))
+        streams.extend(batch)
+    opened = time.perf_counter() - started
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = max_rss_mib() - rss_before
+
+    # One update, timed until the last stream has it
+    published = time.perf_counter()
+    await availability_feed.publish({args.movie_id: {0: 1}})
+    while any(not stream.received for stream in streams):
+        await asyncio.sleep(0.001)
+    fanout = [stream.received[0] - published for stream in streams]
+
+    # A burst of updates, counted per stream and second
+    await asyncio.sleep(1 / args.rate if args.rate else 0)
+    for stream in streams:
+        stream.received.clear()
+    burst_started = time.perf_counter()
+    for i in range(int(args.burst * args.seconds)):
+        await availability_feed.publish({args.movie_id: {0: i}})
+        await asyncio.sleep(1 / args.burst)
+    per_second = max(
+        sum(1 for at in stream.received if second <= at - burst_started < second + 1)
+        for stream in streams for second in range(args.seconds)
+    )
+
+    for stream in streams:
+        stream.closed.set()
+    await asyncio.gather(*(stream.task for stream in streams))
+
+    print(f"{args.streams} streams opened in {opened:.1f}s; {availability_feed.subscribers} left after closing")
+    print(f"memory per idle stream: {traced / args.streams / 1024:.1f} KiB traced, "
+          f"{rss_growth * 1024 / args.streams:.1f} KiB peak RSS")
+    print(f"fan-out of one update: p50 {percentile(fanout, 50) * 1000:.1f} ms, "
+          f"last stream {max(fanout) * 1000:.1f} ms")
+    print(f"burst of {args.burst} updates/s: at most {per_second} events/s per stream (limit {args.rate})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=100, help="streams opened at a time")
+    parser.add_argument("--burst", type=int, default=200, help="updates published per second during the burst")
+    parser.add_argument("--seconds", type=int, default=2, help="length of the burst")
+    parser.add_argument("--rate", type=int, default=2, help="AVAILABILITY_MAX_EVENTS_PER_SECOND")
+    parser.add_argument("--movie-id", type=int, default=1)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="adminpass")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,64 @@
+"""
+Bytes on the wire for pages and the stylesheet, uncompressed, compressed
+and revalidated.
+
+Requests each path without compression, with gzip (and brotli when the
+``brotli`` package is installed), and with the ETag of a previous response
+in If-None-Match, and reports throughput, latency and transferred size:
+
+    python -m benchmarks.bench_compression --requests 500 --concurrency 20
+    python -m benchmarks.bench_compression --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+
+from benchmarks.bench_concurrency import make_client
+from benchmarks.common import print_results, run_concurrent, summarize
+
+async def main(args):
+    client = await make_client(args.url)
+    # Imported once make_client has configured the in-process app
+    from app.middleware.compression import brotli
+
+    async with client:
+        response = await client.post("/login", data={"username": args.username, "password": args.password})
+        if response.status_code not in (200, 303):
+            raise SystemExit(f"login failed: {response.status_code}")
+        stylesheet = (await client.get("/static/css/app.css")).headers["etag"]
+
+        encodings = ["identity", "gzip"] + (["br"] if brotli else [])
+        results = []
+        sizes = []
+        for path in ("/", "/bookings", "/admin/bookings", "/static/css/app.css"):
+            etag = (await client.get(path)).headers.get("etag") if path != "/static/css/app.css" else stylesheet
+            modes = [(encoding, {"Accept-Encoding": encoding}) for encoding in encodings]
+            if etag:
+                modes.append(("304", {"Accept-Encoding": encodings[-1], "If-None-Match": etag}))
+            for mode, headers in modes:
+                size = 0
+
+                async def get(i, path=path, headers=headers):
+                    nonlocal size
+                    response = await client.get(path, headers=headers)
+                    if response.status_code not in (200, 304):
+                        response.raise_for_status()
+                    size = response.num_bytes_downloaded
+
+                elapsed, latencies, errors = await run_concurrent(args.requests, args.concurrency, get)
+                results.append(summarize(f"GET {path} [{mode}]", elapsed, latencies, errors))
+                sizes.append((path, mode, size))
+
+    print_results(results)
+    print()
+    plain = {path: size for path, mode, size in sizes if mode == "identity"}
+    for path, mode, size in sizes:
+        print(f"{path:<22} {mode:<9} {size:>9} B {size / plain[path]:7.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per path and mode")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="adminpass")
+    asyncio.run(main(parser.parse_args()))
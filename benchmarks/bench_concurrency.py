@@ -0,0 +1,105 @@
+"""
+Concurrency benchmark for the home page and the booking flow.
+
+Measures requests/sec and latency percentiles for ``GET /``,
+``GET /book/{movie_id}`` and ``POST /book`` with many requests in flight.
+
+Run it in-process against a throwaway SQLite database:
+
+    python -m benchmarks.bench_concurrency --requests 2000 --concurrency 100
+
+or against a running server (e.g. ``uvicorn app.main:app --workers 1``)
+to compare two revisions of the app:
+
+    python -m benchmarks.bench_concurrency --url http://127.0.0.1:8000 --save before.json
+    python -m benchmarks.bench_concurrency --url http://127.0.0.1:8000 --compare before.json
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+
+import httpx
+
+from benchmarks.common import load_results, print_results, run_concurrent, save_results, start_app, summarize
+
+async def make_transport(url):
+    """
+    Return an HTTP transport and base URL for ``url``, or for the app served
+    in-process. Clients sharing the transport keep their own cookies.
+    """
+    if url:
+        return httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=None)), url
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    # Measure the app itself, not admission control (see bench_admission)
+    for setting in ("RATE_LIMIT_LOGIN", "RATE_LIMIT_REGISTER", "RATE_LIMIT_BOOK"):
+        os.environ.setdefault(setting, "")
+    os.environ.setdefault("ADMISSION_MAX_IN_FLIGHT", "0")
+    from app.main import app
+
+    await start_app(app)
+    # Unhandled errors become 500 responses, as they would behind a server
+    return httpx.ASGITransport(app=app, raise_app_exceptions=False), "http://bench"
+
+async def make_client(url):
+    """
+    Return an HTTP client for ``url``, or for the app served in-process.
+    """
+    transport, base_url = await make_transport(url)
+    return httpx.AsyncClient(transport=transport, base_url=base_url)
+
+async def main(args):
+    client = await make_client(args.url)
+    async with client:
+        response = await client.post("/login", data={"username": args.username, "password": args.password})
+        if response.status_code not in (200, 303):
+            raise SystemExit(f"login failed: {response.status_code}")
+
+        showtime_id = args.showtime_id
+        if showtime_id is None:
+            page = (await client.get(f"/book/{args.movie_id}")).text
+            match = re.search(r'<option value="(\d+)"', page)
+            if not match:
+                raise SystemExit(f"movie {args.movie_id} has no upcoming showtimes")
+            showtime_id = int(match.group(1))
+
+        async def get_home(i):
+            (await client.get("/")).raise_for_status()
+
+        async def get_book(i):
+            (await client.get(f"/book/{args.movie_id}")).raise_for_status()
+
+        async def post_book(i):
+            response = await client.post("/book", data={
+                "movie_id": args.movie_id,
+                "showtime_id": showtime_id,
+                "quantity": 1,
+            })
+            # 409 once the showtime sells out still exercises the full write path
+            if response.status_code not in (303, 409):
+                response.raise_for_status()
+
+        results = []
+        for name, make_request in (("GET /", get_home), ("GET /book/{id}", get_book), ("POST /book", post_book)):
+            elapsed, latencies, errors = await run_concurrent(args.requests, args.concurrency, make_request)
+            results.append(summarize(name, elapsed, latencies, errors))
+
+    print_results(results, load_results(args.compare))
+    if args.save:
+        save_results(args.save, results, concurrency=args.concurrency, url=args.url)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="adminpass")
+    parser.add_argument("--movie-id", type=int, default=1)
+    parser.add_argument("--showtime-id", type=int, help="showtime to book (default: first upcoming one)")
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results to compare throughput against")
+    asyncio.run(main(parser.parse_args()))
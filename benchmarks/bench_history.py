@@ -0,0 +1,116 @@
+"""
+Booking history of a frequent moviegoer.
+
+Gives one user ``--bookings`` bookings spread over past and upcoming
+showtimes, then times the history page's queries: the whole list loaded as
+full entities (what the page used to do), the first and a deep page of the
+keyset-paginated projection, and the summary on a cache miss and a hit:
+
+    python -m benchmarks.bench_history --bookings 10000 --repeat 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload
+
+from app.database import Base, SessionLocal, engine
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.services.bookings import fetch_user_bookings
+from app.services.history import history_summaries, history_summary
+from benchmarks.common import percentile
+
+async def timed(repeat, make_query):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await make_query()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        user = (await db.scalars(insert(User).returning(User.id), [
+            {"username": f"regular{time.time_ns()}", "password": "x", "is_admin": False}
+        ])).one()
+        others = (await db.scalars(insert(User).returning(User.id), [
+            {"username": f"other{time.time_ns()}-{i}", "password": "x", "is_admin": False} for i in range(1000)
+        ])).all()
+        movie_ids = (await db.scalars(insert(Movie).returning(Movie.id), [
+            {"title": f"History Bench {i}", "year": 2024, "director": "Bench", "rating": 5, "format": "Standard", "price": 10}
+            for i in range(args.movies)
+        ])).all()
+        now = datetime.now()
+        showtimes = (await db.execute(insert(Showtime).returning(Showtime.id, Showtime.movie_id), [
+            {"movie_id": movie_id, "screen": "Bench", "starts_at": now + timedelta(days=day), "capacity": 100}
+            for movie_id in movie_ids
+            for day in range(-300, 7, 10)
+        ])).all()
+        for offset in range(0, args.bookings, 5000):
+            await db.execute(insert(Booking), [
+                {
+                    "user_id": user,
+                    "movie_id": showtimes[i % len(showtimes)].movie_id,
+                    "showtime_id": showtimes[i % len(showtimes)].id,
+                    "quantity": 2,
+                    "total": 20,
+                }
+                for i in range(offset, min(offset + 5000, args.bookings))
+            ])
+        # Other users' bookings share the table and the index
+        for offset in range(0, args.others, 5000):
+            await db.execute(insert(Booking), [
+                {"user_id": others[i % len(others)], "movie_id": showtimes[i % len(showtimes)].movie_id,
+                 "showtime_id": showtimes[i % len(showtimes)].id, "quantity": 1, "total": 10}
+                for i in range(offset, min(offset + 5000, args.others))
+            ])
+        await db.commit()
+
+    async with SessionLocal() as db:
+        _, deep_cursor = await fetch_user_bookings(db, user, limit=args.bookings // 2)
+
+        async def full_list():
+            (await db.execute(
+                select(Booking)
+                .options(joinedload(Booking.movie), joinedload(Booking.showtime))
+                .filter(Booking.user_id == user)
+            )).scalars().all()
+            db.expunge_all()
+
+        async def summary_miss():
+            history_summaries.clear()
+            await history_summary(db, user)
+
+        results = [
+            ("full list, entities", await timed(max(1, args.repeat // 20), full_list)),
+            ("first page", await timed(args.repeat, lambda: fetch_user_bookings(db, user))),
+            ("page at the middle", await timed(args.repeat, lambda: fetch_user_bookings(db, user, before=deep_cursor))),
+            ("summary, cache miss", await timed(max(1, args.repeat // 20), summary_miss)),
+            ("summary, cache hit", await timed(args.repeat, lambda: history_summary(db, user))),
+        ]
+    await engine.dispose()
+
+    print(f"{args.bookings} bookings for one user, {args.others} for others")
+    print(f"{'query':<24}{'runs':>6}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, samples in results:
+        print(f"{name:<24}{len(samples):>6}{percentile(samples, 50) * 1000:>10.2f}{percentile(samples, 99) * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bookings", type=int, default=10000, help="bookings of the user whose history is read")
+    parser.add_argument("--others", type=int, default=50000, help="bookings of other users")
+    parser.add_argument("--movies", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
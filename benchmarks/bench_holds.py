@@ -0,0 +1,72 @@
+"""
+Seat hold sweeper cost with a large backlog.
+
+Inserts many outstanding holds (half already expired) and times individual
+sweeper ticks. With the index on expiry time each tick touches at most one
+batch, so tick time stays flat however large the backlog is:
+
+    python -m benchmarks.bench_holds --holds 1000000 --batch 500 --ticks 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert
+
+from app.database import Base, SessionLocal, engine
+from app.models.inventory import SeatHold
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.services.holds import expire_holds
+from benchmarks.common import percentile
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = datetime.now()
+    async with SessionLocal() as db:
+        movie = Movie(title=f"Hold Bench {time.time_ns()}", year=2024, director="Bench", rating=5, format="Standard", price=10)
+        db.add(movie)
+        await db.flush()
+        showtime = Showtime(movie_id=movie.id, screen="Bench", starts_at=now + timedelta(days=1), capacity=100)
+        db.add(showtime)
+        await db.flush()
+        started = time.perf_counter()
+        for offset in range(0, args.holds, 10000):
+            await db.execute(insert(SeatHold), [
+                {
+                    "user": f"bench{i}",
+                    "showtime_id": showtime.id,
+                    "quantity": 1,
+                    # Alternate expired and live holds across the whole index
+                    "expires_at": now + timedelta(seconds=(i % 2 * 2 - 1) * (i + 1)),
+                }
+                for i in range(offset, min(offset + 10000, args.holds))
+            ])
+        await db.commit()
+    print(f"inserted {args.holds} holds in {time.perf_counter() - started:.1f}s")
+
+    ticks = []
+    expired = 0
+    for _ in range(args.ticks):
+        started = time.perf_counter()
+        async with SessionLocal() as db:
+            expired += await expire_holds(db, limit=args.batch)
+        ticks.append(time.perf_counter() - started)
+    await engine.dispose()
+
+    print(f"expired {expired} holds in {args.ticks} ticks of at most {args.batch}")
+    print(f"tick p50/p99/max: {percentile(ticks, 50) * 1000:.1f} / {percentile(ticks, 99) * 1000:.1f} / {max(ticks) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--holds", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
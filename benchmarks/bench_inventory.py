@@ -0,0 +1,94 @@
+"""
+Contention stress test for the seat inventory engine.
+
+Fires thousands of concurrent single-seat booking attempts at one showtime
+and checks afterwards that the showtime was never oversold: the number of
+successful bookings, claimed seats and the inventory counter must all agree
+with the configured capacity. Reports p50/p99 latency per attempt.
+
+    python -m benchmarks.bench_inventory --attempts 5000 --capacity 500
+
+Set DATABASE_URL to run it against PostgreSQL; by default it uses a
+throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import select, func
+
+from app.database import Base, SessionLocal, engine
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.inventory import SeatInventory, Seat
+from app.models.showtime import Showtime
+from app.services.inventory import SoldOut, ensure_inventory, reserve_seats
+from benchmarks.common import percentile
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        movie = Movie(title=f"Stress Test {time.time_ns()}", year=2024, director="Bench", rating=5, format="Standard", price=10)
+        db.add(movie)
+        await db.flush()
+        showtime = Showtime(movie_id=movie.id, screen="Bench", starts_at=datetime.now() + timedelta(days=1), capacity=args.capacity)
+        db.add(showtime)
+        await db.flush()
+        inventory_id = await ensure_inventory(db, showtime.id)
+        await db.commit()
+
+    latencies = []
+    outcomes = {"booked": 0, "sold_out": 0, "errors": 0}
+
+    async def attempt(i):
+        started = time.perf_counter()
+        async with SessionLocal() as db:
+            try:
+                booking = Booking(movie_id=movie.id, showtime_id=showtime.id, quantity=1, total=movie.price)
+                db.add(booking)
+                await db.flush()
+                await reserve_seats(db, booking)
+                await db.commit()
+                outcomes["booked"] += 1
+            except SoldOut:
+                await db.rollback()
+                outcomes["sold_out"] += 1
+            except Exception:
+                await db.rollback()
+                outcomes["errors"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(attempt(i) for i in range(args.attempts)))
+    elapsed = time.perf_counter() - started
+
+    async with SessionLocal() as db:
+        seats_available = await db.scalar(select(SeatInventory.seats_available).filter(SeatInventory.id == inventory_id))
+        seats_taken = await db.scalar(select(func.count(Seat.id)).filter(Seat.inventory_id == inventory_id, Seat.booking_id.isnot(None)))
+        bookings = await db.scalar(select(func.count(Booking.id)).filter(Booking.movie_id == movie.id))
+    await engine.dispose()
+
+    print(f"attempts:        {args.attempts} in {elapsed:.2f}s ({args.attempts / elapsed:.0f}/s)")
+    print(f"booked:          {outcomes['booked']} (capacity {args.capacity})")
+    print(f"sold out:        {outcomes['sold_out']}")
+    print(f"errors:          {outcomes['errors']}")
+    print(f"latency p50/p99: {percentile(latencies, 50) * 1000:.1f} / {percentile(latencies, 99) * 1000:.1f} ms")
+
+    oversold = bookings > args.capacity or seats_taken != bookings or seats_available != args.capacity - bookings
+    print(f"bookings={bookings} seats_taken={seats_taken} seats_available={seats_available}")
+    if oversold:
+        raise SystemExit("OVERSOLD: inventory does not match bookings")
+    print("no oversell")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--attempts", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
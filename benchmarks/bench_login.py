@@ -0,0 +1,77 @@
+"""
+Login throughput under a burst of concurrent logins.
+
+Fires a burst of logins at the in-process app and reports login throughput,
+shed logins (503) and event loop lag - how late a 10ms timer fires during
+the burst, i.e. how long bcrypt stalls every other request. Compare against
+hashing inline on the event loop with --inline:
+
+    python -m benchmarks.bench_login --logins 200 --concurrency 50
+    python -m benchmarks.bench_login --logins 200 --concurrency 50 --inline
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+# Measure the app itself, not admission control (see bench_admission)
+for setting in ("RATE_LIMIT_LOGIN", "RATE_LIMIT_REGISTER", "RATE_LIMIT_BOOK"):
+    os.environ.setdefault(setting, "")
+os.environ.setdefault("ADMISSION_MAX_IN_FLIGHT", "0")
+
+from app.main import app
+from app.services.passwords import password_hasher
+from benchmarks.common import print_results, run_concurrent, start_app, summarize
+
+async def main(args):
+    if args.inline:
+        async def run_inline(fn, *fn_args):
+            return fn(*fn_args)
+        password_hasher._run = run_inline
+
+    await start_app(app)
+    transport = httpx.ASGITransport(app=app)
+    shed = 0
+
+    async def login(i):
+        nonlocal shed
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/login", data={"username": "admin", "password": "adminpass"})
+        if response.status_code == 503:
+            shed += 1
+        elif response.status_code != 303:
+            response.raise_for_status()
+
+    lags = []
+    burst_done = asyncio.Event()
+
+    async def probe():
+        # How late a 10ms timer fires: time every other request waits on the loop
+        while not burst_done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    probe_task = asyncio.create_task(probe())
+    elapsed, latencies, errors = await run_concurrent(args.logins, args.concurrency, login)
+    burst_done.set()
+    await probe_task
+
+    mode = "inline" if args.inline else f"pool x{password_hasher.executor._max_workers}"
+    print(f"bcrypt rounds {password_hasher.rounds}, hashing {mode}, {shed} logins shed (503)")
+    print_results([
+        summarize("POST /login", elapsed, latencies, errors),
+        summarize("event loop lag", elapsed, lags, 0),
+    ])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop, as a naive handler would")
+    asyncio.run(main(parser.parse_args()))
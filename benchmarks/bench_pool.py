@@ -0,0 +1,70 @@
+"""
+Connection pool saturation test.
+
+Runs many concurrent "requests" that each check out a connection, run a
+query and hold the connection for a while (as a handler does while it
+works), and reports checkout wait percentiles and timeouts for each pool
+configuration given as SIZE+OVERFLOW:
+
+    python -m benchmarks.bench_pool --pools 5+10,10+20 --requests 2000 --concurrency 100
+
+Set DATABASE_URL to run it against PostgreSQL (or PgBouncer, with
+DB_PGBOUNCER=True); by default it uses a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import exc, text
+
+from app.config import DATABASE_URL
+from app.database import make_engine, pool_status
+from benchmarks.common import percentile, print_results, run_concurrent, summarize
+
+async def run_pool(args, size, overflow):
+    engine = make_engine(DATABASE_URL, pool_size=size, max_overflow=overflow, pool_timeout=args.pool_timeout)
+    timeouts = 0
+
+    async def request(i):
+        nonlocal timeouts
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(args.hold / 1000)
+        except exc.TimeoutError:
+            timeouts += 1
+            raise
+
+    elapsed, latencies, errors = await run_concurrent(args.requests, args.concurrency, request)
+    status = pool_status(engine)
+    await engine.dispose()
+
+    # Reconstruct per-checkout waits from the histogram's upper bucket bounds
+    wait = status["wait"]
+    waits = []
+    for bound, count in zip(wait.bounds + (status["max_wait"],), wait.counts):
+        waits.extend([min(bound, status["max_wait"])] * count)
+    name = f"pool {size}+{overflow}"
+    print(f"{name}: {status['checkouts']} checkouts, {timeouts} timed out, "
+          f"wait p50 <= {percentile(waits, 50) * 1000:.1f}ms, p99 <= {percentile(waits, 99) * 1000:.1f}ms, "
+          f"max {status['max_wait'] * 1000:.1f}ms")
+    return summarize(name, elapsed, latencies, errors)
+
+async def main(args):
+    results = []
+    for spec in args.pools.split(","):
+        size, _, overflow = spec.partition("+")
+        results.append(await run_pool(args, int(size), int(overflow or 0)))
+    print_results(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pools", default="5+10,10+20", help="comma-separated SIZE+OVERFLOW configurations")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--hold", type=float, default=20, help="ms each request holds its connection")
+    parser.add_argument("--pool-timeout", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Search and autocomplete latency on a large catalog.
+
+Fills a throwaway database with generated movies, then times
+``GET /search/suggest`` (autocomplete, target: p99 under 10ms) and
+``GET /search`` for random word prefixes through the in-process app:
+
+    python -m benchmarks.bench_search --movies 100000 --requests 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+# Measure the app itself, not admission control (see bench_admission)
+for setting in ("RATE_LIMIT_LOGIN", "RATE_LIMIT_REGISTER", "RATE_LIMIT_BOOK"):
+    os.environ.setdefault(setting, "")
+os.environ.setdefault("ADMISSION_MAX_IN_FLIGHT", "0")
+
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.movie import Movie
+from benchmarks.common import print_results, run_concurrent, start_app, summarize
+
+WORDS = (
+    "night day dark light return rise fall last first lost city star war love dead king queen "
+    "river road house story summer winter shadow fire ice blood gold silver iron storm dream"
+).split()
+NAMES = "Ava Ben Cara Dan Eli Fay Gus Hana Ivan Jo Kai Lena Max Nora Omar Pia".split()
+
+def generated_movies(count, seed=1):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "title": f"{' '.join(rng.sample(WORDS, rng.randint(1, 3))).title()} {i}",
+            "year": rng.randint(1950, 2024),
+            "director": f"{rng.choice(NAMES)} {rng.choice(WORDS).title()}son",
+            "rating": rng.randint(1, 10),
+            "format": rng.choice(("Standard", "IMAX", "3D")),
+            "price": rng.randint(8, 20),
+        }
+
+async def main(args):
+    await start_app(app)
+    started = time.perf_counter()
+    movies = list(generated_movies(args.movies))
+    async with SessionLocal() as db:
+        for i in range(0, len(movies), 5000):
+            await db.execute(insert(Movie), movies[i:i + 5000])
+        await db.commit()
+    print(f"loaded {args.movies} movies in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(2)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        (await client.get("/search/suggest", params={"q": "x"})).raise_for_status()
+        print(f"first autocomplete (loads catalog, builds word index): {time.perf_counter() - started:.2f}s")
+
+        async def suggest(i):
+            word = rng.choice(WORDS)
+            (await client.get("/search/suggest", params={"q": word[:rng.randint(1, len(word))]})).raise_for_status()
+
+        async def search(i):
+            word = rng.choice(WORDS)
+            (await client.get("/search", params={"q": word[:rng.randint(2, len(word))]})).raise_for_status()
+
+        results = []
+        for name, make_request in (("GET /search/suggest", suggest), ("GET /search", search)):
+            elapsed, latencies, errors = await run_concurrent(args.requests, 1, make_request)
+            results.append(summarize(name, elapsed, latencies, errors))
+    print_results(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=1000, help="sequential requests per endpoint")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,206 @@
+"""
+Scripted user sessions against the booking flow.
+
+Each virtual user logs in once (spread over ``--ramp-up`` seconds), then loops over a realistic session until
+the time is up: browse the home page, open a movie's booking page, hold
+seats, book them, look at their bookings and sometimes cancel one. A share
+of the users are admins paging through ``/admin/bookings``. Every step is
+timed separately and reported with throughput and latency percentiles.
+
+Seed the database first (``benchmarks.seed_data``), then run it in-process:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.bench_sessions --users 1000 --duration 60
+
+or against a running server, saving a baseline and comparing a later commit
+against it:
+
+    python -m benchmarks.bench_sessions --url http://127.0.0.1:8000 --save baseline.json
+    python -m benchmarks.bench_sessions --url http://127.0.0.1:8000 --compare baseline.json
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.bench_concurrency import make_transport
+from benchmarks.common import load_results, print_results, save_results, summarize
+
+# Statuses that are expected outcomes of the step rather than errors
+EXPECTED = {
+    "login": (303,),
+    "hold": (303, 409),
+    "book": (303, 409, 410),
+    "cancel": (303,),
+}
+
+class Recorder:
+    """Latencies and errors per session step."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.outcomes = defaultdict(int)
+
+    def record(self, step, started, response):
+        """
+        Record a step that started at ``started``; returns the response if
+        it had an expected status, else None.
+        """
+        self.latencies[step].append(time.perf_counter() - started)
+        if response is None:
+            self.errors[step] += 1
+            return None
+        self.outcomes[f"{step} {response.status_code}"] += 1
+        if response.status_code not in EXPECTED.get(step, (200,)):
+            self.errors[step] += 1
+            return None
+        return response
+
+    async def request(self, step, send):
+        started = time.perf_counter()
+        try:
+            response = await send()
+        except Exception:
+            response = None
+        return self.record(step, started, response)
+
+    def results(self, elapsed):
+        return [
+            summarize(step, elapsed, latencies, self.errors[step])
+            for step, latencies in self.latencies.items()
+        ]
+
+async def customer_session(client, recorder, rng, movie_ids, cancel_rate):
+    """
+    Browse, hold, book, list and sometimes cancel.
+    """
+    await recorder.request("GET /", lambda: client.get("/"))
+    movie_id = rng.choice(movie_ids)
+    page = await recorder.request("GET /book/{id}", lambda: client.get(f"/book/{movie_id}"))
+    if page is None:
+        return
+    showtime_ids = re.findall(r'<option value="(\d+)"', page.text)
+    if not showtime_ids:
+        return
+    showtime_id = rng.choice(showtime_ids)
+    key = re.search(r'name="idempotency_key" value="(\w+)"', page.text)
+    form = {"movie_id": movie_id, "showtime_id": showtime_id, "quantity": rng.choice((1, 1, 2, 3))}
+
+    hold = await recorder.request("hold", lambda: client.post("/hold", data={**form, "idempotency_key": key.group(1) if key else ""}))
+    if hold is None or hold.status_code != 303:
+        return
+    hold_id = hold.headers["location"].rsplit("/", 1)[-1]
+    await recorder.request("book", lambda: client.post("/book", data={**form, "hold_id": hold_id}))
+
+    bookings = await recorder.request("GET /bookings", lambda: client.get("/bookings"))
+    if bookings is not None and rng.random() < cancel_rate:
+        booking_ids = re.findall(r'name="booking_id" value="(\d+)"', bookings.text)
+        if booking_ids:
+            await recorder.request("cancel", lambda: client.post("/cancel", data={"booking_id": rng.choice(booking_ids)}))
+
+async def admin_session(client, recorder, rng, movie_ids, cancel_rate):
+    """
+    Page through the admin bookings list.
+    """
+    response = await recorder.request("GET /admin/bookings", lambda: client.get("/admin/bookings"))
+    pages = 1
+    while response is not None and pages < 3:
+        match = re.search(r'href="(/admin/bookings\?[^"]*after=\d+[^"]*)"', response.text)
+        if not match:
+            break
+        url = match.group(1).replace("&amp;", "&")
+        response = await recorder.request("GET /admin/bookings", lambda: client.get(url))
+        pages += 1
+
+async def log_in(client, recorder, username, password, attempts=5):
+    """
+    Log in, backing off as told by Retry-After while logins are being shed.
+    """
+    started = time.perf_counter()
+    for _ in range(attempts):
+        try:
+            response = await client.post("/login", data={"username": username, "password": password})
+        except Exception:
+            response = None
+            break
+        if response.status_code != 503:
+            break
+        recorder.outcomes["login 503"] += 1
+        await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+    return recorder.record("login", started, response)
+
+async def virtual_user(make_user_client, recorder, rng, credentials, session, movie_ids, deadline, cancel_rate, think_time, start_delay):
+    await asyncio.sleep(start_delay)
+    async with make_user_client() as client:
+        if await log_in(client, recorder, *credentials) is None:
+            return
+        while time.perf_counter() < deadline:
+            await session(client, recorder, rng, movie_ids, cancel_rate)
+            if think_time:
+                await asyncio.sleep(rng.uniform(0, think_time))
+
+async def main(args):
+    transport, base_url = await make_transport(args.url)
+
+    # Every virtual user has its own cookie jar; they share the transport
+    def make_user_client():
+        return httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout)
+
+    async with transport:
+        async with make_user_client() as client:
+            movies = (await client.get("/api/v1/movies")).json()
+        movie_ids = [movie["id"] for movie in movies]
+        if not movie_ids:
+            raise SystemExit("no movies; seed the database with benchmarks.seed_data first")
+
+        rng = random.Random(args.seed)
+        recorder = Recorder()
+        admins = round(args.users * args.admin_share)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            virtual_user(
+                make_user_client,
+                recorder,
+                random.Random(rng.random()),
+                (args.admin_username, args.admin_password) if i < admins else (f"{args.user_prefix}{i}", args.password),
+                admin_session if i < admins else customer_session,
+                movie_ids,
+                deadline,
+                args.cancel_rate,
+                args.think_time,
+                args.ramp_up * i / args.users,
+            )
+            for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - started
+
+    results = recorder.results(elapsed)
+    print(f"{args.users} users ({admins} admins) for {elapsed:.1f}s")
+    print_results(results, load_results(args.compare))
+    print("outcomes: " + ", ".join(f"{name}: {count}" for name, count in sorted(recorder.outcomes.items())))
+    if args.save:
+        save_results(args.save, results, users=args.users, duration=args.duration, url=args.url)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--users", type=int, default=100, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds over which the users log in")
+    parser.add_argument("--think-time", type=float, default=0.5, help="max seconds a user pauses between sessions")
+    parser.add_argument("--cancel-rate", type=float, default=0.3, help="share of sessions that cancel a booking")
+    parser.add_argument("--admin-share", type=float, default=0.02, help="share of users who are admins")
+    parser.add_argument("--user-prefix", default="user")
+    parser.add_argument("--password", default="benchpass")
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="adminpass")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results to compare throughput against")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Cold start time of application workers.
+
+Prepares a throwaway database once (schema and demo data, as a deploy
+does), then starts ``--workers`` fresh worker processes at a time, each
+importing ``app.main``, running the startup handlers and serving its first
+request, and reports how long each phase took. ``seed`` workers also run the
+idempotent seeding (``SEED_DATA=True``); ``schema`` workers additionally
+create and migrate the schema themselves, as every worker used to:
+
+    python -m benchmarks.bench_startup --workers 4 --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+MODES = {
+    "lazy": {},
+    "seed": {"SEED_DATA": "True"},
+    "schema": {"SEED_DATA": "True", "BENCH_UPGRADE_SCHEMA": "True"},
+}
+
+async def worker():
+    started = time.perf_counter()
+    import httpx
+    from app.database import engine
+    from app.main import app
+    imported = time.perf_counter()
+
+    if os.environ.get("BENCH_UPGRADE_SCHEMA") == "True":
+        from app.migrations import upgrade_database
+        await upgrade_database(engine)
+    await app.router.startup()
+    ready = time.perf_counter()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        (await client.get("/login")).raise_for_status()
+    served = time.perf_counter()
+    await app.router.shutdown()
+    await engine.dispose()
+    print(json.dumps({"import": imported - started, "startup": ready - imported, "first request": served - ready}))
+
+async def prepare():
+    from app.database import engine
+    from app.migrations import upgrade_database
+    from app.utils.seed import initialize_data
+
+    await upgrade_database(engine)
+    await initialize_data()
+    await engine.dispose()
+
+def start_workers(count, mode):
+    env = dict(os.environ, **MODES[mode])
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.bench_startup", "--worker"], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(count)
+    ]
+    timings = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode:
+            raise SystemExit(f"worker failed in mode {mode}")
+        timings.append(json.loads(output.splitlines()[-1]))
+    return time.perf_counter() - started, timings
+
+def main(args):
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    asyncio.run(prepare())
+
+    print(f"{args.workers} workers started together, {args.runs} runs per mode")
+    print(f"{'mode':<8}{'phase':<16}{'p50 ms':>10}{'max ms':>10}")
+    for mode in args.modes.split(","):
+        samples = {"import": [], "startup": [], "first request": [], "all workers": []}
+        for _ in range(args.runs):
+            elapsed, timings = start_workers(args.workers, mode)
+            for timing in timings:
+                for phase, seconds in timing.items():
+                    samples[phase].append(seconds)
+            samples["all workers"].append(elapsed)
+        for phase, values in samples.items():
+            print(f"{mode:<8}{phase:<16}{percentile(values, 50) * 1000:>10.1f}{max(values) * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4, help="worker processes started at once")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated subset of {', '.join(MODES)}")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(worker())
+    else:
+        main(args)
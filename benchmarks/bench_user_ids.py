@@ -0,0 +1,133 @@
+"""
+Bookings keyed by username versus by user id.
+
+Builds the pre-m007 bookings table (a username column with a (user, id)
+index) in a throwaway database, times a user's history query and the admin
+listing against it, runs the m007 migration in batches of
+``--batch-size`` and the m008 one dropping the username, then times the same queries on user_id and compares the
+sizes of the two indexes:
+
+    python -m benchmarks.bench_user_ids --users 10000 --bookings 500000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert, select, text
+
+from app.database import Base, engine
+from app.migrations import m007_booking_user_ids, m008_drop_booking_usernames, online
+from app.models.booking import Booking
+from app.models.movie import Movie
+from app.models.user import User
+from benchmarks.common import percentile
+
+def index_size(conn, name):
+    if conn.dialect.name == "sqlite":
+        return conn.scalar(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"), {"name": name})
+    if conn.dialect.name == "postgresql":
+        return conn.scalar(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name})
+    return None
+
+def build_legacy(conn, args):
+    rng = random.Random(args.seed)
+    quoted = conn.dialect.identifier_preparer.quote("user")
+    with conn.begin():
+        conn.execute(text("DROP INDEX ix_bookings_user_id_and_id"))
+        conn.execute(text(f"ALTER TABLE bookings ADD COLUMN {quoted} VARCHAR"))
+        conn.execute(text(f"CREATE INDEX ix_bookings_user_and_id ON bookings ({quoted}, id)"))
+        movie_id = conn.scalar(insert(Movie).returning(Movie.id), [
+            {"title": f"User Id Bench {time.time_ns()}", "year": 2024, "director": "Bench", "rating": 5, "format": "Standard", "price": 10}
+        ])
+        # Usernames of realistic length; the old index stored one per booking
+        usernames = [f"moviegoer.{i:07d}@example.com" for i in range(args.users)]
+        for offset in range(0, args.users, 10000):
+            conn.execute(insert(User), [
+                {"username": username, "password": "x", "is_admin": False} for username in usernames[offset:offset + 10000]
+            ])
+        legacy = text(
+            f"INSERT INTO bookings ({quoted}, movie_id, quantity, total) VALUES (:user, :movie_id, 1, 10)"
+        )
+        for offset in range(0, args.bookings, 10000):
+            conn.execute(legacy, [
+                {"user": rng.choice(usernames), "movie_id": movie_id}
+                for _ in range(offset, min(offset + 10000, args.bookings))
+            ])
+    return usernames
+
+def time_queries(conn, args, history, admin, keys):
+    rng = random.Random(args.seed)
+    samples = {"history page": [], "admin listing": []}
+    with conn.begin():
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            conn.execute(history, {"key": rng.choice(keys)}).all()
+            samples["history page"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            conn.execute(admin).all()
+            samples["admin listing"].append(time.perf_counter() - started)
+    return samples
+
+def run(conn, args):
+    quoted = conn.dialect.identifier_preparer.quote("user")
+    started = time.perf_counter()
+    usernames = build_legacy(conn, args)
+    print(f"built {args.bookings} legacy bookings for {args.users} users in {time.perf_counter() - started:.1f}s")
+
+    before = time_queries(conn, args, text(
+        f"SELECT id, quantity, total FROM bookings WHERE {quoted} = :key ORDER BY id DESC LIMIT 25"
+    ), text(
+        f"SELECT id, {quoted}, quantity, total FROM bookings ORDER BY id DESC LIMIT 100"
+    ), usernames)
+    with conn.begin():
+        before_size = index_size(conn, "ix_bookings_user_and_id")
+
+    online.MIGRATION_BATCH_SIZE = args.batch_size
+    started = time.perf_counter()
+    m007_booking_user_ids.upgrade(conn)
+    m008_drop_booking_usernames.upgrade(conn)
+    migrated = time.perf_counter() - started
+
+    with conn.begin():
+        user_ids = conn.scalars(select(User.id)).all()
+        after_size = index_size(conn, "ix_bookings_user_id_and_id")
+    after = time_queries(conn, args, text(
+        "SELECT id, quantity, total FROM bookings WHERE user_id = :key ORDER BY id DESC LIMIT 25"
+    ), (
+        select(Booking.id, User.username, Booking.quantity, Booking.total)
+        .outerjoin(User, Booking.user_id == User.id)
+        .order_by(Booking.id.desc())
+        .limit(100)
+    ), user_ids)
+    return before, after, before_size, after_size, migrated
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        before, after, before_size, after_size, migrated = await conn.run_sync(run, args)
+    await engine.dispose()
+
+    print(f"m007 and m008 in batches of {args.batch_size}: {migrated:.1f}s")
+    if before_size is not None:
+        print(f"index size: (user, id) {before_size / 1024:.0f} KiB, (user_id, id) {after_size / 1024:.0f} KiB "
+              f"({after_size / before_size:.0%})")
+    print(f"{'query':<28}{'runs':>6}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, results in (("by username", before), ("by user_id", after)):
+        for name, samples in results.items():
+            print(f"{name + ', ' + label:<28}{len(samples):>6}"
+                  f"{percentile(samples, 50) * 1000:>10.3f}{percentile(samples, 99) * 1000:>10.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=500000)
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per backfill transaction")
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
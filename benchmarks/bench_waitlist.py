@@ -0,0 +1,128 @@
+"""
+Mass cancellation against a long waitlist.
+
+Sells out a showtime, queues a large waitlist behind it, then cancels a
+block of bookings in one transaction and times how long it takes to free the
+seats and promote the front of the queue. Afterwards checks that exactly the
+first entries were promoted, in order, has ``--leave`` users spread through
+the queue leave it, and times position lookups for the users still waiting:
+
+    python -m benchmarks.bench_waitlist --waitlist 50000 --capacity 5000 --cancel 2000
+"""
+import argparse
+import asyncio
+import bisect
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert, select, update, func
+
+from app.database import Base, SessionLocal, engine
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.models.waitlist import WaitlistQueue, WaitlistEntry
+from app.services.bookings import cancel_bookings
+from app.services.inventory import ensure_inventory
+from app.services.waitlist import leave_waitlist, waitlist_entries
+from benchmarks.common import percentile
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        movie = Movie(title=f"Waitlist Bench {time.time_ns()}", year=2024, director="Bench", rating=5, format="Standard", price=10)
+        db.add(movie)
+        await db.flush()
+        showtime = Showtime(movie_id=movie.id, screen="Bench", starts_at=datetime.now() + timedelta(days=1), capacity=args.capacity)
+        db.add(showtime)
+        await db.flush()
+        inventory_id = await ensure_inventory(db, showtime.id)
+
+        # Sell out with single-seat bookings, each owning one seat
+        booking_ids = (await db.scalars(insert(Booking).returning(Booking.id), [
+            {"movie_id": movie.id, "showtime_id": showtime.id, "quantity": 1, "total": movie.price}
+            for i in range(args.capacity)
+        ])).all()
+        seat_ids = (await db.scalars(select(Seat.id).filter(Seat.inventory_id == inventory_id).order_by(Seat.id))).all()
+        await db.execute(update(Seat), [
+            {"id": seat_id, "booking_id": booking_id} for seat_id, booking_id in zip(seat_ids, booking_ids)
+        ])
+        await db.execute(update(SeatInventory).filter(SeatInventory.id == inventory_id).values(seats_available=0))
+
+        # Promoted entries become bookings of these accounts
+        user_ids = []
+        for offset in range(0, args.waitlist, 10000):
+            user_ids += (await db.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), [
+                {"username": f"waiting{i}", "password": "x", "is_admin": False}
+                for i in range(offset, min(offset + 10000, args.waitlist))
+            ])).all()
+
+        started = time.perf_counter()
+        db.add(WaitlistQueue(showtime_id=showtime.id, next_seq=args.waitlist, head_seq=0))
+        for offset in range(0, args.waitlist, 10000):
+            await db.execute(insert(WaitlistEntry), [
+                {"showtime_id": showtime.id, "user_id": user_ids[i], "user": f"waiting{i}", "quantity": 1, "seq": i + 1}
+                for i in range(offset, min(offset + 10000, args.waitlist))
+            ])
+        await db.commit()
+    print(f"queued {args.waitlist} waitlist entries in {time.perf_counter() - started:.1f}s")
+
+    async with SessionLocal() as db:
+        bookings = (await db.scalars(
+            select(Booking).filter(Booking.showtime_id == showtime.id).order_by(Booking.id).limit(args.cancel)
+        )).all()
+        started = time.perf_counter()
+        promoted = await cancel_bookings(db, bookings)
+        elapsed = time.perf_counter() - started
+    print(f"cancelled {len(bookings)} bookings and promoted {len(promoted)} in one transaction: {elapsed * 1000:.1f} ms")
+
+    lookups = []
+    leaves = []
+    async with SessionLocal() as db:
+        promoted_users = set((await db.scalars(
+            select(User.username).join(Booking.user).filter(Booking.showtime_id == showtime.id)
+        )).all())
+        seats_available = await db.scalar(select(SeatInventory.seats_available).filter(SeatInventory.id == inventory_id))
+        waiting = await db.scalar(select(func.count()).select_from(WaitlistEntry).filter(WaitlistEntry.showtime_id == showtime.id))
+
+        left = sorted(random.sample(range(args.cancel, args.waitlist), min(args.leave, args.waitlist - args.cancel)))
+        entry_ids = dict((await db.execute(
+            select(WaitlistEntry.user_id, WaitlistEntry.id).filter(WaitlistEntry.user_id.in_([user_ids[i] for i in left]))
+        )).all())
+        for i in left:
+            started = time.perf_counter()
+            await leave_waitlist(db, entry_ids[user_ids[i]], user_ids[i])
+            leaves.append(time.perf_counter() - started)
+
+        staying = sorted(set(range(args.cancel, args.waitlist)) - set(left))
+        for i in random.sample(staying, min(args.lookups, len(staying))):
+            started = time.perf_counter()
+            (entry, position), = await waitlist_entries(db, user_ids[i])
+            lookups.append(time.perf_counter() - started)
+            assert position == i + 1 - args.cancel - bisect.bisect(left, i), (i, position)
+    await engine.dispose()
+
+    if leaves:
+        print(f"leave p50/p99: {percentile(leaves, 50) * 1000:.2f} / {percentile(leaves, 99) * 1000:.2f} ms")
+    print(f"position lookup p50/p99: {percentile(lookups, 50) * 1000:.2f} / {percentile(lookups, 99) * 1000:.2f} ms")
+    if promoted_users != {f"waiting{i}" for i in range(args.cancel)} or seats_available != 0 or waiting != args.waitlist - args.cancel:
+        raise SystemExit(f"WRONG PROMOTION: promoted={len(promoted_users)} seats_available={seats_available} waiting={waiting}")
+    print("promoted the front of the queue in order")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--waitlist", type=int, default=50000)
+    parser.add_argument("--capacity", type=int, default=5000)
+    parser.add_argument("--cancel", type=int, default=2000, help="bookings cancelled in the one transaction")
+    parser.add_argument("--leave", type=int, default=1000, help="users who leave the queue before the lookups")
+    parser.add_argument("--lookups", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
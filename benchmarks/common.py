@@ -0,0 +1,102 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import asyncio
+import json
+import os
+import time
+
+def percentile(samples, pct):
+    """
+    Return the ``pct`` percentile (0-100) of ``samples`` using nearest rank.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+async def run_concurrent(total, concurrency, make_request):
+    """
+    Await ``make_request(i)`` ``total`` times with at most ``concurrency``
+    calls in flight. Returns (elapsed seconds, latencies, error count).
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                await make_request(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors
+
+async def start_app(app):
+    """
+    Create the schema and demo data in the benchmark database, as a deploy
+    does before starting workers, then run ``app``'s startup handlers.
+    """
+    # Imported here: the app reads DATABASE_URL on import, which the
+    # benchmark scripts set after importing this module
+    from app.database import engine
+    from app.migrations import upgrade_database
+    from app.utils.seed import initialize_data
+
+    await upgrade_database(engine)
+    await initialize_data()
+    await app.router.startup()
+
+def summarize(name, elapsed, latencies, errors):
+    """
+    Build a result row with throughput and latency percentiles in ms.
+    """
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+def print_results(results, baseline=None):
+    """
+    Print result rows as a table, with the rps change against ``baseline``
+    rows of the same name when given.
+    """
+    previous = {row["name"]: row for row in baseline or []}
+    print(f"{'benchmark':<28}{'reqs':>8}{'errs':>6}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'Δrps':>9}")
+    for row in results:
+        delta = ""
+        if row["name"] in previous and previous[row["name"]]["rps"]:
+            change = row["rps"] / previous[row["name"]]["rps"] - 1
+            delta = f"{change:+.0%}"
+        print(
+            f"{row['name']:<28}{row['requests']:>8}{row['errors']:>6}{row['rps']:>10}"
+            f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{delta:>9}"
+        )
+
+def load_results(path):
+    """
+    Load result rows previously written by ``save_results``.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)["results"]
+
+def save_results(path, results, **meta):
+    """
+    Write result rows (plus any metadata) as JSON.
+    """
+    with open(path, "w") as fh:
+        json.dump({"results": results, **meta}, fh, indent=2)
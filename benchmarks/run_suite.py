@@ -0,0 +1,86 @@
+"""
+Reproducible load test of the booking flow on every available database.
+
+For SQLite, and for PostgreSQL when ``--postgres-url`` (or BENCH_POSTGRES_URL)
+points at a server that accepts connections, this resets a benchmark
+database, seeds it with ``benchmarks.seed_data`` and runs
+``benchmarks.bench_sessions`` against it in a fresh process. Results are
+saved per database under ``benchmarks/results/`` named after the current
+commit, so a later commit can be compared against them:
+
+    python -m benchmarks.run_suite --users 1000 --duration 60
+    git checkout feature && python -m benchmarks.run_suite --users 1000 --duration 60 --against main
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def git_revision(rev="HEAD"):
+    """
+    Short commit hash of ``rev``, or ``rev`` itself outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", rev], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return rev
+
+def results_path(database, rev):
+    return os.path.join(RESULTS_DIR, f"{database}-{rev}.json")
+
+async def postgres_available(url):
+    """
+    True if ``url`` accepts connections.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.database import to_async_url
+
+    engine = create_async_engine(to_async_url(url))
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception as exc:
+        print(f"skipping PostgreSQL: {exc.__class__.__name__}: {exc}")
+        return False
+    finally:
+        await engine.dispose()
+
+def run(module, database_url, *args):
+    env = {**os.environ, "DATABASE_URL": database_url, "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark")}
+    subprocess.run([sys.executable, "-m", module, *map(str, args)], env=env, check=True)
+
+def main(args):
+    databases = [("sqlite", f"sqlite:///{tempfile.mkdtemp()}/bench.db")]
+    postgres_url = args.postgres_url or os.environ.get("BENCH_POSTGRES_URL")
+    if postgres_url and asyncio.run(postgres_available(postgres_url)):
+        databases.append(("postgresql", postgres_url))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    revision = git_revision()
+    baseline = git_revision(args.against) if args.against else None
+    for name, url in databases:
+        print(f"== {name} @ {revision}")
+        run("benchmarks.seed_data", url, "--reset", "--movies", args.movies, "--users", args.users, "--bookings", args.bookings)
+        session_args = ["--users", args.users, "--duration", args.duration, "--save", results_path(name, revision)]
+        if baseline:
+            session_args += ["--compare", results_path(name, baseline)]
+        run("benchmarks.bench_sessions", url, *session_args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--postgres-url", help="PostgreSQL database to reset and benchmark (default: BENCH_POSTGRES_URL)")
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--against", help="commit whose saved results to compare against")
+    main(parser.parse_args())
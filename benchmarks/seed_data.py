@@ -0,0 +1,171 @@
+"""
+Benchmark data generator.
+
+Creates the schema if needed and adds ``--movies`` movies with the default
+showtime schedule, ``--users`` users (``user0`` ... sharing the password
+``--password``) and ``--bookings`` bookings spread over random upcoming
+showtimes, with seats, inventory counters and sales aggregates consistent
+with them, as if they had been booked through the app:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed_data --movies 200 --users 1000 --bookings 20000
+    DATABASE_URL=postgresql://localhost/bench python -m benchmarks.seed_data --movies 200 --users 1000 --bookings 20000
+
+``--reset`` drops every table first. The same ``--seed`` gives the same
+movies, users and bookings, so runs against different commits or databases
+start from the same data.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select, update
+
+from app.config import DEFAULT_SCREEN, DEFAULT_SCREEN_CAPACITY, DEFAULT_SHOWTIMES, SCHEDULE_DAYS
+from app.database import Base, SessionLocal, engine
+from app.migrations import migration_metadata, upgrade_database
+from app.models.booking import Booking
+from app.models.inventory import SeatInventory, Seat
+from app.models.movie import Movie
+from app.models.showtime import Showtime
+from app.models.user import User
+from app.services.inventory import ensure_inventory
+from app.services.passwords import password_hasher
+from app.services.sales import rebuild_sales
+
+FORMATS = ("Standard", "IMAX", "3D")
+WORDS = ("Night", "River", "Last", "Empire", "Silent", "Star", "Garden", "Iron", "Lost", "City", "Winter", "Echo")
+CHUNK = 5000
+
+def chunks(rows, size=CHUNK):
+    for offset in range(0, len(rows), size):
+        yield rows[offset:offset + size]
+
+async def seed_movies(db, rng, count, prefix):
+    movies = [
+        {
+            "title": f"{prefix} {rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            "year": rng.randint(1970, 2025),
+            "director": f"Director {rng.randint(1, count // 4 + 1)}",
+            "rating": rng.randint(1, 10),
+            "format": rng.choice(FORMATS),
+            "price": rng.choice((8, 10, 12, 15)),
+        }
+        for i in range(count)
+    ]
+    movie_ids = []
+    for rows in chunks(movies):
+        movie_ids += (await db.scalars(insert(Movie).returning(Movie.id), rows)).all()
+
+    today = date.today()
+    starts = [
+        datetime.combine(today + timedelta(days=day), datetime.strptime(start.strip(), "%H:%M").time())
+        for day in range(SCHEDULE_DAYS)
+        for start in DEFAULT_SHOWTIMES
+    ]
+    showtimes = [
+        {"movie_id": movie_id, "screen": DEFAULT_SCREEN, "starts_at": starts_at, "capacity": DEFAULT_SCREEN_CAPACITY}
+        for movie_id in movie_ids
+        for starts_at in starts
+    ]
+    for rows in chunks(showtimes):
+        await db.execute(insert(Showtime), rows)
+    return movie_ids
+
+async def seed_users(db, count, prefix, password):
+    # One hash for everyone: bcrypt per user would dominate the seeding time
+    hashed = await password_hasher.hash(password)
+    user_ids = []
+    for rows in chunks([{"username": f"{prefix}{i}", "password": hashed, "is_admin": False} for i in range(count)]):
+        user_ids += (await db.scalars(insert(User).returning(User.id), rows)).all()
+    return user_ids
+
+async def seed_bookings(db, rng, count, movie_ids, user_ids):
+    showtimes = (await db.execute(
+        select(Showtime.id, Showtime.movie_id, Showtime.capacity, Movie.price)
+        .join(Movie, Movie.id == Showtime.movie_id)
+        .filter(Showtime.movie_id.in_(movie_ids), Showtime.starts_at >= datetime.now())
+    )).all()
+    if not showtimes:
+        return 0
+    remaining = {showtime.id: showtime.capacity for showtime in showtimes}
+
+    bookings = []
+    for _ in range(count):
+        showtime = rng.choice(showtimes)
+        quantity = rng.choice((1, 1, 2, 2, 3, 4))
+        if remaining[showtime.id] < quantity:
+            continue
+        remaining[showtime.id] -= quantity
+        bookings.append({
+            "user_id": rng.choice(user_ids),
+            "movie_id": showtime.movie_id,
+            "showtime_id": showtime.id,
+            "quantity": quantity,
+            "total": showtime.price * quantity,
+            "created_at": datetime.now() - timedelta(minutes=rng.randrange(30 * 24 * 60)),
+        })
+
+    by_showtime = defaultdict(list)
+    for rows in chunks(bookings):
+        for booking_id, showtime_id, quantity in await db.execute(
+            insert(Booking).returning(Booking.id, Booking.showtime_id, Booking.quantity), rows
+        ):
+            by_showtime[showtime_id].append((booking_id, quantity))
+
+    # Give each booking seats from its showtime's seat map
+    for showtime_id, owners in by_showtime.items():
+        inventory_id = await ensure_inventory(db, showtime_id)
+        taken = sum(quantity for _, quantity in owners)
+        seats = iter((await db.scalars(
+            select(Seat.id)
+            .filter(Seat.inventory_id == inventory_id, Seat.booking_id.is_(None), Seat.hold_id.is_(None))
+            .order_by(Seat.id)
+            .limit(taken)
+        )).all())
+        await db.execute(update(Seat), [
+            {"id": next(seats), "booking_id": booking_id}
+            for booking_id, quantity in owners
+            for _ in range(quantity)
+        ])
+        await db.execute(
+            update(SeatInventory)
+            .filter(SeatInventory.id == inventory_id)
+            .values(seats_available=SeatInventory.seats_available - taken)
+        )
+    return len(bookings)
+
+async def main(args):
+    rng = random.Random(args.seed)
+    if args.reset:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(migration_metadata.drop_all)
+    await upgrade_database(engine)
+
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        movie_ids = await seed_movies(db, rng, args.movies, args.title_prefix)
+        user_ids = await seed_users(db, args.users, args.user_prefix, args.password)
+        booked = await seed_bookings(db, rng, args.bookings, movie_ids, user_ids)
+        await db.commit()
+        await rebuild_sales(db)
+    await engine.dispose()
+    print(
+        f"seeded {args.movies} movies, {args.users} users and {booked} bookings "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--password", default="benchpass")
+    parser.add_argument("--user-prefix", default="user")
+    parser.add_argument("--title-prefix", default="Bench")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop every table first")
+    asyncio.run(main(parser.parse_args()))
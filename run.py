@@ -1,7 +1,23 @@
 """
 Entry point for running the application.
+
+Creates or upgrades the schema (including the after-deploy migrations: no
+older release is running next to the development server) and seeds the
+demo data once, then starts the development server; workers started by
+uvicorn itself skip both.
 """
+import asyncio
 import uvicorn
 
+from app.database import engine
+from app.migrations import upgrade_database
+from app.utils.seed import initialize_data
+
+async def prepare_database():
+    await upgrade_database(engine, after_deploy=True)
+    await initialize_data()
+    await engine.dispose()
+
 if __name__ == "__main__":
+    asyncio.run(prepare_database())
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)